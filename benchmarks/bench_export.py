@@ -0,0 +1,89 @@
+"""Encode the sample images with every export profile and report throughput
+
+Usage: python benchmarks/bench_export.py [--images DIR] [--repeat N] [--json FILE]
+
+MB/s is measured against the decoded pixel data (width * height * 4 bytes),
+so profiles can be compared regardless of how well they compress.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5.QtGui import QGuiApplication, QImage
+
+from gict import export
+
+
+def load_images(folder):
+    images = []
+    for path in sorted(glob.glob(os.path.join(folder, '*.png'))):
+        image = QImage(path)
+        if not image.isNull():
+            images.append((os.path.basename(path), image))
+    return images
+
+
+def bench_profile(profile, images, repeat, out_dir):
+    encoder = export.get_encoder(profile)
+    raw_bytes = 0
+    output_bytes = 0
+    elapsed = 0.0
+
+    for name, image in images:
+        base_path = os.path.join(out_dir, os.path.splitext(name)[0])
+        for _ in range(repeat):
+            start = time.perf_counter()
+            path = export.write_image(image, base_path, profile.key)
+            elapsed += time.perf_counter() - start
+        raw_bytes += image.width() * image.height() * 4 * repeat
+        output_bytes += os.path.getsize(path)
+
+    return {
+        'profile': profile.key,
+        'encoder': encoder.name,
+        'seconds': elapsed,
+        'mb_per_s': raw_bytes / (1024 * 1024) / elapsed if elapsed else 0.0,
+        'output_bytes': output_bytes,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--images', default=os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'images'))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--profiles', nargs='*', default=[p.key for p in export.PROFILES])
+    parser.add_argument('--json', help="write the results to this file")
+    args = parser.parse_args()
+
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    app = QGuiApplication(sys.argv[:1])  # noqa: F841 (loads the image plugins)
+
+    images = load_images(args.images)
+    if not images:
+        sys.exit(f"No images found in {args.images}")
+
+    results = []
+    with tempfile.TemporaryDirectory() as out_dir:
+        for key in args.profiles:
+            results.append(bench_profile(export.get_profile(key), images, args.repeat, out_dir))
+
+    print(f"{len(images)} images, {args.repeat} repeats")
+    print(f"{'profile':<22}{'encoder':<10}{'MB/s':>10}{'output (KB)':>14}")
+    for result in results:
+        print(f"{result['profile']:<22}{result['encoder']:<10}"
+              f"{result['mb_per_s']:>10.1f}{result['output_bytes'] / 1024:>14.1f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,347 @@
+"""Offscreen performance benchmarks for startup, loading, painting, dragging and exporting
+
+Usage:
+    python benchmarks/bench_suite.py [--count 9] [--size 2000x1500] [--depth 8]
+                                     [--repeat 5] [--json results.json] [--importtime]
+    python benchmarks/bench_suite.py --compare baseline.json [--threshold 0.15]
+
+Every benchmark runs against a synthetic image set generated into a
+temporary folder, under QT_QPA_PLATFORM=offscreen. Startup is measured in
+fresh processes, from process creation to the first painted frame, and the
+slowest imports are recorded with ``-X importtime``. With --compare the new
+results are checked against a saved run and the script exits with status 1
+if any benchmark got slower than the threshold allows.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt5.QtCore import QEvent, QPoint, QPointF, QRect, Qt
+from PyQt5.QtGui import QColor, QImage, QLinearGradient, QMouseEvent, QPainter
+from PyQt5.QtWidgets import QApplication, QFileDialog, QMessageBox
+
+
+def peak_rss_bytes():
+    """Peak resident set size of this process, None where it is unknown"""
+    try:
+        import resource
+    except ImportError:
+        try:
+            import psutil
+        except ImportError:
+            return None
+        info = psutil.Process().memory_info()
+        return getattr(info, 'peak_wset', info.rss)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def load_app_module(language='EN'):
+    from gict import strings
+    strings.set_language(language)
+    from gict import main_window
+    return main_window
+
+
+def startup_command(language, *options):
+    return [sys.executable, *options, '-m', 'gict', '--language', language.lower(), '--startup-report']
+
+
+def bench_startup(language, repeat):
+    """Process creation to the first painted frame of ``python -m gict``"""
+    samples = []
+    phases = {}
+    deferred_loaded = set()
+    for _ in range(repeat):
+        start = time.time()
+        output = subprocess.run(startup_command(language), cwd=ROOT, capture_output=True,
+                                text=True, timeout=120, check=True).stdout
+        report = json.loads(output.strip().splitlines()[-1])
+        samples.append(report['first_paint_time'] - start)
+        for name, seconds in report['phases'].items():
+            phases.setdefault(name, []).append(seconds)
+        deferred_loaded.update(report['deferred_modules_loaded'])
+    return {
+        'median_s': statistics.median(samples),
+        'min_s': min(samples),
+        'samples': len(samples),
+        'phases_s': {name: statistics.median(values) for name, values in phases.items()},
+        'deferred_modules_loaded': sorted(deferred_loaded),
+    }
+
+
+def import_profile(language, top=15):
+    """[(module, seconds)] of the imports with the highest self time at startup"""
+    stderr = subprocess.run(startup_command(language, '-X', 'importtime'), cwd=ROOT,
+                            capture_output=True, text=True, timeout=120, check=True).stderr
+    imports = []
+    for line in stderr.splitlines():
+        fields = line[len('import time:'):].split('|')
+        if line.startswith('import time:') and fields[0].strip().isdigit():
+            imports.append((fields[2].strip(), int(fields[0]) / 1e6))
+    return sorted(imports, key=lambda item: -item[1])[:top]
+
+
+def generate_images(folder, count, width, height, depth):
+    """Write *count* PNGs with gradients and structure that compress realistically"""
+    image_format = QImage.Format_RGBA64 if depth == 16 else QImage.Format_RGB32
+    paths = []
+    for i in range(count):
+        image = QImage(width, height, image_format)
+        painter = QPainter(image)
+        gradient = QLinearGradient(0, 0, width, height)
+        gradient.setColorAt(0, QColor.fromHsv((i * 37) % 360, 200, 240))
+        gradient.setColorAt(1, QColor.fromHsv((i * 37 + 180) % 360, 160, 60))
+        painter.fillRect(0, 0, width, height, gradient)
+        step = max(8, width // 64)
+        for x in range(0, width, step):
+            painter.setPen(QColor.fromHsv((x + i * 11) % 360, 255, 255))
+            painter.drawLine(x, 0, width - x, height)
+        painter.end()
+
+        path = os.path.join(folder, f"synthetic_{i:03d}.png")
+        image.save(path)
+        paths.append(path)
+    return paths
+
+
+def mouse_event(event_type, pos, buttons=Qt.LeftButton):
+    button = Qt.LeftButton if event_type != QEvent.MouseMove else Qt.NoButton
+    return QMouseEvent(event_type, QPointF(pos), button, buttons, Qt.NoModifier)
+
+
+class Suite:
+
+    def __init__(self, app, module, paths, repeat, out_dir):
+        self.app = app
+        self.module = module
+        self.paths = paths
+        self.repeat = repeat
+        self.out_dir = out_dir
+        self.window = module.MainWindow()
+        self.window.resize(1600, 1000)
+        self.window.show()
+        self.app.processEvents()
+
+    def timed(self, func, setup=None):
+        samples = []
+        for _ in range(self.repeat):
+            if setup:
+                setup()
+            start = time.perf_counter()
+            func()
+            samples.append(time.perf_counter() - start)
+        return {
+            'median_s': statistics.median(samples),
+            'min_s': min(samples),
+            'samples': len(samples),
+        }
+
+    def wait_for_exports(self):
+        queue = self.window.export_queue
+        while queue.is_busy():
+            self.app.processEvents()
+            time.sleep(0.001)
+
+    def enable_magnifiers(self):
+        from gict.roi import Roi, RoiSet
+        size = self.window.image_widgets[0].image_size
+        self.window.set_rois(RoiSet([
+            Roi('primary', QRect(size.width() // 10, size.height() // 10,
+                                 size.width() // 8, size.height() // 8), '#ff0000'),
+            Roi('secondary', QRect(size.width() // 2, size.height() // 2,
+                                   size.width() // 10, size.height() // 10), '#00ff00', position=1),
+        ]))
+
+    def bench_load(self):
+        def load():
+            self.window.load_images(self.paths)
+            self.app.processEvents()
+        return self.timed(load)
+
+    def bench_load_processes(self):
+        """Load the set with worker process decoding, until every image is shown"""
+        from gict import loader
+        shared = loader.shared_loader()
+        if not shared.set_processes(True):
+            return None
+
+        def load():
+            self.window.load_images(self.paths)
+            while any(widget.original_pixmap is None for widget in self.window.image_widgets):
+                self.app.processEvents()
+                time.sleep(0.001)
+        load()  # the workers are started by the first run
+        result = self.timed(load)
+        result['workers'] = shared.processes.workers
+        shared.set_processes(False)
+        shared.processes.shutdown()
+        return result
+
+    def bench_update_display(self):
+        widgets = self.window.image_widgets
+
+        def update_all():
+            for widget in widgets:
+                widget.update_display()
+        return self.timed(update_all)
+
+    def bench_paint(self):
+        self.enable_magnifiers()
+        widgets = self.window.image_widgets
+
+        def paint_all():
+            for widget in widgets:
+                widget.repaint()
+        return self.timed(paint_all)
+
+    def bench_drag(self, moves=60):
+        source = self.window.image_widgets[0]
+        pixmap_size = source.display_pixmap.size()
+        x0 = (source.width() - pixmap_size.width()) // 2 + 5
+        y0 = (source.height() - pixmap_size.height()) // 2 + 5
+
+        def drag():
+            source.mousePressEvent(mouse_event(QEvent.MouseButtonPress, QPoint(x0, y0)))
+            for i in range(1, moves + 1):
+                pos = QPoint(x0 + i * pixmap_size.width() // (2 * moves),
+                             y0 + i * pixmap_size.height() // (2 * moves))
+                source.mouseMoveEvent(mouse_event(QEvent.MouseMove, pos))
+                self.app.processEvents()
+            source.mouseReleaseEvent(mouse_event(QEvent.MouseButtonRelease, QPoint(x0, y0)))
+        result = self.timed(drag)
+        result['per_move_ms'] = result['median_s'] / moves * 1000
+        return result
+
+    def bench_save(self, method_name):
+        save = getattr(self.window, method_name)
+        manifest = os.path.join(self.out_dir, '.gict-export.json')
+
+        def clean():
+            # A clean folder, otherwise the export queue skips unchanged outputs
+            for name in os.listdir(self.out_dir):
+                os.remove(os.path.join(self.out_dir, name))
+
+        def run():
+            save()
+            self.wait_for_exports()
+        result = self.timed(run, setup=clean)
+        result['outputs'] = len([n for n in os.listdir(self.out_dir) if n != os.path.basename(manifest)])
+        return result
+
+    def run(self):
+        results = {}
+        results['load_images'] = self.bench_load()
+        load_processes = self.bench_load_processes()
+        if load_processes is not None:
+            results['load_images_processes'] = load_processes
+        results['update_display'] = self.bench_update_display()
+        results['paint_magnifiers'] = self.bench_paint()
+        results['drag'] = self.bench_drag()
+        results['save_images'] = self.bench_save('save_images')
+        results['save_local_images'] = self.bench_save('save_local_images')
+        return results
+
+
+def compare(results, baseline, threshold):
+    """Return [(name, old, new, ratio)] of benchmarks slower than the threshold"""
+    regressions = []
+    for name, result in results['benchmarks'].items():
+        old = baseline.get('benchmarks', {}).get(name)
+        if not old or not old.get('median_s'):
+            continue
+        ratio = result['median_s'] / old['median_s']
+        if ratio > 1 + threshold:
+            regressions.append((name, old['median_s'], result['median_s'], ratio))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=9)
+    parser.add_argument('--size', default='2000x1500', help="WIDTHxHEIGHT of the synthetic images")
+    parser.add_argument('--depth', type=int, choices=(8, 16), default=8)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--language', choices=('EN', 'CN'), default='EN')
+    parser.add_argument('--json', help="write the results to this file")
+    parser.add_argument('--compare', help="baseline results to check for regressions")
+    parser.add_argument('--threshold', type=float, default=0.15,
+                        help="allowed slowdown before a benchmark counts as regressed")
+    parser.add_argument('--importtime', action='store_true',
+                        help="print the slowest imports at startup")
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.size.lower().split('x'))
+    benchmarks = {'startup': bench_startup(args.language, args.repeat)}
+    imports = import_profile(args.language)
+
+    app = QApplication(sys.argv[:1])
+    module = load_app_module(args.language)
+
+    # Never block on dialogs
+    QMessageBox.information = staticmethod(lambda *a, **k: None)
+    QMessageBox.warning = staticmethod(lambda *a, **k: None)
+
+    with tempfile.TemporaryDirectory() as image_dir, tempfile.TemporaryDirectory() as out_dir:
+        QFileDialog.getExistingDirectory = staticmethod(lambda *a, **k: out_dir)
+        paths = generate_images(image_dir, args.count, width, height, args.depth)
+        suite = Suite(app, module, paths, args.repeat, out_dir)
+        benchmarks.update(suite.run())
+
+    results = {
+        'config': {
+            'count': args.count, 'width': width, 'height': height, 'depth': args.depth,
+            'repeat': args.repeat, 'language': args.language,
+        },
+        'platform': {'python': platform.python_version(), 'machine': platform.machine(),
+                     'system': platform.system()},
+        'peak_rss_bytes': peak_rss_bytes(),
+        'benchmarks': benchmarks,
+        'startup_imports': imports,
+    }
+
+    print(f"{args.count} images {width}x{height} {args.depth}-bit, {args.repeat} repeats")
+    for name, result in benchmarks.items():
+        print(f"  {name:<20}{result['median_s'] * 1000:>10.1f} ms (min {result['min_s'] * 1000:.1f} ms)")
+    if results['peak_rss_bytes']:
+        print(f"  peak RSS {results['peak_rss_bytes'] / (1024 * 1024):.0f} MB")
+    phases = ", ".join(f"{name[:-2]} {seconds * 1000:.0f} ms"
+                       for name, seconds in benchmarks['startup']['phases_s'].items())
+    print(f"  startup phases (from main): {phases}")
+    if benchmarks['startup']['deferred_modules_loaded']:
+        print("  warning: imported before the first frame: "
+              + ", ".join(benchmarks['startup']['deferred_modules_loaded']))
+    if args.importtime:
+        print("  slowest imports at startup (self time):")
+        for name, seconds in imports:
+            print(f"    {name:<40}{seconds * 1000:>8.1f} ms")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline.get('config') != results['config']:
+            print("Note: the baseline was recorded with a different configuration")
+        regressions = compare(results, baseline, args.threshold)
+        for name, old, new, ratio in regressions:
+            print(f"REGRESSION {name}: {old * 1000:.1f} ms -> {new * 1000:.1f} ms ({ratio:.2f}x)")
+        if regressions:
+            sys.exit(1)
+        print("No regressions")
+
+
+if __name__ == '__main__':
+    main()
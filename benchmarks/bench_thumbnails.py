@@ -0,0 +1,148 @@
+"""Compare quick JPEG previews against the full decode
+
+Usage: python benchmarks/bench_thumbnails.py [--count 40] [--size 4000x3000]
+                                             [--repeat 3] [--json FILE]
+
+A synthetic camera shoot is written to a temporary folder: JPEGs with an
+EXIF orientation and a 160x120 EXIF thumbnail, plus the same files without
+a thumbnail. Reported per file are the full ``QPixmap(path)`` decode, the
+EXIF thumbnail and the DCT-domain scaled decode, then the time until
+MainWindow.load_images shows a grid of the whole shoot with and without
+quick previews.
+"""
+import argparse
+import json
+import os
+import statistics
+import struct
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt5.QtCore import QBuffer, QByteArray, QIODevice, Qt
+from PyQt5.QtGui import QColor, QImage, QLinearGradient, QPainter, QPixmap
+from PyQt5.QtWidgets import QApplication
+
+from gict import thumbnails
+
+
+def jpeg_bytes(image, quality=90):
+    data = QByteArray()
+    buffer = QBuffer(data)
+    buffer.open(QIODevice.WriteOnly)
+    image.save(buffer, 'JPG', quality)
+    return bytes(data)
+
+
+def exif_segment(orientation, thumbnail):
+    """APP1 segment with an orientation in IFD0 and *thumbnail* in IFD1"""
+    ifd0_offset = 8
+    ifd1_offset = ifd0_offset + 2 + 12 + 4
+    data_offset = ifd1_offset + 2 + 2 * 12 + 4
+    tiff = b'II*\x00' + struct.pack('<I', ifd0_offset)
+    tiff += struct.pack('<HHHIHHI', 1, 0x0112, 3, 1, orientation, 0, ifd1_offset)
+    tiff += struct.pack('<HHHII', 2, 0x0201, 4, 1, data_offset)
+    tiff += struct.pack('<HHIII', 0x0202, 4, 1, len(thumbnail), 0)
+    payload = b'Exif\x00\x00' + tiff + thumbnail
+    return b'\xff\xe1' + struct.pack('>H', len(payload) + 2) + payload
+
+
+def generate_shoot(folder, count, width, height):
+    """Return (paths with EXIF thumbnails, paths without)"""
+    with_thumbnails, without = [], []
+    for i in range(count):
+        image = QImage(width, height, QImage.Format_RGB32)
+        painter = QPainter(image)
+        gradient = QLinearGradient(0, 0, width, height)
+        gradient.setColorAt(0, QColor.fromHsv((i * 37) % 360, 180, 230))
+        gradient.setColorAt(1, QColor.fromHsv((i * 37 + 150) % 360, 140, 70))
+        painter.fillRect(0, 0, width, height, gradient)
+        step = max(8, width // 80)
+        for x in range(0, width, step):
+            painter.setPen(QColor.fromHsv((x + i * 13) % 360, 255, 255))
+            painter.drawLine(x, 0, width - x, height)
+        painter.end()
+
+        data = jpeg_bytes(image)
+        thumbnail = jpeg_bytes(image.scaled(160, 120, Qt.KeepAspectRatio, Qt.SmoothTransformation), 80)
+        for paths, extra, suffix in ((with_thumbnails, exif_segment(1, thumbnail), ''),
+                                     (without, b'', '_plain')):
+            path = os.path.join(folder, f"IMG_{2980 + i}{suffix}.JPG")
+            with open(path, 'wb') as f:
+                f.write(data[:2] + extra + data[2:])
+            paths.append(path)
+    return with_thumbnails, without
+
+
+def per_file(func, paths, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for path in paths:
+            func(path)
+        samples.append((time.perf_counter() - start) / len(paths))
+    return {'median_s': statistics.median(samples), 'min_s': min(samples)}
+
+
+def bench_grid(app, window, paths, quick, repeat):
+    """Time until load_images has put something on screen for every file"""
+    thumbnails.set_enabled(quick)
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        window.load_images(paths)
+        while any(widget.display_pixmap is None for widget in window.image_widgets):
+            app.processEvents()
+        samples.append(time.perf_counter() - start)
+        # Let the background decodes finish before the next run
+        while any(widget.original_pixmap is None for widget in window.image_widgets):
+            app.processEvents()
+            time.sleep(0.001)
+    thumbnails.set_enabled(True)
+    return {'median_s': statistics.median(samples), 'min_s': min(samples)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=40)
+    parser.add_argument('--size', default='4000x3000', help="WIDTHxHEIGHT of the synthetic photos")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--json', help="write the results to this file")
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.size.lower().split('x'))
+    app = QApplication(sys.argv[:1])
+    from gict.main_window import MainWindow
+
+    results = {}
+    with tempfile.TemporaryDirectory() as folder:
+        with_thumbnails, without = generate_shoot(folder, args.count, width, height)
+        results['full_qpixmap'] = per_file(QPixmap, with_thumbnails, args.repeat)
+        results['exif_thumbnail'] = per_file(thumbnails.quick_preview, with_thumbnails, args.repeat)
+        results['scaled_decode'] = per_file(thumbnails.quick_preview, without, args.repeat)
+
+        window = MainWindow()
+        window.resize(1600, 1000)
+        window.show()
+        app.processEvents()
+        results['grid_full'] = bench_grid(app, window, with_thumbnails, False, args.repeat)
+        results['grid_exif'] = bench_grid(app, window, with_thumbnails, True, args.repeat)
+        results['grid_scaled'] = bench_grid(app, window, without, True, args.repeat)
+        window.close()
+
+    print(f"{args.count} JPEGs {width}x{height}, {args.repeat} repeats")
+    for name in ('full_qpixmap', 'exif_thumbnail', 'scaled_decode'):
+        print(f"  {name:<16}{results[name]['median_s'] * 1000:>10.2f} ms per file")
+    for name in ('grid_full', 'grid_exif', 'grid_scaled'):
+        print(f"  {name:<16}{results[name]['median_s'] * 1000:>10.1f} ms until the grid is shown")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,242 @@
+"""Behaviour checks of the numeric and indexing modules and of session files
+
+Usage: python benchmarks/checks.py [NAME...]
+
+Each check builds its own small inputs in memory or in a temporary folder
+and asserts known results, such as an image compared with itself having no
+difference. Checks run in order, or only those whose names are given; the
+exit status is 1 if any of them fails.
+"""
+import os
+import random
+import shutil
+import sys
+import tempfile
+import traceback
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt5.QtCore import QRect
+from PyQt5.QtGui import QColor, QImage, QLinearGradient, QPainter
+from PyQt5.QtWidgets import QApplication
+
+CHECKS = []
+
+
+def check(func):
+    CHECKS.append(func)
+    return func
+
+
+def gradient_image(width=97, height=61, hue=200):
+    """RGB32 image with a gradient and a few shapes, so no two rows are alike"""
+    image = QImage(width, height, QImage.Format_RGB32)
+    painter = QPainter(image)
+    gradient = QLinearGradient(0, 0, width, height)
+    gradient.setColorAt(0, QColor.fromHsv(hue, 180, 230))
+    gradient.setColorAt(1, QColor.fromHsv((hue + 120) % 360, 220, 60))
+    painter.fillRect(image.rect(), gradient)
+    painter.setBrush(QColor(250, 240, 20))
+    painter.drawEllipse(width // 4, height // 4, width // 3, height // 3)
+    painter.end()
+    return image
+
+
+@check
+def metrics_identity():
+    from gict import analysis
+
+    image = gradient_image()
+    formats = (QImage.Format_RGB32, QImage.Format_RGB888, QImage.Format_Grayscale8,
+               QImage.Format_Indexed8, QImage.Format_ARGB32, QImage.Format_RGBX64)
+    for image_format in formats:
+        converted = image.convertToFormat(image_format)
+        result = analysis.metrics(converted, converted)
+        assert result['mse'] == 0 and result['max_abs'] == 0, (image_format, result)
+        assert result['psnr'] is None and result['changed'] == 0, (image_format, result)
+
+
+@check
+def metrics_difference():
+    from gict import analysis
+
+    reference = gradient_image().convertToFormat(QImage.Format_RGB888)
+    image = reference.copy()
+    colour = image.pixelColor(10, 20)
+    image.setPixelColor(10, 20, QColor(min(255, colour.red() + 40), colour.green(), colour.blue()))
+    result = analysis.metrics(reference, image)
+    assert result['max_abs'] == min(255, colour.red() + 40) - colour.red(), result
+    assert result['changed'] == 1 / (reference.width() * reference.height()), result
+    assert analysis.metrics(reference, image, tolerance=255)['changed'] == 0
+    assert analysis.metrics(reference, image, QRect(40, 0, 20, 20))['mse'] == 0
+
+
+@check
+def regression_folders():
+    from gict import regression
+
+    folder = tempfile.mkdtemp(prefix='gict-checks-')
+    try:
+        before, after = os.path.join(folder, 'before'), os.path.join(folder, 'after')
+        os.makedirs(os.path.join(before, 'sub'))
+        for index, name in enumerate(('a.png', 'b.png', os.path.join('sub', 'c.png'))):
+            gradient_image(hue=index * 70).convertToFormat(QImage.Format_RGB888).save(os.path.join(before, name))
+        shutil.copytree(before, after)
+        report = regression.run(before, after, workers=2)
+        summary = report['summary']
+        assert summary['pairs'] == 3 and summary[regression.SAME] == 3, summary
+        assert summary[regression.CHANGED] == summary[regression.FAILED] == summary[regression.MISSING] == 0
+
+        changed = QImage(os.path.join(after, 'b.png'))
+        changed.setPixelColor(0, 0, QColor(255, 0, 255))
+        changed.save(os.path.join(after, 'b.png'))
+        os.remove(os.path.join(after, 'a.png'))
+        report = regression.run(before, after, workers=2)
+        statuses = {entry['name']: entry['status'] for entry in report['entries']}
+        assert statuses == {'a.png': regression.MISSING, 'b.png': regression.CHANGED,
+                            os.path.join('sub', 'c.png'): regression.SAME}, statuses
+    finally:
+        shutil.rmtree(folder)
+
+
+@check
+def grid_index():
+    from gict import roi
+
+    rng = random.Random(7)
+    index = roi.GridIndex(cell_size=32)
+    rects = {}
+    for step in range(600):
+        key = rng.randrange(40)
+        if rng.random() < 0.2:
+            index.remove(key)
+            rects.pop(key, None)
+        else:
+            rect = QRect(rng.randrange(-50, 500), rng.randrange(-50, 500), rng.randrange(0, 120), rng.randrange(0, 120))
+            index.insert(key, rect)
+            if rect.isEmpty():
+                rects.pop(key, None)
+            else:
+                rects[key] = rect
+        area = QRect(rng.randrange(-100, 500), rng.randrange(-100, 500), rng.randrange(1, 400), rng.randrange(1, 400))
+        expected = {key for key, rect in rects.items() if rect.intersects(area)}
+        assert index.query(area) == expected, (step, area)
+    assert index.query(QRect()) == set()
+
+
+@check
+def hash_search():
+    from gict import hashindex
+
+    rng = random.Random(11)
+    values = set()
+    for _ in range(300):
+        value = rng.getrandbits(64)
+        values.add(value)
+        # Near duplicates a few bits away, as similar images give
+        for _ in range(rng.randrange(3)):
+            near = value
+            for bit in rng.sample(range(64), rng.randrange(1, 12)):
+                near ^= 1 << bit
+            values.add(near)
+    index = hashindex.MultiIndex(values)
+    for value in rng.sample(sorted(values), 60):
+        for radius in (0, 3, 4, 8, 11):
+            expected = {other for other in values if hashindex.hamming(value, other) <= radius}
+            assert index.search(value, radius) == expected, (value, radius)
+
+    hashes = {'a.png': 0, 'b.png': 0b111, 'c.png': 0b1111 << 20, 'd.png': (1 << 64) - 1, 'e.png': (1 << 64) - 2}
+    assert hashindex.cluster(hashes, threshold=3) == [['a.png', 'b.png'], ['d.png', 'e.png']]
+    assert hashindex.cluster(hashes, threshold=4) == [['a.png', 'b.png', 'c.png'], ['d.png', 'e.png']]
+    assert hashindex.cluster(hashes, threshold=0) == []
+
+
+@check
+def scene_rules():
+    from gict import sets
+
+    assert sets.SceneRules().match('IMG_2980_primary.png') == ('IMG_2980_primary', None)
+    rules = sets.SceneRules(r'(IMG_\d+)')
+    assert rules.match('IMG_2980_primary.png') == ('IMG_2980', None)
+    assert rules.match('notes.png') is None
+    rules = sets.SceneRules(r'(?P<scene>IMG_\d+)_?(?P<method>.*)\.')
+    assert rules.match('IMG_2980_primary.png') == ('IMG_2980', 'primary')
+    assert rules.match('IMG_2980.png') == ('IMG_2980', None)
+    assert sets.SceneRules(r'scene_\d+').match('a_scene_012.png') == ('scene_012', None)
+
+    table = sets.SceneTable()
+    table.add('s1', 'b', '/b/s1.png')
+    table.add('s1', 'a', '/a/s1.png')
+    table.add('s0', 'a', '/a/s0.png')
+    assert table.sets() == [('s0', ['/a/s0.png']), ('s1', ['/b/s1.png', '/a/s1.png'])]
+
+
+@check
+def session_round_trip():
+    from types import SimpleNamespace
+
+    from PyQt5.QtCore import QSize
+
+    from gict import roi, session
+
+    folder = tempfile.mkdtemp(prefix='gict-checks-')
+    try:
+        image_path = os.path.join(folder, 'a.png')
+        gradient_image().save(image_path)
+        widget = SimpleNamespace(image_path=image_path, original_pixmap=None, image_size=QSize(97, 61),
+                                 preview_name=None)
+        rois = roi.default_rois()
+        rois.add(roi.Roi('detail', QRect(5, 6, 20, 10), QColor('#00ff00'), 3.0))
+        settings = {'line_width': 3, 'margin': 12, 'loupe_color': QColor('#123456')}
+        path = os.path.join(folder, 'run.gict')
+        session.save_session(path, [widget], rois, settings)
+        loaded = session.load_session(path)
+        assert loaded.file_paths == [image_path]
+        assert loaded.settings == settings, loaded.settings
+        assert [item.to_json() for item in loaded.rois] == [item.to_json() for item in rois]
+        assert not loaded.entries[0].is_changed()
+
+        try:
+            session.save_session(path, [widget], rois, {'unsaveable': object()})
+        except TypeError:
+            pass
+        else:
+            raise AssertionError("saving an object that is not JSON did not fail")
+        assert not os.path.exists(path + '.tmp')
+        assert session.load_session(path).file_paths == [image_path]
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('{"version": 2, "files": [{"width": 1}]}')
+        try:
+            session.load_session(path)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("a file entry without a path was read")
+    finally:
+        shutil.rmtree(folder)
+
+
+def main(argv=None):
+    names = (sys.argv[1:] if argv is None else argv) or [func.__name__ for func in CHECKS]
+    unknown = set(names) - {func.__name__ for func in CHECKS}
+    if unknown:
+        sys.exit("Unknown checks: " + ", ".join(sorted(unknown)))
+    app = QApplication.instance() or QApplication([])  # noqa: F841
+    failed = 0
+    for func in CHECKS:
+        if func.__name__ not in names:
+            continue
+        try:
+            func()
+        except Exception:
+            failed += 1
+            print(f"FAIL {func.__name__}")
+            traceback.print_exc()
+        else:
+            print(f"ok   {func.__name__}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
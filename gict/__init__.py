@@ -0,0 +1 @@
+"""Shared building blocks for the General Image Comparison Tool."""
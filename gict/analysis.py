@@ -0,0 +1,349 @@
+"""Disagreement map: where the loaded images differ from each other
+
+The per-pixel standard deviation (or max - min) across all images is
+computed in row chunks on a thread pool. Each chunk streams over the images
+with Welford's update, so only one chunk of one image is converted to float
+at a time and the images are never stacked. numpy is required and imported
+on first use; its array operations release the GIL, so the chunks run in
+parallel.
+"""
+import sys
+import threading
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+from PyQt5.QtGui import QImage
+
+from . import loader, memory, tracing
+from .cache import file_fingerprint
+
+STD = 'std'
+RANGE = 'range'
+MODES = (STD, RANGE)
+
+CHUNK_ROWS = 64
+
+# Formats whose pixels are read in place: (item type, offset of the first
+# colour channel). The channel order does not matter, only the maximum over
+# the channels is kept.
+_FIRST_COLOUR = 0 if sys.byteorder == 'little' else 1
+_LAYOUTS = {
+    QImage.Format_RGB32: ('uint8', _FIRST_COLOUR),
+    QImage.Format_ARGB32: ('uint8', _FIRST_COLOUR),
+    QImage.Format_ARGB32_Premultiplied: ('uint8', _FIRST_COLOUR),
+    QImage.Format_RGBX64: ('uint16', 0),
+    QImage.Format_RGBA64: ('uint16', 0),
+    QImage.Format_RGBA64_Premultiplied: ('uint16', 0),
+}
+
+# Heat colours from no disagreement to the colour scale maximum
+_HEAT_STOPS = ((0.0, (0, 0, 0)), (0.3, (90, 0, 140)), (0.6, (230, 40, 30)),
+               (0.85, (255, 200, 0)), (1.0, (255, 255, 255)))
+
+
+def available():
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def readable(image):
+    """*image* in a format whose pixels can be viewed in place"""
+    if image.format() in _LAYOUTS:
+        return image
+    if image.depth() > 32:
+        return image.convertToFormat(QImage.Format_RGBX64)
+    return image.convertToFormat(QImage.Format_RGB32)
+
+
+def pixel_array(image):
+    """(height, width, 3) view of the colour channels of a readable QImage
+
+    The view does not hold a reference to *image*; keep the image alive for
+    as long as the view is used.
+    """
+    import numpy as np
+
+    item_type, first = _LAYOUTS[image.format()]
+    bits = image.constBits()
+    bits.setsize(image.sizeInBytes())
+    rows = np.frombuffer(memoryview(bits), dtype=item_type).reshape(image.height(), -1)
+    pixels = rows[:, :image.width() * 4].reshape(image.height(), image.width(), 4)
+    return pixels[:, :, first:first + 3]
+
+
+def accumulate(arrays, scales, mode, top, bottom, width):
+    """Disagreement of rows *top* to *bottom*, the maximum over the channels"""
+    import numpy as np
+
+    if mode == RANGE:
+        low = high = None
+        for array, scale in zip(arrays, scales):
+            rows = array[top:bottom, :width].astype(np.float32) * scale
+            if low is None:
+                low, high = rows, rows.copy()
+            else:
+                np.minimum(low, rows, out=low)
+                np.maximum(high, rows, out=high)
+        return (high - low).max(axis=2)
+
+    mean = np.zeros((bottom - top, width, 3), np.float32)
+    m2 = np.zeros_like(mean)
+    for count, (array, scale) in enumerate(zip(arrays, scales), 1):
+        rows = array[top:bottom, :width].astype(np.float32) * scale
+        delta = rows - mean
+        mean += delta / count
+        m2 += delta * (rows - mean)
+    return np.sqrt(m2 / len(arrays)).max(axis=2)
+
+
+def heatmap(values, reference, scale):
+    """RGB QImage of *values* over a dimmed grey version of *reference*"""
+    import numpy as np
+
+    stops = np.array([stop for stop, _ in _HEAT_STOPS])
+    colours = np.array([colour for _, colour in _HEAT_STOPS], np.float32)
+    levels = np.linspace(0.0, 1.0, 256)
+    lut = np.stack([np.interp(levels, stops, colours[:, channel]) for channel in range(3)], axis=1)
+
+    strength = np.clip(values / scale, 0.0, 1.0)
+    heat = lut[(strength * 255).astype(np.uint8)]
+    alpha = strength[:, :, None]
+    out = (reference[:, :, None] * 0.35 * (1.0 - alpha) + heat * alpha).astype(np.uint8)
+
+    height, width = values.shape
+    data = np.ascontiguousarray(out).tobytes()
+    return QImage(data, width, height, width * 3, QImage.Format_RGB888).copy()
+
+
+def metrics(reference, image, rect=None, tolerance=0):
+    """Difference of *image* to *reference* (QImages), over *rect* if given
+
+    Images of different sizes are compared over their common area. Returns
+    a dict with the mean squared error, the PSNR in dB (None for identical
+    pixels), the mean and the largest absolute difference, on the 16-bit
+    scale if either image is deep, and the fraction of pixels changed by
+    more than *tolerance* in any channel. Rows are compared in chunks, so
+    only a few rows are converted to float at a time.
+    """
+    import numpy as np
+
+    # The arrays view the images' pixels, so the converted copies are kept alive with them
+    images = [readable(reference), readable(image)]
+    arrays = [pixel_array(readable_image) for readable_image in images]
+    deep = any(array.dtype == np.uint16 for array in arrays)
+    height = min(array.shape[0] for array in arrays)
+    width = min(array.shape[1] for array in arrays)
+    top, bottom, left, right = 0, height, 0, width
+    if rect is not None:
+        top, bottom = max(0, rect.top()), min(height, rect.bottom() + 1)
+        left, right = max(0, rect.left()), min(width, rect.right() + 1)
+    if bottom <= top or right <= left:
+        raise ValueError("the area lies outside the images")
+
+    scales = [257.0 if deep and array.dtype == np.uint8 else 1.0 for array in arrays]
+    squared = absolute = largest = 0.0
+    changed = 0
+    for start in range(top, bottom, CHUNK_ROWS):
+        end = min(bottom, start + CHUNK_ROWS)
+        first, second = (array[start:end, left:right].astype(np.float64) * scale
+                         for array, scale in zip(arrays, scales))
+        difference = np.abs(first - second)
+        squared += float(np.square(difference).sum())
+        absolute += float(difference.sum())
+        largest = max(largest, float(difference.max()))
+        changed += int(np.count_nonzero(difference.max(axis=2) > tolerance))
+    pixels = (bottom - top) * (right - left)
+    mse = squared / (pixels * 3)
+    peak = 65535.0 if deep else 255.0
+    return {
+        'mse': mse,
+        'psnr': float(10 * np.log10(peak * peak / mse)) if mse > 0 else None,
+        'mean_abs': absolute / (pixels * 3),
+        'max_abs': largest,
+        'changed': changed / pixels,
+        'pixels': pixels,
+    }
+
+
+class _Task(QRunnable):
+
+    def __init__(self, job, func, *args):
+        super().__init__()
+        self.job = job
+        self.func = func
+        self.args = args
+
+    def run(self):
+        if self.job.cancelled:
+            return
+        try:
+            self.func(self.job, *self.args)
+        except Exception as e:  # reported instead of killing the worker thread
+            self.job.cancelled = True
+            self.job.signals.failed.emit(self.job.id, str(e))
+
+
+class _Signals(QObject):
+    progress = pyqtSignal(int, int, int)
+    finished = pyqtSignal(int, QImage, float, float)
+    failed = pyqtSignal(int, str)
+
+
+class _Job:
+
+    def __init__(self, job_id, key, sources, mode, pool):
+        self.id = job_id
+        self.key = key
+        self.sources = sources
+        self.mode = mode
+        self.pool = pool
+        self.images = [None] * len(sources)
+        self.signals = _Signals()
+        self.cancelled = False
+        self.lock = threading.Lock()
+        self.remaining = len(sources)
+        self.chunks = 0
+
+    def count_down(self):
+        """Number of tasks still pending after the caller's one"""
+        with self.lock:
+            self.remaining -= 1
+            return self.remaining
+
+    def evict_representation(self, kind):
+        # The arrays of a running job are in use
+        return False
+
+
+class DisagreementMap(QObject):
+    """Computes the map for a list of images and keeps the last result
+
+    *sources* are decoded QImages or paths to decode. A result stays cached
+    until the files, their order or the mode change.
+    """
+
+    progress = pyqtSignal(int, int)
+    ready = pyqtSignal(QImage, float, float)  # image, maximum, colour scale
+    failed = pyqtSignal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.job = None
+        self.next_id = 0
+        self.key = None
+        self.result = None
+
+    @staticmethod
+    def set_key(paths, mode):
+        return (mode, tuple(tuple(file_fingerprint(path) or (path,)) for path in paths))
+
+    def compute(self, paths, sources, mode):
+        key = self.set_key(paths, mode)
+        if key == self.key and self.result is not None:
+            tracing.count('disagreement map', True)
+            self.ready.emit(*self.result)
+            return
+        if self.job is not None and self.job.key == key:
+            return
+        tracing.count('disagreement map', False)
+        self.cancel()
+
+        self.next_id += 1
+        self.job = _Job(self.next_id, key, list(sources), mode, self.pool)
+        self.job.signals.progress.connect(self.on_progress)
+        self.job.signals.finished.connect(self.on_finished)
+        self.job.signals.failed.connect(self.on_failed)
+        for index in range(len(sources)):
+            self.pool.start(_Task(self.job, self._prepare, index))
+
+    def cancel(self):
+        if self.job is not None:
+            self.job.cancelled = True
+            self.job = None
+
+    def is_busy(self):
+        return self.job is not None
+
+    @staticmethod
+    def _prepare(job, index):
+        source = job.sources[index]
+        with tracing.span('analysis.prepare'):
+            image = source if isinstance(source, QImage) else loader.decode_image(source)
+            if image.isNull():
+                raise IOError(f"cannot read {source}")
+            job.images[index] = readable(image)
+        if job.count_down() == 0:
+            DisagreementMap._start_chunks(job)
+
+    @staticmethod
+    def _start_chunks(job):
+        import numpy as np
+
+        job.arrays = [pixel_array(image) for image in job.images]
+        # 8-bit images are compared on the 16-bit scale when the set mixes depths
+        deep = any(array.dtype == np.uint16 for array in job.arrays)
+        job.scales = [257.0 if deep and array.dtype == np.uint8 else 1.0 for array in job.arrays]
+        job.width = min(array.shape[1] for array in job.arrays)
+        job.height = min(array.shape[0] for array in job.arrays)
+        job.values = np.empty((job.height, job.width), np.float32)
+        job.reference = np.empty((job.height, job.width), np.uint8)
+        memory.shared_manager().account(job, {memory.ANALYSIS: job.values.nbytes + job.reference.nbytes})
+
+        rows = list(range(0, job.height, CHUNK_ROWS))
+        job.chunks = job.remaining = len(rows)
+        for top in rows:
+            job.pool.start(_Task(job, DisagreementMap._chunk, top, min(top + CHUNK_ROWS, job.height)))
+
+    @staticmethod
+    def _chunk(job, top, bottom):
+        with tracing.span('analysis.chunk'):
+            job.values[top:bottom] = accumulate(job.arrays, job.scales, job.mode, top, bottom, job.width)
+            reference = job.arrays[0][top:bottom, :job.width]
+            job.reference[top:bottom] = reference.mean(axis=2) / (257.0 if reference.dtype.itemsize == 2 else 1.0)
+        remaining = job.count_down()
+        job.signals.progress.emit(job.id, job.chunks - remaining, job.chunks)
+        if remaining == 0:
+            DisagreementMap._finish(job)
+
+    @staticmethod
+    def _finish(job):
+        import numpy as np
+
+        with tracing.span('analysis.heatmap'):
+            sample = job.values[::4, ::4]
+            maximum = float(job.values.max()) if job.values.size else 0.0
+            scale = max(float(np.percentile(sample, 99.5)) if sample.size else 0.0, 1e-6)
+            image = heatmap(job.values, job.reference, scale)
+        job.arrays = job.images = job.values = job.reference = None
+        memory.shared_manager().forget(job)
+        job.signals.finished.emit(job.id, image, maximum, scale)
+
+    def on_progress(self, job_id, done, total):
+        if self.job is not None and job_id == self.job.id:
+            self.progress.emit(done, total)
+
+    def on_finished(self, job_id, image, maximum, scale):
+        if self.job is None or job_id != self.job.id:
+            return
+        self.key = self.job.key
+        self.result = (image, maximum, scale)
+        self.job = None
+        memory.shared_manager().account(self, {memory.ANALYSIS: image.sizeInBytes()})
+        self.ready.emit(image, maximum, scale)
+
+    def on_failed(self, job_id, message):
+        if self.job is not None and job_id == self.job.id:
+            self.job = None
+            self.failed.emit(message)
+
+    def evict_representation(self, kind):
+        """Drop the cached map for the memory manager, it is computed again when needed"""
+        if kind != memory.ANALYSIS or self.result is None:
+            return False
+        self.result = None
+        self.key = None
+        memory.shared_manager().account(self, {memory.ANALYSIS: 0})
+        return True
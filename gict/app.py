@@ -0,0 +1,73 @@
+"""Application entry point
+
+    python -m gict [--language en|cn] [--startup-report]
+
+With ``--startup-report`` the time of every startup phase is printed as JSON
+once the first frame has been painted, then the application quits.
+benchmarks/bench_suite.py tracks these numbers.
+"""
+import sys
+import time
+
+from PyQt5.QtCore import QEvent, QObject, QTimer
+from PyQt5.QtWidgets import QApplication
+
+from . import strings
+
+# Optional backends that must not be imported before the first frame
+DEFERRED_MODULES = ('numpy', 'PIL', 'imageio', 'tifffile', 'rawpy')
+
+
+class StartupReporter(QObject):
+    """Prints the startup phases after the first frame of *window* and closes it"""
+
+    def __init__(self, window, started, phases):
+        super().__init__(window)
+        self.window = window
+        self.started = started
+        self.phases = phases
+        self.seen = False
+
+    def eventFilter(self, watched, event):
+        if event.type() == QEvent.UpdateRequest and not self.seen:
+            self.seen = True
+            # runs once the update request has been painted
+            QTimer.singleShot(0, self.report)
+        return False
+
+    def report(self):
+        import json
+        self.phases['first_paint_s'] = time.perf_counter() - self.started
+        print(json.dumps({
+            'phases': self.phases,
+            'first_paint_time': time.time(),
+            'deferred_modules_loaded': [name for name in DEFERRED_MODULES if name in sys.modules],
+        }), flush=True)
+        self.window.close()
+
+
+def option_value(argv, name, default):
+    if name in argv[:-1]:
+        return argv[argv.index(name) + 1]
+    return default
+
+
+def main(language='en', argv=None):
+    started = time.perf_counter()
+    argv = list(sys.argv if argv is None else argv)
+    phases = {}
+
+    strings.set_language(option_value(argv, '--language', language))
+    app = QApplication(argv)
+    phases['application_s'] = time.perf_counter() - started
+
+    from .main_window import MainWindow
+    phases['import_ui_s'] = time.perf_counter() - started
+
+    window = MainWindow()
+    phases['window_s'] = time.perf_counter() - started
+
+    if '--startup-report' in argv:
+        window.installEventFilter(StartupReporter(window, started, phases))
+    window.show()
+    return app.exec_()
@@ -0,0 +1,71 @@
+"""On-disk cache of downscaled previews, keyed by source file fingerprint"""
+import hashlib
+import json
+import os
+
+from PyQt5.QtCore import QStandardPaths, Qt
+from PyQt5.QtGui import QImage
+
+from . import tracing
+
+PREVIEW_SIZE = 1024
+
+
+def file_fingerprint(path):
+    """Cheap identity of a file's content: path, size and modification time"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [os.path.abspath(path), stat.st_size, stat.st_mtime_ns]
+
+
+def fingerprint_key(fingerprint):
+    return hashlib.sha1(json.dumps(fingerprint).encode()).hexdigest()
+
+
+def cache_dir(name):
+    """Return (and create) a sub folder of the user's cache location"""
+    base = QStandardPaths.writableLocation(QStandardPaths.GenericCacheLocation)
+    if not base:
+        base = os.path.join(os.path.expanduser('~'), '.cache')
+    folder = os.path.join(base, 'gict', name)
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+
+class PreviewCache:
+    """Small PNG previews that can be shown before the full decode"""
+
+    def __init__(self, folder=None):
+        self.folder = folder or cache_dir('previews')
+
+    def preview_name(self, fingerprint):
+        return fingerprint_key(fingerprint) + '.png'
+
+    def path_for(self, name):
+        return os.path.join(self.folder, name)
+
+    def get(self, name):
+        """Return the cached preview or None"""
+        if not name:
+            return None
+        image = QImage(self.path_for(name))
+        tracing.count('preview cache', not image.isNull())
+        return None if image.isNull() else image
+
+    def put(self, fingerprint, image):
+        """Store a preview of *image* (QImage) and return its name"""
+        name = self.preview_name(fingerprint)
+        path = self.path_for(name)
+        if os.path.exists(path):
+            return name
+
+        if image.width() > PREVIEW_SIZE or image.height() > PREVIEW_SIZE:
+            image = image.scaled(PREVIEW_SIZE, PREVIEW_SIZE, Qt.KeepAspectRatio,
+                                 Qt.SmoothTransformation)
+        tmp_path = path + '.tmp'
+        if image.save(tmp_path, 'PNG', 50):
+            os.replace(tmp_path, path)
+            return name
+        return None
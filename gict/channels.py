@@ -0,0 +1,83 @@
+"""Channel and colour space views, so one aspect of the images is compared at a time
+
+A view turns a decoded image into what is shown: a colour channel or the
+alpha as grey, the luminance, or the chroma with the brightness taken out.
+Views are computed with numpy in one pass over the pixels, in row chunks,
+and keep the bit depth: 8-bit images give 8-bit views, deep images 16-bit
+ones. Image widgets keep the views they computed, the exports compute
+them from the decoded file the same way.
+"""
+from PyQt5.QtGui import QImage
+
+RGB = 'rgb'
+RED = 'red'
+GREEN = 'green'
+BLUE = 'blue'
+ALPHA = 'alpha'
+LUMA = 'luma'
+CHROMA = 'chroma'
+VIEWS = (RGB, RED, GREEN, BLUE, ALPHA, LUMA, CHROMA)
+DEFAULT_VIEW = RGB
+
+# Rec. 709 weights of the gamma encoded channels
+LUMA_WEIGHTS = (0.2126, 0.7152, 0.0722)
+# Offsets in the RGBA8888 and RGBA64 layouts
+_CHANNEL_OFFSETS = {RED: 0, GREEN: 1, BLUE: 2, ALPHA: 3}
+CHUNK_ROWS = 256
+
+
+def available():
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _rows(image, dtype):
+    """(height, bytes per line // item size) numpy view of the pixels of *image*"""
+    import numpy as np
+
+    bits = image.bits()
+    bits.setsize(image.sizeInBytes())
+    return np.frombuffer(memoryview(bits), dtype=dtype).reshape(image.height(), -1)
+
+
+def view_image(image, view):
+    """*image* (QImage) as *view*; RGB returns *image* itself"""
+    if view == RGB or image.isNull():
+        return image
+    import numpy as np
+
+    deep = image.depth() > 32
+    dtype = np.uint16 if deep else np.uint8
+    maximum = float(np.iinfo(dtype).max)
+    # Straight alpha in a fixed channel order on every platform
+    source = image.convertToFormat(QImage.Format_RGBA64 if deep else QImage.Format_RGBA8888)
+    width, height = source.width(), source.height()
+    pixels = _rows(source, dtype)[:, :width * 4].reshape(height, width, 4)
+
+    if view == CHROMA:
+        result = QImage(width, height, QImage.Format_RGBX64 if deep else QImage.Format_RGBX8888)
+        out = _rows(result, dtype)[:, :width * 4].reshape(height, width, 4)
+        out[:, :, 3] = int(maximum)
+    else:
+        result = QImage(width, height, QImage.Format_Grayscale16 if deep else QImage.Format_Grayscale8)
+        out = _rows(result, dtype)[:, :width]
+
+    if view in _CHANNEL_OFFSETS:
+        out[:] = pixels[:, :, _CHANNEL_OFFSETS[view]]
+        return result
+
+    weights = np.array(LUMA_WEIGHTS, np.float32)
+    for top in range(0, height, CHUNK_ROWS):
+        rgb = pixels[top:top + CHUNK_ROWS, :, :3].astype(np.float32)
+        luma = rgb @ weights
+        if view == LUMA:
+            out[top:top + CHUNK_ROWS] = np.rint(luma).astype(dtype)
+        else:
+            # The colour around mid grey: equal brightness everywhere
+            rgb += maximum / 2 - luma[:, :, None]
+            np.clip(rgb, 0, maximum, out=rgb)
+            out[top:top + CHUNK_ROWS, :, :3] = np.rint(rgb).astype(dtype)
+    return result
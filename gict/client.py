@@ -0,0 +1,111 @@
+"""Client of the render daemon (see daemon.py), standard library only
+
+    from gict.client import Client
+
+    with Client() as client:
+        client.load_set('run42', paths)
+        client.set_rois('run42', [{'name': 'face', 'rect': [10, 20, 64, 64], 'scale': 4}])
+        client.export('run42', 'out/run42', kind='region')
+        print(client.metrics('run42'))
+"""
+import json
+import os
+import socket
+import tempfile
+
+
+def default_socket_path():
+    """Per user socket in the runtime directory (or the temp directory)"""
+    folder = os.environ.get('XDG_RUNTIME_DIR') or tempfile.gettempdir()
+    user = os.getuid() if hasattr(os, 'getuid') else os.environ.get('USERNAME', 'user')
+    return os.path.join(folder, f"gict-{user}.sock")
+
+
+class DaemonError(Exception):
+    """A request the daemon could not carry out"""
+
+
+class Client:
+    """Blocking connection to the daemon
+
+    request() waits for its answer; pipeline() sends several requests at once
+    so the daemon works on them concurrently.
+    """
+
+    def __init__(self, socket_path=None, timeout=None):
+        self.socket_path = socket_path or default_socket_path()
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(self.socket_path)
+        self.stream = self.sock.makefile('rwb')
+        self.next_id = 0
+        self.unclaimed = {}  # id -> response read while waiting for another one
+
+    def close(self):
+        self.stream.close()
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def send(self, op, **params):
+        """Send a request without waiting, return its id"""
+        self.next_id += 1
+        params.update(id=self.next_id, op=op)
+        self.stream.write(json.dumps(params).encode() + b'\n')
+        self.stream.flush()
+        return self.next_id
+
+    def receive(self, request_id):
+        """The result of request *request_id*; raises DaemonError if it failed"""
+        while request_id not in self.unclaimed:
+            line = self.stream.readline()
+            if not line:
+                raise ConnectionError("the daemon closed the connection")
+            response = json.loads(line)
+            self.unclaimed[response.get('id')] = response
+        response = self.unclaimed.pop(request_id)
+        if not response.get('ok'):
+            raise DaemonError(response.get('error', "unknown error"))
+        return response.get('result')
+
+    def request(self, op, **params):
+        return self.receive(self.send(op, **params))
+
+    def pipeline(self, requests):
+        """Send [(op, params)] at once and return their results in order"""
+        ids = [self.send(op, **params) for op, params in requests]
+        return [self.receive(request_id) for request_id in ids]
+
+    def ping(self):
+        return self.request('ping')
+
+    def load_set(self, name, paths):
+        return self.request('load_set', set=name, paths=[os.path.abspath(path) for path in paths])
+
+    def set_rois(self, name, rois):
+        """*rois* are dicts like Roi.to_json() writes, 'name' and 'rect' are enough"""
+        return self.request('set_rois', set=name, rois=rois)
+
+    def set_settings(self, name, settings):
+        return self.request('set_settings', set=name, settings=settings)
+
+    def export(self, name, folder, kind='full', profile=None):
+        """Write the composites ('full'), the region crops ('region') or 'both'"""
+        return self.request('export', set=name, folder=os.path.abspath(folder), kind=kind,
+                            profile=profile)
+
+    def metrics(self, name, reference=0):
+        return self.request('metrics', set=name, reference=reference)
+
+    def drop_set(self, name):
+        return self.request('drop_set', set=name)
+
+    def stats(self):
+        return self.request('stats')
+
+    def shutdown(self):
+        return self.request('shutdown')
@@ -0,0 +1,391 @@
+"""Render daemon: batch exports and metrics with the decoded images kept warm
+
+    python -m gict.daemon [--socket PATH] [--workers N] [--max-pending N] [--cache-mb N]
+
+The daemon listens on a Unix domain socket that only the current user can
+open; there is no network service. A daemon does not start while another
+one answers on the same socket; a socket left by a crashed daemon is
+replaced. Clients (see client.py) send one JSON object per line and get one
+line back per request, in completion order:
+
+    {"id": 1, "op": "load_set", "set": "run42", "paths": ["/data/IMG_2980.png"]}
+    {"id": 1, "ok": true, "result": {"images": [...]}}
+    {"id": 2, "ok": false, "error": "unknown set: run41"}
+
+Operations: ping, load_set, set_rois, set_settings, export, metrics, stats,
+drop_set and shutdown. Decoding, rendering, encoding and metrics run on a
+thread pool, Qt and numpy release the GIL while they work. At most
+--max-pending requests are in flight; beyond that the daemon stops reading
+from the sockets, so clients block instead of queueing without limit.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from . import export, jobs, loader, roi
+from .cache import file_fingerprint
+from .client import Client, DaemonError, default_socket_path
+
+DEFAULT_SETTINGS = {
+    'line_width': 4,
+    'margin': 10,
+    'show_magnified': True,
+    'export_profile': export.DEFAULT_PROFILE,
+}
+EXPORT_KINDS = ('full', 'region', 'both')
+LINE_LIMIT = 16 * 1024 * 1024
+
+
+class RequestError(Exception):
+    """A request that cannot be carried out, reported to the client"""
+
+
+class AlreadyRunning(Exception):
+    """Another daemon answers on the socket"""
+
+
+def remove_stale_socket(path):
+    """Delete the socket at *path* if no daemon listens on it any more
+
+    Raises AlreadyRunning if a daemon answers a ping there, or if something
+    else accepts connections on it.
+    """
+    try:
+        client = Client(path, timeout=5)
+    except FileNotFoundError:
+        return
+    except ConnectionRefusedError:
+        os.remove(path)  # left over from a daemon that crashed
+        return
+    try:
+        pid = client.ping().get('pid')
+    except (OSError, ValueError, AttributeError, DaemonError) as e:
+        raise AlreadyRunning(f"{path} accepts connections but does not answer like a daemon: {e}")
+    finally:
+        client.close()
+    raise AlreadyRunning(f"a daemon (pid {pid}) is already listening on {path}")
+
+
+def check_profile(key):
+    if key not in export.PROFILE_MAP:
+        raise RequestError(f"unknown export profile: {key}")
+
+
+class ImageCache:
+    """Decoded images by path, least recently used first out above the budget"""
+
+    def __init__(self, budget):
+        self.budget = budget
+        self.images = OrderedDict()  # path -> (fingerprint, QImage)
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path, fingerprint):
+        entry = self.images.get(path)
+        if entry is None or entry[0] != fingerprint:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.images.move_to_end(path)
+        return entry[1]
+
+    def put(self, path, fingerprint, image):
+        self.discard(path)
+        self.images[path] = (fingerprint, image)
+        self.size += image.sizeInBytes()
+        # The newest image stays even if it alone is over the budget
+        while self.size > self.budget and len(self.images) > 1:
+            self.discard(next(iter(self.images)))
+
+    def discard(self, path):
+        entry = self.images.pop(path, None)
+        if entry is not None:
+            self.size -= entry[1].sizeInBytes()
+
+
+class ComparisonSet:
+    """Images, regions and settings of one named set"""
+
+    def __init__(self, name, paths):
+        self.name = name
+        self.paths = paths
+        self.rois = roi.default_rois()
+        self.settings = dict(DEFAULT_SETTINGS)
+
+
+class _Source:
+    """What the export item builders need of an image widget"""
+
+    def __init__(self, image_path):
+        self.image_path = image_path
+
+
+class Daemon:
+
+    def __init__(self, socket_path, workers=None, max_pending=None, cache_bytes=2048 * 1024 * 1024):
+        self.socket_path = socket_path
+        self.workers = workers or os.cpu_count() or 1
+        self.executor = ThreadPoolExecutor(self.workers)
+        self.max_pending = max_pending or 4 * self.workers
+        self.cache = ImageCache(cache_bytes)
+        self.decoding = {}  # path -> future of a decode in progress
+        self.sets = {}
+        self.writers = set()
+        self.handlers = set()
+        self.slots = None
+        self.stopped = None
+
+    async def serve(self):
+        self.slots = asyncio.Semaphore(self.max_pending)
+        self.stopped = asyncio.Event()
+        remove_stale_socket(self.socket_path)
+        # Created for the user only, there is no moment it is open to others
+        umask = os.umask(0o177)
+        try:
+            server = await asyncio.start_unix_server(self.handle_client, self.socket_path, limit=LINE_LIMIT)
+        finally:
+            os.umask(umask)
+        print(f"gict daemon listening on {self.socket_path}", flush=True)
+        try:
+            await self.stopped.wait()
+        finally:
+            server.close()
+            # Closed connections end their handlers once their requests are answered
+            for writer in list(self.writers):
+                writer.close()
+            if self.handlers:
+                await asyncio.wait(self.handlers)
+            await server.wait_closed()
+            os.remove(self.socket_path)
+            self.executor.shutdown(wait=True, cancel_futures=True)
+
+    async def handle_client(self, reader, writer):
+        write_lock = asyncio.Lock()
+        tasks = set()
+        self.writers.add(writer)
+        self.handlers.add(asyncio.current_task())
+        try:
+            while not self.stopped.is_set():
+                # No free slot: stop reading, the client's writes block
+                await self.slots.acquire()
+                try:
+                    line = await reader.readline()
+                except (ConnectionError, ValueError):
+                    line = b''
+                if not line:
+                    self.slots.release()
+                    break
+                task = asyncio.create_task(self.answer(line, writer, write_lock))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                task.add_done_callback(lambda _: self.slots.release())
+            if tasks:
+                await asyncio.wait(tasks)
+        finally:
+            self.writers.discard(writer)
+            self.handlers.discard(asyncio.current_task())
+            writer.close()
+
+    async def answer(self, line, writer, write_lock):
+        request_id = None
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise RequestError("a request must be a JSON object")
+            request_id = request.get('id')
+            handler = getattr(self, 'op_' + str(request.get('op')), None)
+            if handler is None:
+                raise RequestError(f"unknown operation: {request.get('op')}")
+            response = {'id': request_id, 'ok': True, 'result': await handler(request)}
+        except KeyError as e:
+            response = {'id': request_id, 'ok': False, 'error': f"missing parameter: {e.args[0]}"}
+        except (RequestError, ValueError, OSError) as e:
+            response = {'id': request_id, 'ok': False, 'error': str(e)}
+        except Exception as e:  # malformed parameters, e.g. a number for a path: answered all the same
+            response = {'id': request_id, 'ok': False, 'error': f"{type(e).__name__}: {e}"}
+        async with write_lock:
+            try:
+                writer.write(json.dumps(response).encode() + b'\n')
+                await writer.drain()
+            except ConnectionError:
+                pass
+
+    def run(self, func, *args):
+        return asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    async def image(self, path):
+        """The decoded image of *path*, from the cache while the file is unchanged"""
+        fingerprint = file_fingerprint(path)
+        if fingerprint is None:
+            raise RequestError(f"cannot read {path}")
+        image = self.cache.get(path, fingerprint)
+        if image is not None:
+            return image
+        decoding = self.decoding.get(path)
+        if decoding is None:
+            decoding = self.decoding[path] = asyncio.ensure_future(self.run(loader.decode_image, path))
+            decoding.add_done_callback(lambda _: self.decoding.pop(path, None))
+            image = await decoding
+            if image.isNull():
+                raise RequestError(f"cannot read {path}")
+            self.cache.put(path, fingerprint, image)
+            return image
+        image = await asyncio.shield(decoding)
+        if image.isNull():
+            raise RequestError(f"cannot read {path}")
+        return image
+
+    def comparison_set(self, request):
+        name = request['set']
+        if name not in self.sets:
+            raise RequestError(f"unknown set: {name}")
+        return self.sets[name]
+
+    async def op_ping(self, request):
+        return {'pid': os.getpid()}
+
+    async def op_load_set(self, request):
+        paths = [os.path.abspath(path) for path in request['paths']]
+        images = await asyncio.gather(*(self.image(path) for path in paths))
+        previous = self.sets.get(request['set'])
+        self.sets[request['set']] = comparison_set = ComparisonSet(request['set'], paths)
+        if previous is not None:
+            comparison_set.rois = previous.rois
+            comparison_set.settings = previous.settings
+        return {'images': [{'path': path, 'width': image.width(), 'height': image.height()}
+                           for path, image in zip(paths, images)]}
+
+    async def op_set_rois(self, request):
+        comparison_set = self.comparison_set(request)
+        try:
+            rois = roi.RoiSet.from_json(request['rois'])
+        except (TypeError, KeyError) as e:
+            raise RequestError(f"invalid regions: {e}")
+        comparison_set.rois = rois
+        return {'rois': rois.to_json()}
+
+    async def op_set_settings(self, request):
+        comparison_set = self.comparison_set(request)
+        settings = dict(comparison_set.settings)
+        settings.update(request['settings'])
+        check_profile(settings['export_profile'])
+        comparison_set.settings = settings
+        return {'settings': settings}
+
+    async def op_export(self, request):
+        comparison_set = self.comparison_set(request)
+        kind = request.get('kind', 'full')
+        if kind not in EXPORT_KINDS:
+            raise RequestError(f"unknown export kind: {kind}")
+        settings = dict(comparison_set.settings)
+        if request.get('profile'):
+            check_profile(request['profile'])
+            settings['export_profile'] = request['profile']
+        folder = request['folder']
+        os.makedirs(folder, exist_ok=True)
+
+        sources = [_Source(path) for path in comparison_set.paths]
+        items = []
+        if kind in ('full', 'both'):
+            items += jobs.full_export_items(sources, folder, comparison_set.rois, settings)
+        if kind in ('region', 'both'):
+            items += jobs.region_export_items(sources, folder, comparison_set.rois, settings)
+        return {'outputs': await asyncio.gather(*(self.export_item(item) for item in items))}
+
+    async def export_item(self, item):
+        try:
+            image = await self.image(item.image_path)
+            rendered = await self.run(item.render, image)
+            if rendered is None:
+                raise RequestError("empty region")
+            await self.run(export.write_image, rendered, os.path.splitext(item.output_path)[0],
+                           item.profile_key)
+        except (RequestError, OSError, ValueError) as e:
+            return {'path': item.output_path, 'status': jobs.FAILED, 'error': str(e)}
+        except Exception as e:  # e.g. settings of the wrong type reaching the renderer
+            return {'path': item.output_path, 'status': jobs.FAILED, 'error': f"{type(e).__name__}: {e}"}
+        return {'path': item.output_path, 'status': jobs.SAVED}
+
+    async def op_metrics(self, request):
+        from . import analysis
+        if not analysis.available():
+            raise RequestError("metrics need numpy")
+        comparison_set = self.comparison_set(request)
+        reference_index = int(request.get('reference', 0))
+        if not 0 <= reference_index < len(comparison_set.paths):
+            raise RequestError(f"no image {reference_index} in the set")
+        images = await asyncio.gather(*(self.image(path) for path in comparison_set.paths))
+        reference = images[reference_index]
+        regions = comparison_set.rois.active()
+
+        def measure(image):
+            result = {'image': analysis.metrics(reference, image), 'regions': {}}
+            for region in regions:
+                try:
+                    result['regions'][region.name] = analysis.metrics(reference, image, region.rect)
+                except ValueError as e:
+                    result['regions'][region.name] = {'error': str(e)}
+            return result
+
+        results = await asyncio.gather(*(self.run(measure, image) for image in images))
+        return {'reference': comparison_set.paths[reference_index],
+                'images': [dict(result, path=path) for path, result in zip(comparison_set.paths, results)]}
+
+    async def op_stats(self, request):
+        return {
+            'sets': sorted(self.sets),
+            'cached_images': len(self.cache.images),
+            'cache_bytes': self.cache.size,
+            'cache_hits': self.cache.hits,
+            'cache_misses': self.cache.misses,
+            'workers': self.workers,
+            'max_pending': self.max_pending,
+        }
+
+    async def op_drop_set(self, request):
+        comparison_set = self.comparison_set(request)
+        del self.sets[comparison_set.name]
+        in_use = {path for other in self.sets.values() for path in other.paths}
+        for path in comparison_set.paths:
+            if path not in in_use:
+                self.cache.discard(path)
+        return {}
+
+    async def op_shutdown(self, request):
+        self.stopped.set()
+        return {}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--socket', default=default_socket_path())
+    parser.add_argument('--workers', type=int, help="render threads (default: one per core)")
+    parser.add_argument('--max-pending', type=int, help="requests in flight before reading stops")
+    parser.add_argument('--cache-mb', type=int, default=2048, help="memory for decoded images")
+    args = parser.parse_args(argv)
+
+    if not hasattr(asyncio, 'start_unix_server'):
+        sys.exit("The daemon needs Unix domain sockets")
+
+    # Painting needs a QGuiApplication, but no display
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt5.QtGui import QGuiApplication
+    app = QGuiApplication(sys.argv[:1])  # noqa: F841
+
+    daemon = Daemon(args.socket, args.workers, args.max_pending, args.cache_mb * 1024 * 1024)
+    try:
+        asyncio.run(daemon.serve())
+    except AlreadyRunning as e:
+        sys.exit(f"Not started: {e}")
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,401 @@
+"""Decoder backends, the fastest one picked per file format
+
+    python -m gict.decoders FILE_OR_FOLDER... [--repeat 3]
+
+Images can be decoded by Qt's image plugins, Pillow, tifffile or imageio,
+whichever are installed; camera RAW files only by rawpy (see raw.py). Every backend returns a QImage, 16-bit files as
+16-bit formats, so nothing after the decode depends on the backend used.
+
+Which backend decodes a format is kept in a profile in the cache folder,
+16-bit files of a format apart from 8-bit ones (the header tells which).
+The first few files of a format that is not in the profile yet are decoded
+by each backend in turn and timed; the fastest backend that keeps the full
+bit depth is then chosen. A backend that fails on a file is not chosen for
+its format, and any failed decode is repeated with Qt. The command line
+times every backend on the given files and stores the result right away.
+Set GICT_DECODER to a backend name to use that backend for everything.
+"""
+import argparse
+import functools
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+
+from PyQt5.QtGui import QImage, QImageReader
+
+from . import pixels, raw
+from .cache import cache_dir
+
+# Timed decodes per backend before a format's backend is chosen
+TRIALS = 3
+IMAGE_SUFFIXES = ('.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff', '.webp') + raw.RAW_EXTENSIONS
+
+
+class QtDecoder:
+    """Qt's image plugins, always available"""
+
+    name = 'qt'
+    suffixes = None  # every format but RAW
+
+    @staticmethod
+    def available():
+        return True
+
+    def decode(self, path):
+        reader = QImageReader(path)
+        reader.setAutoTransform(True)
+        return reader.read()
+
+
+class PillowDecoder:
+    """Pillow, often faster on large PNGs and TIFFs"""
+
+    name = 'pillow'
+    suffixes = None
+
+    # Pillow mode: (raw mode, QImage format, bytes per pixel)
+    LAYOUTS = {
+        'L': ('L', QImage.Format_Grayscale8, 1),
+        'I;16': ('I;16', QImage.Format_Grayscale16, 2),
+        'RGB': ('RGB', QImage.Format_RGB888, 3),
+        'RGBA': ('RGBA', QImage.Format_RGBA8888, 4),
+    }
+
+    @staticmethod
+    def available():
+        try:
+            import PIL.Image  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def decode(self, path):
+        from PIL import Image, ImageOps
+
+        with Image.open(path) as image:
+            image = ImageOps.exif_transpose(image)
+            if image.mode in ('I;16B', 'I;16L', 'I'):
+                # 16-bit greyscale, 'I' is how PNG opens it
+                image = image.convert('I;16')
+            elif image.mode not in self.LAYOUTS:
+                has_alpha = 'A' in image.mode or 'transparency' in image.info
+                image = image.convert('RGBA' if has_alpha else 'RGB')
+            raw_mode, image_format, pixel_bytes = self.LAYOUTS[image.mode]
+            data = image.tobytes('raw', raw_mode)
+            width, height = image.size
+        # copy() detaches the QImage from the bytes object
+        return QImage(data, width, height, width * pixel_bytes, image_format).copy()
+
+
+def image_from_array(array):
+    """QImage copy of a (height, width[, channels]) uint8 or uint16 array, None for other arrays"""
+    import numpy as np
+
+    if array.dtype not in (np.uint8, np.uint16):
+        return None
+    channels = 1 if array.ndim == 2 else array.shape[2] if array.ndim == 3 else 0
+    deep = array.dtype == np.uint16
+    image_format = {
+        (1, False): QImage.Format_Grayscale8, (1, True): QImage.Format_Grayscale16,
+        (3, False): QImage.Format_RGB888, (3, True): QImage.Format_RGBX64,
+        (4, False): QImage.Format_RGBA8888, (4, True): QImage.Format_RGBA64,
+    }.get((channels, deep))
+    if image_format is None:
+        return None
+
+    height, width = array.shape[:2]
+    image = QImage(width, height, image_format)
+    bits = image.bits()
+    bits.setsize(image.sizeInBytes())
+    rows = np.frombuffer(memoryview(bits), dtype=array.dtype).reshape(height, -1)
+    if image_format == QImage.Format_RGBX64:
+        out = rows[:, :width * 4].reshape(height, width, 4)
+        out[:, :, :3] = array
+        out[:, :, 3] = 0xffff
+    else:
+        rows[:, :width * channels] = array.reshape(height, width * channels)
+    return image
+
+
+class TifffileDecoder:
+    """tifffile, for large and tiled TIFFs; the first page of multi-page files"""
+
+    name = 'tifffile'
+    suffixes = ('.tif', '.tiff')
+
+    @staticmethod
+    def available():
+        try:
+            import numpy  # noqa: F401
+            import tifffile  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def decode(self, path):
+        import numpy as np
+        import tifffile
+
+        array = tifffile.imread(path, key=0)
+        if array.ndim == 3 and array.shape[0] in (3, 4) and array.shape[2] not in (1, 3, 4):
+            # Planar files store one plane per channel
+            array = np.moveaxis(array, 0, -1)
+        return image_from_array(np.ascontiguousarray(array))
+
+
+class ImageioDecoder:
+    """imageio, with the plugins it finds installed"""
+
+    name = 'imageio'
+    # Formats without an EXIF orientation to apply
+    suffixes = ('.png', '.bmp', '.tif', '.tiff', '.webp')
+
+    @staticmethod
+    def available():
+        try:
+            import imageio.v3  # noqa: F401
+            import numpy  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def decode(self, path):
+        import imageio.v3 as iio
+        import numpy as np
+
+        return image_from_array(np.ascontiguousarray(iio.imread(path, index=0)))
+
+
+class RawpyDecoder:
+    """rawpy, the full demosaic of camera RAW files"""
+
+    name = 'rawpy'
+    suffixes = raw.RAW_EXTENSIONS
+
+    @staticmethod
+    def available():
+        return raw.available()
+
+    def decode(self, path):
+        return raw.decode(path)
+
+
+DECODERS = {
+    QtDecoder.name: QtDecoder,
+    PillowDecoder.name: PillowDecoder,
+    TifffileDecoder.name: TifffileDecoder,
+    ImageioDecoder.name: ImageioDecoder,
+    RawpyDecoder.name: RawpyDecoder,
+}
+
+
+@functools.lru_cache(maxsize=None)
+def available_decoders():
+    """{name: decoder} of the installed backends"""
+    return {name: decoder_class() for name, decoder_class in DECODERS.items() if decoder_class.available()}
+
+
+def candidates(suffix):
+    """Names of the installed backends that may decode files ending in *suffix*"""
+    if suffix in raw.RAW_EXTENSIONS:
+        # Qt and Pillow would only read the embedded preview, if anything
+        return [name for name, decoder in available_decoders().items()
+                if decoder.suffixes is not None and suffix in decoder.suffixes]
+    return [name for name, decoder in available_decoders().items()
+            if decoder.suffixes is None or suffix in decoder.suffixes]
+
+
+def run_decoder(name, path):
+    """(QImage or None, seconds) of decoding *path* with backend *name*"""
+    start = time.perf_counter()
+    try:
+        image = available_decoders()[name].decode(path)
+    except Exception:  # any backend error means the backend cannot read this file
+        image = None
+    if image is not None and image.isNull():
+        image = None
+    return image, time.perf_counter() - start
+
+
+def format_key(path):
+    """Profile key of *path*: its suffix, with ' 16-bit' for files with more than 8 bits per channel"""
+    suffix = suffix_of(path)
+    # The header tells how deep the file is without decoding it
+    if suffix not in raw.RAW_EXTENSIONS and QImageReader(path).imageFormat() in pixels.DEEP_FORMATS:
+        return suffix + ' 16-bit'
+    return suffix
+
+
+def sample(key, image, seconds):
+    """[seconds, kept the bit depth] of one decode of a *key* file, None if it failed"""
+    if image is None:
+        return None
+    return [seconds, not key.endswith(' 16-bit') or pixels.is_deep(image)]
+
+
+def best_decoder(samples):
+    """Name of the fastest backend that never failed nor dropped bits, from {name: [sample]}"""
+    usable = [name for name, timings in samples.items()
+              if timings and all(timing is not None and timing[1] for timing in timings)]
+    if not usable:
+        return QtDecoder.name
+    return min(usable, key=lambda name: statistics.median(timing[0] for timing in samples[name]))
+
+
+class Profile:
+    """The backend chosen for each file format, with the timings it was chosen by"""
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(cache_dir('decoders'), 'profile.json')
+        self.lock = threading.Lock()
+        # format key -> {'candidates': [names], 'samples': {name: [sample]}, 'decoder': name}
+        self.entries = {}
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def save(self):
+        with self.lock:
+            data = json.dumps(self.entries, indent=1)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            pass
+
+    def entry(self, key):
+        names = candidates(key.split()[0])
+        entry = self.entries.get(key)
+        if entry is None or entry.get('candidates') != names:
+            # New format, or backends were installed or removed since
+            entry = self.entries[key] = {'candidates': names, 'samples': {}, 'decoder': None}
+        return entry
+
+    def choose(self, key):
+        """(backend name, True while the format is still being timed)"""
+        with self.lock:
+            entry = self.entry(key)
+            if len(entry['candidates']) <= 1:
+                entry['decoder'] = entry['candidates'][0] if entry['candidates'] else QtDecoder.name
+            if entry['decoder'] is not None:
+                return entry['decoder'], False
+            for name in entry['candidates']:
+                if len(entry['samples'].get(name, ())) < TRIALS:
+                    return name, True
+        return self.decide(key), False
+
+    def record(self, key, name, timing):
+        with self.lock:
+            self.entry(key)['samples'].setdefault(name, []).append(timing)
+
+    def decide(self, key):
+        """Choose the backend of *key* from its timings and save the profile"""
+        with self.lock:
+            entry = self.entry(key)
+            entry['decoder'] = best_decoder(entry['samples'])
+            decoder = entry['decoder']
+        self.save()
+        return decoder
+
+
+_profile = None
+_profile_lock = threading.Lock()
+
+
+def shared_profile():
+    """The profile shared by every decoding thread of the process"""
+    global _profile
+    with _profile_lock:
+        if _profile is None:
+            _profile = Profile()
+        return _profile
+
+
+def suffix_of(path):
+    suffix = os.path.splitext(path)[1].lower()
+    return '.jpg' if suffix == '.jpeg' else suffix
+
+
+def decode(path):
+    """Decode *path* into a QImage (null if it cannot be read), turned by its EXIF orientation"""
+    forced = os.environ.get('GICT_DECODER')
+    if forced in available_decoders():
+        name, timing = forced, False
+    else:
+        profile = shared_profile()
+        key = format_key(path)
+        name, timing = profile.choose(key)
+    if name == QtDecoder.name and not timing:
+        return QtDecoder().decode(path)
+    image, seconds = run_decoder(name, path)
+    if timing:
+        timing = sample(key, image, seconds)
+        profile.record(key, name, timing)
+        if timing is not None and not timing[1]:
+            image = None
+    if image is None:
+        # Qt reads what the other backends could not, or gives the null image
+        return QImage() if name == QtDecoder.name else QtDecoder().decode(path)
+    return image
+
+
+def image_files(targets):
+    files = []
+    for target in targets:
+        if os.path.isdir(target):
+            files.extend(os.path.join(target, name) for name in sorted(os.listdir(target))
+                         if name.lower().endswith(IMAGE_SUFFIXES))
+        else:
+            files.append(target)
+    return files
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('targets', nargs='+', metavar='FILE_OR_FOLDER')
+    parser.add_argument('--repeat', type=int, default=TRIALS, help="decodes per file and backend")
+    args = parser.parse_args(argv)
+
+    files = image_files(args.targets)
+    if not files:
+        sys.exit("No images found")
+    by_key = {}
+    for path in files:
+        by_key.setdefault(format_key(path), []).append(path)
+
+    profile = shared_profile()
+    for key, paths in sorted(by_key.items()):
+        samples = {}
+        for name in candidates(key.split()[0]):
+            timings = samples[name] = []
+            for path in paths:
+                for _ in range(args.repeat):
+                    image, seconds = run_decoder(name, path)
+                    timings.append(sample(key, image, seconds))
+        with profile.lock:
+            entry = profile.entry(key)
+            entry['samples'] = samples
+            entry['decoder'] = best_decoder(samples)
+        print(f"{key} ({len(paths)} files): {entry['decoder']}")
+        for name, timings in samples.items():
+            if None in timings:
+                print(f"  {name:<10} failed on some files")
+            else:
+                lost = "" if all(timing[1] for timing in timings) else "  (drops bits)"
+                print(f"  {name:<10} {statistics.median(timing[0] for timing in timings) * 1000:8.1f} ms{lost}")
+    profile.save()
+    print(f"Profile: {profile.path}")
+
+
+if __name__ == '__main__':
+    main()
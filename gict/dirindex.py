@@ -0,0 +1,131 @@
+"""Cached directory listings, for folders that are slow to list (network shares)
+
+A folder's modification time changes whenever an entry is added, removed or
+renamed in it, so a listing stays valid while that time is unchanged and
+checking it costs one stat instead of a full listing. Listings are kept in
+memory and in the cache folder between runs. Folders are listed with
+os.scandir on a thread pool; the waiting is on the file server, not on
+Python.
+"""
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from . import tracing
+from .cache import cache_dir
+
+# Listings younger than this may miss entries added in the same mtime tick
+# (file servers often store whole seconds), they are used but not kept
+SETTLE_SECONDS = 2.0
+MAX_WORKERS = 16
+
+
+class Listing:
+    """Names of the files and of the sub folders of one folder"""
+
+    def __init__(self, files, folders):
+        self.files = files
+        self.folders = folders
+
+
+def scan(folder):
+    """Listing of *folder* with sorted names, hidden entries skipped"""
+    files, folders = [], []
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            if entry.name.startswith('.'):
+                continue
+            try:
+                (folders if entry.is_dir() else files).append(entry.name)
+            except OSError:
+                continue
+    return Listing(sorted(files), sorted(folders))
+
+
+class ListingCache:
+    """Listings by folder, checked against the folder's modification time"""
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(cache_dir('listings'), 'listings.json')
+        self.entries = {}  # folder -> [mtime_ns, files, folders]
+        self.lock = threading.Lock()
+        self.changed = False
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def save(self):
+        with self.lock:
+            if not self.changed:
+                return
+            tmp_path = self.path + '.tmp'
+            try:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(self.entries, f, separators=(',', ':'))
+                os.replace(tmp_path, self.path)
+                self.changed = False
+            except OSError:
+                pass
+
+    def listing(self, folder):
+        """Listing of *folder*, None if it cannot be read"""
+        folder = os.path.abspath(folder)
+        try:
+            mtime_ns = os.stat(folder).st_mtime_ns
+        except OSError:
+            return None
+        with self.lock:
+            entry = self.entries.get(folder)
+        tracing.count('directory listings', entry is not None and entry[0] == mtime_ns)
+        if entry is not None and entry[0] == mtime_ns:
+            return Listing(entry[1], entry[2])
+        try:
+            listing = scan(folder)
+        except OSError:
+            return None
+        with self.lock:
+            if time.time() - mtime_ns / 1e9 > SETTLE_SECONDS:
+                self.entries[folder] = [mtime_ns, listing.files, listing.folders]
+            else:
+                self.entries.pop(folder, None)
+            self.changed = True
+        return listing
+
+    def listings(self, folders, workers=None):
+        """{folder: Listing or None} of *folders*, listed in parallel"""
+        if not folders:
+            return {}
+        with ThreadPoolExecutor(workers or min(MAX_WORKERS, len(folders))) as executor:
+            return dict(zip(folders, executor.map(self.listing, folders)))
+
+    def walk(self, folder, workers=None):
+        """(folder, Listing) of *folder* and everything below it, one level at a time"""
+        pending = [folder]
+        while pending:
+            level = self.listings(pending, workers)
+            pending = []
+            for path, listing in level.items():
+                if listing is None:
+                    continue
+                yield path, listing
+                pending.extend(os.path.join(path, name) for name in listing.folders)
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def shared_cache():
+    """The listing cache shared by the whole application, from any thread"""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = ListingCache()
+        return _shared_cache
@@ -0,0 +1,154 @@
+"""Export profiles and the encoder backends used to write them"""
+import os
+
+from PyQt5.QtGui import QImage, QImageWriter, QPixmap
+
+
+class ExportProfile:
+    """How an exported image is encoded"""
+
+    def __init__(self, key, label, fmt, suffix, quality=-1, compression=-1,
+                 depth=8, backend='qt', options=None):
+        self.key = key
+        self.label = label
+        self.format = fmt
+        self.suffix = suffix
+        self.quality = quality
+        self.compression = compression
+        self.depth = depth
+        self.backend = backend
+        self.options = options or {}
+
+
+def png_quality(level):
+    """Map a zlib level (0-9) to the quality value Qt's PNG writer expects"""
+    level = max(0, min(9, level))
+    return 100 - (level * 91 + 8) // 9
+
+
+PROFILES = [
+    ExportProfile('png', "PNG", 'png', '.png'),
+    ExportProfile('png_fast', "PNG (fast, level 1)", 'png', '.png',
+                  quality=png_quality(1), options={'compress_level': 1}),
+    ExportProfile('png_small', "PNG (small, level 9)", 'png', '.png',
+                  quality=png_quality(9), options={'compress_level': 9}),
+    ExportProfile('png_fast_pillow', "PNG (fast, Pillow)", 'png', '.png',
+                  quality=png_quality(1), backend='pillow',
+                  options={'compress_level': 1}),
+    ExportProfile('webp_lossless', "WebP lossless", 'webp', '.webp',
+                  quality=100, options={'lossless': True, 'method': 4}),
+    ExportProfile('webp_lossless_fast', "WebP lossless (fast, Pillow)", 'webp', '.webp',
+                  quality=100, backend='pillow',
+                  options={'lossless': True, 'method': 0}),
+    ExportProfile('webp', "WebP (quality 90)", 'webp', '.webp', quality=90),
+    ExportProfile('jpeg', "JPEG (quality 95)", 'jpeg', '.jpg', quality=95),
+    ExportProfile('jpeg_preview', "JPEG (quality 80, preview)", 'jpeg', '.jpg', quality=80),
+    ExportProfile('tiff16', "TIFF 16-bit", 'tiff', '.tif', depth=16),
+]
+
+PROFILE_MAP = {profile.key: profile for profile in PROFILES}
+DEFAULT_PROFILE = 'png'
+
+
+def get_profile(key):
+    return PROFILE_MAP.get(key, PROFILE_MAP[DEFAULT_PROFILE])
+
+
+class QtEncoder:
+    """Encode through Qt's image plugins (always available)"""
+
+    name = 'qt'
+
+    @staticmethod
+    def available():
+        return True
+
+    def write(self, image, path, profile):
+        if profile.depth == 16:
+            image = image.convertToFormat(QImage.Format_RGBA64)
+        elif profile.format == 'jpeg' and image.hasAlphaChannel():
+            image = image.convertToFormat(QImage.Format_RGB32)
+
+        writer = QImageWriter(path)
+        writer.setFormat(profile.format.encode())
+        if profile.quality >= 0:
+            writer.setQuality(profile.quality)
+        if profile.compression >= 0:
+            writer.setCompression(profile.compression)
+        if not writer.write(image):
+            raise IOError(writer.errorString())
+
+
+class PillowEncoder:
+    """Encode through Pillow, which exposes faster encoder settings"""
+
+    name = 'pillow'
+
+    @staticmethod
+    def available():
+        try:
+            import PIL.Image  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def write(self, image, path, profile):
+        from PIL import Image
+
+        if profile.depth == 16:
+            # Pillow cannot write 16-bit RGB TIFFs, let Qt handle them
+            QtEncoder().write(image, path, profile)
+            return
+
+        has_alpha = image.hasAlphaChannel() and profile.format != 'jpeg'
+        if has_alpha:
+            image = image.convertToFormat(QImage.Format_RGBA8888)
+            mode = 'RGBA'
+        else:
+            image = image.convertToFormat(QImage.Format_RGB888)
+            mode = 'RGB'
+
+        data = image.constBits().asstring(image.sizeInBytes())
+        pil_image = Image.frombuffer(mode, (image.width(), image.height()), data,
+                                     'raw', mode, image.bytesPerLine(), 1)
+
+        options = dict(profile.options)
+        if profile.format == 'jpeg' or (profile.format == 'webp' and not options.get('lossless')):
+            options['quality'] = profile.quality
+        pil_image.save(path, format=profile.format.upper(), **options)
+
+
+ENCODERS = {
+    QtEncoder.name: QtEncoder,
+    PillowEncoder.name: PillowEncoder,
+}
+
+
+def get_encoder(profile):
+    """Return the profile's preferred encoder, falling back to Qt"""
+    encoder_class = ENCODERS.get(profile.backend, QtEncoder)
+    if not encoder_class.available():
+        encoder_class = QtEncoder
+    return encoder_class()
+
+
+def write_image(image, base_path, profile_key=DEFAULT_PROFILE):
+    """Encode *image* to ``base_path`` + the profile suffix and return the path
+
+    The file is written under a temporary name and renamed into place, so an
+    interrupted export never leaves a truncated image behind.
+    """
+    profile = get_profile(profile_key)
+    if isinstance(image, QPixmap):
+        image = image.toImage()
+
+    path = base_path + profile.suffix
+    folder, name = os.path.split(path)
+    tmp_path = os.path.join(folder, f".{name}.tmp")
+    try:
+        get_encoder(profile).write(image, tmp_path, profile)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return path
@@ -0,0 +1,410 @@
+"""Perceptual hashes of image folders, grouping the same content into comparison sets
+
+    python -m gict.hashindex FOLDER [FOLDER ...] [--method dhash|phash]
+                             [--threshold N] [--workers N] [--json FILE]
+
+Every image is decoded at a tiny size (JPEGs scale in the DCT domain) and
+reduced to a 64 bit hash: dHash compares neighbouring pixels of a 9x8
+greyscale thumbnail, pHash the low frequencies of a 32x32 one against their
+median. Hashes are kept in an index per method in the cache folder, keyed by
+path with the size and modification time, so indexing again only decodes
+new and changed files. Images whose hashes differ in at most *threshold*
+bits are grouped, found with multi-index hashing instead of comparing all
+pairs.
+"""
+import argparse
+import functools
+import json
+import math
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt5.QtCore import QObject, QRunnable, QSize, QThreadPool, pyqtSignal
+from PyQt5.QtGui import QImage, QImageReader
+
+from . import dirindex, raw, tracing
+from .cache import cache_dir
+from .sets import is_image
+
+DHASH = 'dhash'
+PHASH = 'phash'
+METHODS = (DHASH, PHASH)
+DEFAULT_METHOD = DHASH
+DEFAULT_THRESHOLD = 10
+MAX_THRESHOLD = 12  # the tables are searched with r // 4 bit masks, above 3 bits they get slow
+
+CHUNKS = 4
+CHUNK_BITS = 16
+CHUNK_MASK = (1 << CHUNK_BITS) - 1
+
+PHASH_SIZE = 32
+PHASH_FREQUENCIES = 8
+SAVE_INTERVAL = 2000  # new hashes between index saves, so an interrupted run keeps its work
+PROGRESS_INTERVAL = 50
+
+# Cosines of the first PHASH_FREQUENCIES DCT-II basis functions at each sample
+_DCT = [[math.cos(math.pi * (2 * n + 1) * k / (2 * PHASH_SIZE)) for n in range(PHASH_SIZE)]
+        for k in range(PHASH_FREQUENCIES)]
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+def grey_thumbnail(path, width, height):
+    """Rows of greyscale values of the image at *path* scaled to *width* x *height*, None if unreadable"""
+    if raw.is_raw(path):
+        quick = raw.quick_preview(path)
+        image = QImage() if quick is None else quick[0]
+    else:
+        reader = QImageReader(path)
+        reader.setAutoTransform(True)
+        reader.setScaledSize(QSize(width, height))
+        image = reader.read()
+    if image.isNull():
+        return None
+    if image.size() != QSize(width, height):
+        image = image.scaled(width, height)
+    image = image.convertToFormat(QImage.Format_Grayscale8)
+    bits = image.constBits()
+    bits.setsize(image.sizeInBytes())
+    data = bytes(bits)
+    stride = image.bytesPerLine()
+    return [data[y * stride:y * stride + width] for y in range(height)]
+
+
+def dhash(path):
+    """Difference hash: is each pixel of a 9x8 thumbnail brighter than its right neighbour"""
+    rows = grey_thumbnail(path, 9, 8)
+    if rows is None:
+        return None
+    value = 0
+    for row in rows:
+        for x in range(8):
+            value = (value << 1) | (row[x] > row[x + 1])
+    return value
+
+
+def phash(path):
+    """DCT hash: are the 8x8 lowest frequencies of a 32x32 thumbnail above their median"""
+    rows = grey_thumbnail(path, PHASH_SIZE, PHASH_SIZE)
+    if rows is None:
+        return None
+    # Separable DCT, only the coefficients that make up the hash
+    horizontal = [[sum(c * p for c, p in zip(basis, row)) for basis in _DCT] for row in rows]
+    coefficients = [sum(basis[n] * horizontal[n][u] for n in range(PHASH_SIZE))
+                    for basis in _DCT for u in range(PHASH_FREQUENCIES)]
+    # The DC term only says how bright the image is
+    median = sorted(coefficients[1:])[len(coefficients) // 2 - 1]
+    value = 0
+    for coefficient in coefficients:
+        value = (value << 1) | (coefficient > median)
+    return value
+
+
+HASHERS = {DHASH: dhash, PHASH: phash}
+
+
+def image_files(folders):
+    """Paths of the images below *folders*, sorted, hidden entries skipped"""
+    listings = dirindex.shared_cache()
+    paths = set()
+    for folder in folders:
+        for root, listing in listings.walk(os.path.abspath(folder)):
+            paths.update(os.path.join(root, name) for name in listing.files if is_image(name))
+    listings.save()
+    return sorted(paths)
+
+
+class HashIndex:
+    """Hashes of one method by path, saved as JSON: {path: [size, mtime_ns, hash]}"""
+
+    def __init__(self, method=DEFAULT_METHOD, path=None):
+        self.method = method
+        self.path = path or os.path.join(cache_dir('hashes'), method + '.json')
+        self.entries = {}
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def save(self):
+        tmp_path = self.path + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f, separators=(',', ':'))
+            os.replace(tmp_path, self.path)
+        except OSError:
+            pass
+
+    def lookup(self, path, stat):
+        """The stored hash of *path* if the file is unchanged, else None"""
+        entry = self.entries.get(path)
+        if entry is not None and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns:
+            return entry[2]
+        return None
+
+    @tracing.traced(name='hashindex.update')
+    def update(self, folders, workers=None, progress=None, cancelled=None):
+        """{path: hash} of the readable images below *folders*
+
+        Only new and changed files are decoded, *workers* threads at a time.
+        *progress* is called with (done, total) and *cancelled* is polled
+        between files. Entries of files deleted from *folders* are dropped.
+        """
+        paths = image_files(folders)
+        hashes = {}
+        stale = []
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            value = self.lookup(path, stat)
+            tracing.count('hash index', value is not None)
+            if value is None:
+                stale.append((path, stat))
+            else:
+                hashes[path] = value
+
+        roots = tuple(os.path.join(os.path.abspath(folder), '') for folder in folders)
+        listed = set(paths)
+        for path in [path for path in self.entries if path.startswith(roots) and path not in listed]:
+            del self.entries[path]
+
+        hasher = HASHERS[self.method]
+        done = len(hashes)
+        total = len(hashes) + len(stale)
+        if progress is not None:
+            progress(done, total)
+        lock = threading.Lock()
+
+        def index(item):
+            path, stat = item
+            if cancelled is not None and cancelled():
+                return
+            value = hasher(path)
+            with lock:
+                if value is not None:
+                    hashes[path] = value
+                    self.entries[path] = [stat.st_size, stat.st_mtime_ns, value]
+
+        with ThreadPoolExecutor(workers or os.cpu_count() or 1) as executor:
+            for _ in executor.map(index, stale):
+                done += 1
+                if done % SAVE_INTERVAL == 0:
+                    with lock:
+                        self.save()
+                if progress is not None and (done % PROGRESS_INTERVAL == 0 or done == total):
+                    progress(done, total)
+        self.save()
+        return hashes
+
+
+class MultiIndex:
+    """Multi-index hashing: one table per 16 bit chunk of the hashes
+
+    Two hashes at most r bits apart differ in at most r // 4 bits in one of
+    their four chunks, so a search looks only at the hashes filed under chunk
+    values that close to its own. Uniform 64 bit hashes defeat tree searches
+    at useful radii, the tables keep the work near linear in the hashes.
+    """
+
+    def __init__(self, values):
+        self.tables = [{} for _ in range(CHUNKS)]
+        for value in values:
+            for table, part in zip(self.tables, _chunks(value)):
+                table.setdefault(part, []).append(value)
+
+    def search(self, value, radius):
+        """The hashes within *radius* bits of *value*"""
+        found = set()
+        masks = _masks(radius // CHUNKS)
+        for table, part in zip(self.tables, _chunks(value)):
+            for mask in masks:
+                for other in table.get(part ^ mask, ()):
+                    if other not in found and hamming(value, other) <= radius:
+                        found.add(other)
+        return found
+
+
+def _chunks(value):
+    return [(value >> shift) & CHUNK_MASK for shift in range(0, CHUNKS * CHUNK_BITS, CHUNK_BITS)]
+
+
+@functools.lru_cache(maxsize=None)
+def _masks(bits):
+    """Chunk masks with at most *bits* bits set, fewest first"""
+    return sorted((mask for mask in range(CHUNK_MASK + 1) if bin(mask).count('1') <= bits),
+                  key=lambda mask: bin(mask).count('1'))
+
+
+@tracing.traced(name='hashindex.cluster')
+def cluster(hashes, threshold=DEFAULT_THRESHOLD):
+    """Groups of paths joined by hashes at most *threshold* bits apart
+
+    *hashes* is {path: hash}. Only groups of two or more are returned,
+    largest first; each group is sorted.
+    """
+    by_hash = {}
+    for path, value in hashes.items():
+        by_hash.setdefault(value, []).append(path)
+
+    # Union-find over the distinct hashes
+    parent = {value: value for value in by_hash}
+
+    def find(value):
+        while parent[value] != value:
+            parent[value] = parent[parent[value]]
+            value = parent[value]
+        return value
+
+    if threshold > 0:
+        index = MultiIndex(by_hash)
+        for value in by_hash:
+            for other in index.search(value, threshold):
+                a, b = find(value), find(other)
+                if a != b:
+                    parent[b] = a
+
+    groups = {}
+    for value, paths in by_hash.items():
+        groups.setdefault(find(value), []).extend(paths)
+    found = [sorted(paths) for paths in groups.values() if len(paths) > 1]
+    found.sort(key=lambda paths: (-len(paths), paths[0]))
+    return found
+
+
+def group_key(paths, index):
+    """Name of a group for the set navigator: its first file name, numbered"""
+    return f"{index + 1:04d} {os.path.splitext(os.path.basename(paths[0]))[0]}"
+
+
+def similar_sets(folders, method=DEFAULT_METHOD, threshold=DEFAULT_THRESHOLD, workers=None,
+                 progress=None, cancelled=None):
+    """[(key, [paths])] like sets.build_sets, grouped by content instead of name"""
+    hashes = HashIndex(method).update(folders, workers, progress, cancelled)
+    if cancelled is not None and cancelled():
+        return []
+    return [(group_key(paths, index), paths) for index, paths in enumerate(cluster(hashes, threshold))]
+
+
+class _Task(QRunnable):
+
+    def __init__(self, job):
+        super().__init__()
+        self.job = job
+
+    def run(self):
+        job = self.job
+        try:
+            found = similar_sets(job.folders, job.method, job.threshold,
+                                 progress=lambda done, total: job.signals.progress.emit(job.id, done, total),
+                                 cancelled=lambda: job.cancelled)
+        except Exception as e:  # reported instead of killing the worker thread
+            job.signals.failed.emit(job.id, str(e))
+            return
+        if not job.cancelled:
+            job.signals.finished.emit(job.id, found)
+
+
+class _Signals(QObject):
+    progress = pyqtSignal(int, int, int)
+    finished = pyqtSignal(int, list)
+    failed = pyqtSignal(int, str)
+
+
+class _Job:
+
+    def __init__(self, job_id, folders, method, threshold):
+        self.id = job_id
+        self.folders = folders
+        self.method = method
+        self.threshold = threshold
+        self.signals = _Signals()
+        self.cancelled = False
+
+
+class Indexer(QObject):
+    """Indexes folders in the background and reports the sets of similar images"""
+
+    progress = pyqtSignal(int, int)
+    finished = pyqtSignal(list)
+    failed = pyqtSignal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self.job = None
+        self.next_id = 0
+
+    def start(self, folders, method=DEFAULT_METHOD, threshold=DEFAULT_THRESHOLD):
+        self.cancel()
+        self.next_id += 1
+        self.job = _Job(self.next_id, list(folders), method, threshold)
+        self.job.signals.progress.connect(self.on_progress)
+        self.job.signals.finished.connect(self.on_finished)
+        self.job.signals.failed.connect(self.on_failed)
+        self.pool.start(_Task(self.job))
+
+    def cancel(self):
+        if self.job is not None:
+            self.job.cancelled = True
+            self.job = None
+
+    def is_busy(self):
+        return self.job is not None
+
+    def on_progress(self, job_id, done, total):
+        if self.job is not None and job_id == self.job.id:
+            self.progress.emit(done, total)
+
+    def on_finished(self, job_id, found):
+        if self.job is None or job_id != self.job.id:
+            return
+        self.job = None
+        self.finished.emit(found)
+
+    def on_failed(self, job_id, message):
+        if self.job is None or job_id != self.job.id:
+            return
+        self.job = None
+        self.failed.emit(message)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('folders', nargs='+')
+    parser.add_argument('--method', choices=METHODS, default=DEFAULT_METHOD)
+    parser.add_argument('--threshold', type=int, default=DEFAULT_THRESHOLD,
+                        help="largest number of differing bits within a group")
+    parser.add_argument('--workers', type=int, help="decoding threads (default: one per core)")
+    parser.add_argument('--json', help="write the groups to this file")
+    args = parser.parse_args(argv)
+    if not 0 <= args.threshold <= MAX_THRESHOLD:
+        parser.error(f"the threshold must be between 0 and {MAX_THRESHOLD}")
+
+    start = time.perf_counter()
+    found = similar_sets(args.folders, args.method, args.threshold, args.workers)
+    elapsed = time.perf_counter() - start
+    for key, paths in found:
+        print(key)
+        for path in paths:
+            print("    " + path)
+    print(f"{len(found)} groups in {elapsed:.1f} s", file=sys.stderr)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump([{'key': key, 'paths': paths} for key, paths in found], f, indent=1)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,674 @@
+"""Image display widget: region editing and magnified regions
+
+A widget paints in two layers. The base layer, the display image with the
+insets of the regions, is drawn once into a pixmap and kept until the image,
+the widget size, an inset or one of BASE_LAYER_SETTINGS changes. The region
+outlines, the inset of the region being dragged and the loupe are drawn on
+top of it on every paint, so dragging or hovering only costs those.
+"""
+from PyQt5.QtCore import QPoint, QPointF, QRect, QRectF, QSize, Qt, QTimer, pyqtSignal
+from PyQt5.QtGui import QColor, QImage, QPainter, QPainterPath, QPen, QPixmap, QRegion
+from PyQt5.QtWidgets import QWidget
+
+from . import channels, loader, memory, pixels, raw, resample, roi, thumbnails, tracing
+
+# Magnified regions kept per widget and region, those of the current and the
+# previous rectangle
+MAGNIFIER_CACHE_PER_ROI = 2
+# Size of the corner handles in widget pixels
+HANDLE_SIZE = 8
+# The loupe draws from tiles of the source image copied once and kept per widget
+LOUPE_TILE_SIZE = 256
+LOUPE_TILE_CACHE_SIZE = 16
+# Settings drawn into the base layer, the others only change what is drawn above it
+BASE_LAYER_SETTINGS = ('line_width', 'margin', 'show_magnified', 'channel_view')
+
+HANDLE_CURSORS = {
+    roi.MOVE: Qt.SizeAllCursor,
+    'top_left': Qt.SizeFDiagCursor,
+    'bottom_right': Qt.SizeFDiagCursor,
+    'top_right': Qt.SizeBDiagCursor,
+    'bottom_left': Qt.SizeBDiagCursor,
+}
+
+
+class ImageWidget(QWidget):
+    """Single image display widget"""
+
+    # A region was drawn, moved or resized, sent on every mouse move
+    rois_moved = pyqtSignal()
+    # A region was picked or added
+    rois_changed = pyqtSignal()
+    # The image point under the cursor, None when it leaves the image
+    hovered = pyqtSignal(object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.image_path = ""
+        self.original_pixmap = None
+        # Only kept for images with more than 8 bits per channel
+        self.original_image = None
+        self._pixel_view = None
+        self.preview_pixmap = None
+        self.preview_name = None
+        self.image_size = QSize()
+        self.display_pixmap = None
+        # Display pixmaps of the channel views shown at the current size
+        self.display_views = {}
+        self.view = channels.DEFAULT_VIEW
+        # (view, from original) -> full resolution QImage of a channel view
+        self.view_images = {}
+        self.scale_factor = 1.0
+        self.reload_requested = False
+        self.magnifier_cache = {}
+        self.loupe_tiles = {}
+        self.loupe_point = None
+        self.base_layer = None
+        self.base_key = None
+
+        # Shared by all widgets of a comparison
+        self.rois = roi.default_rois()
+        self.dragged_roi = None
+        self.drag_mode = None  # 'draw' or roi.MOVE
+        self.start_point = QPoint()
+
+        # Parameters settings
+        self.settings = {
+            'line_width': 4,
+            'margin': 10,
+        }
+
+        self.setMinimumSize(200, 200)
+        self.setMouseTracking(True)
+        loader.shared_loader().loaded.connect(self.on_original_loaded)
+        loader.shared_loader().previewed.connect(self.on_preview_loaded)
+
+    @tracing.traced
+    def set_image(self, image_path, image=None):
+        """Set the image, *image* is an already decoded QImage of it
+
+        Without *image*, large JPEGs show their EXIF thumbnail (or a scaled
+        decode) at once and are decoded in the background. RAW files show
+        their embedded preview, or a half size decode made in the background
+        when there is none, and are demosaiced once the full image is needed.
+        """
+        if image is None:
+            quick = thumbnails.quick_preview(image_path)
+            if quick is not None:
+                self.set_preview(image_path, *quick)
+                if not raw.is_raw(image_path):
+                    # Queued, so a whole set shows its previews before the decodes start
+                    QTimer.singleShot(0, self.request_original)
+                return
+            if raw.is_raw(image_path):
+                # Any RAW decode takes seconds, nothing is shown until it is done
+                self.set_image_async(image_path, preview=thumbnails.is_enabled() and raw.available())
+                return
+        self.image_path = image_path
+        self.preview_pixmap = None
+        self.preview_name = None
+        self.reload_requested = False
+        self.clear_magnified()
+        self.set_original(image if image is not None else loader.decode_image(image_path))
+        self.image_size = self.original_pixmap.size()
+        if not self.original_pixmap.isNull():
+            self.update_display()
+        else:
+            self.account_memory()
+
+    def set_preview(self, image_path, preview, image_size, preview_name=None):
+        """Show a cached preview, the full image is decoded once it is needed"""
+        self.image_path = image_path
+        self.set_original(None)
+        self.preview_pixmap = QPixmap.fromImage(preview)
+        self.preview_name = preview_name
+        self.image_size = image_size
+        self.clear_magnified()
+        self.update_display()
+
+    def set_image_async(self, image_path, preview=False):
+        """Set the image and decode it in the background, with *preview* only
+        the half size preview of a RAW file"""
+        self.image_path = image_path
+        self.set_original(None)
+        self.preview_pixmap = None
+        self.preview_name = None
+        self.image_size = QSize()
+        self.reload_requested = True
+        self.clear_magnified()
+        self.account_memory()
+        if preview:
+            loader.shared_loader().request_preview(image_path)
+        else:
+            loader.shared_loader().request(image_path)
+
+    def reload_image(self):
+        """Decode the image again in the background, keeping rects and settings"""
+        self.reload_requested = True
+        loader.shared_loader().request(self.image_path, refresh=True)
+
+    def request_original(self):
+        if self.original_pixmap is None and self.image_path:
+            loader.shared_loader().request(self.image_path)
+
+    def set_original(self, image):
+        """Hold the full resolution QImage *image*, None drops it"""
+        self.original_pixmap = QPixmap.fromImage(image) if image is not None else None
+        # Pixmaps have 8 bits per channel, deeper images are kept for the pixel values
+        self.original_image = image if pixels.is_deep(image) else None
+        self._pixel_view = None
+        self.view_images.clear()
+
+    def pixel_view(self):
+        """PixelView of the full resolution image, None while it is not decoded"""
+        if self._pixel_view is None:
+            if self.original_image is not None:
+                self._pixel_view = pixels.PixelView(self.original_image)
+            elif self.original_pixmap is not None and not self.original_pixmap.isNull():
+                # Shares the pixmap's buffer on the raster backend
+                self._pixel_view = pixels.PixelView(self.original_pixmap.toImage())
+        return self._pixel_view
+
+    def on_preview_loaded(self, path, image, image_size):
+        if path != self.image_path or self.original_pixmap is not None or self.preview_pixmap is not None:
+            return
+        if image.isNull():
+            # The full decode reports the error, if there is one
+            self.request_original()
+            return
+        self.set_preview(path, image, image_size)
+
+    def on_original_loaded(self, path, image):
+        if path != self.image_path or image.isNull():
+            return
+        if self.original_pixmap is not None and not self.reload_requested:
+            return
+        self.reload_requested = False
+        self.preview_pixmap = None
+        self.preview_name = None
+        self.set_original(image)
+        self.image_size = self.original_pixmap.size()
+        self.clear_magnified()
+        self.update_display()
+
+    @tracing.traced
+    def update_display(self):
+        self.display_views.clear()
+        self.scale_display()
+        self.update()
+
+    def scale_display(self):
+        source = self.original_pixmap or self.preview_pixmap
+        if source and not self.image_size.isEmpty():
+            widget_size = self.size()
+            pixmap_size = self.image_size
+
+            scale_x = widget_size.width() / pixmap_size.width()
+            scale_y = widget_size.height() / pixmap_size.height()
+            self.scale_factor = min(scale_x, scale_y, 1.0)
+
+            new_size = pixmap_size * self.scale_factor
+            if source is self.preview_pixmap and new_size.width() > source.width():
+                self.request_original()
+            if self.view == channels.RGB:
+                self.display_pixmap = source.scaled(
+                    new_size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+            else:
+                self.display_pixmap = QPixmap.fromImage(self.view_image(source is self.original_pixmap).scaled(
+                    new_size, Qt.KeepAspectRatio, Qt.SmoothTransformation))
+            self.display_views[self.view] = self.display_pixmap
+        self.account_memory()
+
+    def view_image(self, from_original):
+        """Full resolution QImage of the current channel view, of the preview if not *from_original*"""
+        key = (self.view, from_original)
+        image = self.view_images.get(key)
+        tracing.count('channel views', image is not None)
+        if image is None:
+            if from_original:
+                source = self.original_image if self.original_image is not None else self.original_pixmap.toImage()
+            else:
+                source = self.preview_pixmap.toImage()
+            with tracing.span('ImageWidget.view_image'):
+                image = channels.view_image(source, self.view)
+            self.view_images[key] = image
+            self.account_memory()
+        memory.shared_manager().touch(self, memory.CHANNELS)
+        return image
+
+    def set_view(self, view):
+        """Show the channel view *view* (see channels.py), at once if it was shown before"""
+        if view == self.view:
+            return
+        self.view = view
+        self.magnifier_cache.clear()
+        self.loupe_tiles.clear()
+        self.display_pixmap = self.display_views.get(view)
+        if self.display_pixmap is None:
+            self.scale_display()
+        self.update()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        if self.original_pixmap or self.preview_pixmap:
+            self.update_display()
+
+    def account_memory(self):
+        magnifier_bytes = sum(memory.pixmap_bytes(pixmap) for pixmap in self.magnifier_cache.values())
+        magnifier_bytes += sum(memory.pixmap_bytes(pixmap) for pixmap in self.loupe_tiles.values())
+        memory.shared_manager().account(self, {
+            memory.ORIGINAL: memory.pixmap_bytes(self.original_pixmap) + memory.pixmap_bytes(self.original_image),
+            memory.PREVIEW: memory.pixmap_bytes(self.preview_pixmap),
+            memory.DISPLAY: sum(memory.pixmap_bytes(pixmap) for pixmap in self.display_views.values())
+            + memory.pixmap_bytes(self.base_layer),
+            memory.MAGNIFIER: magnifier_bytes,
+            memory.CHANNELS: sum(memory.pixmap_bytes(image) for image in self.view_images.values()),
+        })
+
+    def clear_magnified(self):
+        self.magnifier_cache.clear()
+        self.loupe_tiles.clear()
+
+    def evict_representation(self, kind):
+        """Drop a representation for the memory manager, it is rebuilt when needed"""
+        if kind == memory.MAGNIFIER:
+            self.clear_magnified()
+        elif kind == memory.DISPLAY:
+            if not self.display_pixmap or not self.visibleRegion().isEmpty():
+                return False
+            self.display_pixmap = None
+            self.display_views.clear()
+            self.base_layer = None
+        elif kind == memory.CHANNELS:
+            if not self.view_images:
+                return False
+            self.view_images.clear()
+        elif kind == memory.ORIGINAL:
+            from .cache import PREVIEW_SIZE
+            if not self.original_pixmap or max(self.image_size.width(), self.image_size.height()) <= PREVIEW_SIZE:
+                return False
+            # Magnify a preview until the original is decoded again
+            self.preview_pixmap = self.original_pixmap.scaled(
+                PREVIEW_SIZE, PREVIEW_SIZE, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+            self.set_original(None)
+            self.clear_magnified()
+        else:
+            return False
+        self.account_memory()
+        return True
+
+    @tracing.traced
+    def mousePressEvent(self, event):
+        if not self.display_pixmap or event.button() != Qt.LeftButton:
+            return
+        pos = self.map_to_image_coords(event.pos())
+        if not pos:
+            return
+
+        region, handle = self.rois.hit_test(pos, HANDLE_SIZE / self.scale_factor)
+        if event.modifiers() & Qt.ShiftModifier:
+            region, handle = self.rois.new_roi(), None
+        elif region is None:
+            # Redraw the current region
+            region = self.rois.current or self.rois.new_roi()
+            region.enabled = True
+
+        if handle == roi.MOVE:
+            self.start_point = pos - region.rect.topLeft()
+        elif handle is not None:
+            self.start_point = roi.opposite_corner(region.rect, handle)
+        else:
+            self.start_point = pos
+        self.drag_mode = roi.MOVE if handle == roi.MOVE else 'draw'
+        self.dragged_roi = region
+        self.rois.dragging = region
+        self.rois.current = region
+        self.rois_changed.emit()
+
+    @tracing.traced
+    def mouseMoveEvent(self, event):
+        if not self.display_pixmap:
+            return
+
+        pos = self.map_to_image_coords(event.pos())
+        if self.dragged_roi is None:
+            self.update_cursor(pos)
+            self.hovered.emit(pos)
+            return
+        if not pos:
+            return
+
+        if self.drag_mode == roi.MOVE:
+            rect = QRect(pos - self.start_point, self.dragged_roi.rect.size())
+            rect.moveTo(max(0, min(rect.x(), self.image_size.width() - rect.width())),
+                        max(0, min(rect.y(), self.image_size.height() - rect.height())))
+        else:
+            rect = QRect(self.start_point, pos).normalized()
+        self.rois.set_rect(self.dragged_roi, rect)
+        self.update()
+        self.rois_moved.emit()
+
+    @tracing.traced
+    def mouseReleaseEvent(self, event):
+        if self.dragged_roi is None:
+            return
+        self.dragged_roi = None
+        self.drag_mode = None
+        # The inset goes back into the base layer of every image
+        self.rois.dragging = None
+        self.update()
+        self.rois_moved.emit()
+
+    def leaveEvent(self, event):
+        super().leaveEvent(event)
+        self.hovered.emit(None)
+
+    def update_cursor(self, pos):
+        handle = self.rois.hit_test(pos, HANDLE_SIZE / self.scale_factor)[1] if pos else None
+        if handle is None:
+            self.unsetCursor()
+        else:
+            self.setCursor(HANDLE_CURSORS[handle])
+
+    def map_to_image_coords(self, widget_pos):
+        if not self.display_pixmap:
+            return None
+
+
+        widget_size = self.size()
+        pixmap_size = self.display_pixmap.size()
+
+        x_offset = (widget_size.width() - pixmap_size.width()) // 2
+        y_offset = (widget_size.height() - pixmap_size.height()) // 2
+
+
+        image_x = (widget_pos.x() - x_offset) / self.scale_factor
+        image_y = (widget_pos.y() - y_offset) / self.scale_factor
+
+
+        if (0 <= image_x <= self.image_size.width() and
+                0 <= image_y <= self.image_size.height()):
+            return QPoint(int(image_x), int(image_y))
+        return None
+
+    def map_to_widget_coords(self, image_pos):
+        if not self.display_pixmap:
+            return None
+
+        widget_size = self.size()
+        pixmap_size = self.display_pixmap.size()
+
+        x_offset = (widget_size.width() - pixmap_size.width()) // 2
+        y_offset = (widget_size.height() - pixmap_size.height()) // 2
+
+        widget_x = image_pos.x() * self.scale_factor + x_offset
+        widget_y = image_pos.y() * self.scale_factor + y_offset
+
+        return QPoint(int(widget_x), int(widget_y))
+
+    def map_rect_to_image(self, widget_rect):
+        """Image area covered by *widget_rect*, not clipped to the image"""
+        widget_size = self.size()
+        pixmap_size = self.display_pixmap.size()
+
+        x_offset = (widget_size.width() - pixmap_size.width()) // 2
+        y_offset = (widget_size.height() - pixmap_size.height()) // 2
+
+        top_left = QPoint(int((widget_rect.left() - x_offset) / self.scale_factor),
+                          int((widget_rect.top() - y_offset) / self.scale_factor))
+        bottom_right = QPoint(int((widget_rect.right() + 1 - x_offset) / self.scale_factor) + 1,
+                              int((widget_rect.bottom() + 1 - y_offset) / self.scale_factor) + 1)
+        return QRect(top_left, bottom_right)
+
+    @tracing.traced
+    def paintEvent(self, event):
+        if not self.display_pixmap and (self.original_pixmap or self.preview_pixmap):
+            self.scale_display()
+        if not self.display_pixmap:
+            return
+        memory.shared_manager().touch(self, memory.DISPLAY)
+
+        insets = self.inset_rects()
+        dragged = [(region, inset) for region, inset in insets if region is self.rois.dragging]
+        static = [(region, inset) for region, inset in insets if region is not self.rois.dragging]
+        painter = QPainter(self)
+        painter.drawPixmap(event.rect(), self.base_layer_pixmap(static), event.rect())
+        painter.setRenderHint(QPainter.Antialiasing)
+
+        pen = QPen()
+        pen.setWidth(max(1, int(self.settings['line_width'] * self.scale_factor)))
+        # Half the inset border, in whole pixels
+        border = pen.width() // 2
+        if static:
+            # The outlines stay below the insets, like in the exports
+            visible = QRegion(event.rect())
+            for _, inset in static:
+                visible -= QRegion(inset.adjusted(-border, -border, border, border))
+            painter.setClipRegion(visible)
+
+        # Only the regions whose outline reaches into the repainted area
+        line_width = self.settings['line_width']
+        exposed = self.map_rect_to_image(event.rect()).adjusted(
+            -line_width, -line_width, line_width, line_width)
+        for region in self.rois.intersecting(exposed):
+            pen.setColor(region.color)
+            painter.setPen(pen)
+            widget_rect = self.map_rect_to_widget(region.rect)
+            if widget_rect:
+                painter.drawRect(widget_rect)
+        painter.setClipping(False)
+
+        for region, inset in dragged:
+            # Skip insets outside the repainted area without magnifying them
+            if inset.adjusted(-border - 1, -border - 1, border + 1, border + 1).intersects(event.rect()):
+                self.draw_magnified_region(painter, region, inset.topLeft())
+
+        loupe_rect = self.loupe_rect()
+        if loupe_rect is not None and loupe_rect.intersects(event.rect()):
+            self.draw_loupe(painter, loupe_rect)
+
+    def base_layer_pixmap(self, insets):
+        """The display image with the *insets* [(region, widget rect)], drawn again only if they changed"""
+        key = (self.display_pixmap.cacheKey(), self.width(), self.height(),
+               tuple((region.rect.getRect(), region.scale, region.resampling, region.color.rgba(),
+                      inset.getRect()) for region, inset in insets))
+        tracing.count('base layer', self.base_layer is not None and key == self.base_key)
+        if self.base_layer is None or key != self.base_key:
+            with tracing.span('ImageWidget.base_layer'):
+                layer = QPixmap(self.size())
+                layer.fill(Qt.transparent)
+                painter = QPainter(layer)
+                painter.setRenderHint(QPainter.Antialiasing)
+                painter.drawPixmap((self.width() - self.display_pixmap.width()) // 2,
+                                   (self.height() - self.display_pixmap.height()) // 2, self.display_pixmap)
+                for region, inset in insets:
+                    self.draw_magnified_region(painter, region, inset.topLeft())
+                painter.end()
+            self.base_layer = layer
+            self.base_key = key
+            self.account_memory()
+        return self.base_layer
+
+    def map_rect_to_widget(self, image_rect):
+
+        top_left = self.map_to_widget_coords(image_rect.topLeft())
+        bottom_right = self.map_to_widget_coords(image_rect.bottomRight())
+        if top_left and bottom_right:
+            return QRect(top_left, bottom_right)
+        return None
+
+    def inset_rects(self):
+        """[(region, widget rect of its inset)] of the shown insets"""
+        if not self.settings.get('show_magnified', True) or not (self.original_pixmap or self.preview_pixmap):
+            return []
+
+        regions = self.rois.active()
+        sizes = [roi.inset_size(region, self.image_size) for region in regions]
+        widget_size = self.size()
+        pixmap_size = self.display_pixmap.size()
+        offset = QPoint((widget_size.width() - pixmap_size.width()) // 2,
+                        (widget_size.height() - pixmap_size.height()) // 2)
+        origins = roi.inset_origins(sizes, [region.position for region in regions],
+                                    pixmap_size, self.settings['margin'])
+
+        return [(region, QRect(origin + offset, size))
+                for region, size, origin in zip(regions, sizes, origins) if not size.isEmpty()]
+
+    @tracing.traced
+    def draw_magnified_region(self, painter, region, origin):
+        source_rect = region.rect.intersected(QRect(0, 0,
+                                                    self.image_size.width(),
+                                                    self.image_size.height()))
+        if source_rect.isEmpty():
+            return
+
+        scale = region.scale
+        from_original = bool(self.original_pixmap)
+        manager = memory.shared_manager()
+        manager.touch(self, memory.ORIGINAL if from_original else memory.PREVIEW)
+        key = (source_rect.x(), source_rect.y(), source_rect.width(), source_rect.height(),
+               scale, region.resampling, from_original, self.view)
+        magnified = self.magnifier_cache.get(key)
+        if magnified is None:
+            crop_rect = source_rect
+            if not from_original:
+                # Magnify the preview until the full image has been decoded
+                self.request_original()
+                ratio = self.preview_pixmap.width() / self.image_size.width()
+                crop_rect = QRect(int(source_rect.x() * ratio), int(source_rect.y() * ratio),
+                                  max(1, round(source_rect.width() * ratio)),
+                                  max(1, round(source_rect.height() * ratio)))
+            if self.view != channels.RGB:
+                cropped = self.view_image(from_original).copy(crop_rect)
+            elif self.original_image is not None:
+                # Deep images are magnified from their own pixels, like in the exports
+                cropped = self.original_image.copy(crop_rect)
+            else:
+                cropped = (self.original_pixmap if from_original else self.preview_pixmap).copy(crop_rect).toImage()
+
+            # The same engine as the exports, so the inset matches them exactly
+            magnified = QPixmap.fromImage(resample.resample(
+                cropped, resample.scaled_size(source_rect.size(), scale), region.resampling))
+            self.magnifier_cache[key] = magnified
+            if len(self.magnifier_cache) > MAGNIFIER_CACHE_PER_ROI * max(1, len(self.rois)):
+                del self.magnifier_cache[next(iter(self.magnifier_cache))]
+            self.account_memory()
+        elif not from_original:
+            self.request_original()
+        manager.touch(self, memory.MAGNIFIER)
+
+
+        painter.drawPixmap(origin, magnified)
+
+
+        pen = QPen(region.color, max(1, int(self.settings['line_width'] * self.scale_factor)))
+        painter.setPen(pen)
+        painter.drawRect(origin.x(), origin.y(), magnified.width(), magnified.height())
+
+    def loupe_rect(self):
+        """Widget area of the loupe, None if it is not shown"""
+        if (self.loupe_point is None or not self.display_pixmap
+                or not self.settings.get('loupe_enabled', False)):
+            return None
+        center = self.map_to_widget_coords(self.loupe_point)
+        size = self.settings.get('loupe_size', 160)
+        return QRect(center.x() - size // 2, center.y() - size // 2, size, size)
+
+    def set_loupe_point(self, point):
+        """Show the loupe at *point* in image coordinates, None hides it"""
+        if point == self.loupe_point:
+            return
+        old_rect = self.loupe_rect()
+        self.loupe_point = point
+        # Repaint only where the loupe was and is now
+        for rect in (old_rect, self.loupe_rect()):
+            if rect is not None:
+                self.update(rect.adjusted(-2, -2, 2, 2))
+
+    def loupe_tile(self, source, column, row, from_original):
+        key = (column, row, from_original, self.view)
+        tile = self.loupe_tiles.pop(key, None)
+        tracing.count('loupe tiles', tile is not None)
+        if tile is not None:
+            # Most recently used last
+            self.loupe_tiles[key] = tile
+            return tile
+
+        tile = source.copy(QRect(column * LOUPE_TILE_SIZE, row * LOUPE_TILE_SIZE,
+                                 LOUPE_TILE_SIZE, LOUPE_TILE_SIZE).intersected(source.rect()))
+        if isinstance(tile, QImage):
+            tile = QPixmap.fromImage(tile)
+        if len(self.loupe_tiles) >= LOUPE_TILE_CACHE_SIZE:
+            del self.loupe_tiles[next(iter(self.loupe_tiles))]
+        self.loupe_tiles[key] = tile
+        self.account_memory()
+        return tile
+
+    @tracing.traced
+    def draw_loupe(self, painter, loupe_rect):
+        source = self.original_pixmap or self.preview_pixmap
+        if source is None:
+            return
+        from_original = source is self.original_pixmap
+        if not from_original:
+            self.request_original()
+        manager = memory.shared_manager()
+        manager.touch(self, memory.ORIGINAL if from_original else memory.PREVIEW)
+        manager.touch(self, memory.MAGNIFIER)
+        if self.view != channels.RGB:
+            source = self.view_image(from_original)
+
+        # Source pixels per image pixel, below 1 while only the preview is loaded
+        ratio = source.width() / self.image_size.width()
+        zoom = self.settings.get('loupe_zoom', 4.0)
+        # The hovered pixel is centred in the loupe
+        center = QPointF(loupe_rect.center()) + QPointF(0.5, 0.5)
+        point = QPointF(self.loupe_point) + QPointF(0.5, 0.5)
+        half = loupe_rect.width() / (2 * zoom)
+        visible = QRectF(point.x() - half, point.y() - half, 2 * half, 2 * half)
+        visible = QRectF(visible.topLeft() * ratio, visible.bottomRight() * ratio).intersected(
+            QRectF(0, 0, source.width(), source.height()))
+
+        painter.save()
+        outline = QPainterPath()
+        if self.settings.get('loupe_circle', False):
+            outline.addEllipse(QRectF(loupe_rect))
+        else:
+            outline.addRect(QRectF(loupe_rect))
+        painter.setClipPath(outline)
+        painter.fillRect(loupe_rect, QColor(0, 0, 0))
+
+        if not visible.isEmpty():
+            first_column, first_row = int(visible.left()) // LOUPE_TILE_SIZE, int(visible.top()) // LOUPE_TILE_SIZE
+            last_column = int(visible.right() - 1e-6) // LOUPE_TILE_SIZE
+            last_row = int(visible.bottom() - 1e-6) // LOUPE_TILE_SIZE
+            for row in range(first_row, last_row + 1):
+                for column in range(first_column, last_column + 1):
+                    tile = self.loupe_tile(source, column, row, from_original)
+                    tile_rect = QRectF(column * LOUPE_TILE_SIZE, row * LOUPE_TILE_SIZE,
+                                       tile.width(), tile.height())
+                    part = tile_rect.intersected(visible)
+                    if part.isEmpty():
+                        continue
+                    target = QRectF(center.x() + (part.left() / ratio - point.x()) * zoom,
+                                    center.y() + (part.top() / ratio - point.y()) * zoom,
+                                    part.width() / ratio * zoom, part.height() / ratio * zoom)
+                    painter.drawPixmap(target, tile, part.translated(-tile_rect.topLeft()))
+        painter.restore()
+
+        painter.setPen(QPen(QColor(255, 255, 255), 2))
+        painter.drawPath(outline)
+
+    def update_settings(self, settings):
+
+        if any(key in settings and settings[key] != self.settings.get(key) for key in BASE_LAYER_SETTINGS):
+            self.base_layer = None
+        self.settings.update(settings)
+        self.set_view(settings.get('channel_view', self.view))
+        self.update()
+
+    def set_rois(self, rois):
+        self.rois = rois
+        self.magnifier_cache.clear()
+        self.account_memory()
+        self.update()
@@ -0,0 +1,290 @@
+"""Background export queue
+
+Exports are split into jobs of output files. Jobs run one after another on a
+thread pool, report progress per file and can be cancelled. Every output
+folder keeps a manifest of the fingerprint each file was written with, so
+re-running an interrupted or repeated export only redoes files whose input
+or settings changed.
+"""
+import hashlib
+import json
+import os
+import re
+import time
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+from PyQt5.QtGui import QColor
+
+from . import channels, export, loader, memory, render, tracing
+from .cache import file_fingerprint
+
+MANIFEST_NAME = '.gict-export.json'
+# Settings render.render_full draws with, besides the export profile and the
+# channel view that every export depends on; the others leave full exports unchanged
+FULL_EXPORT_SETTINGS = ('line_width', 'margin', 'show_magnified')
+
+PENDING = 'pending'
+RUNNING = 'running'
+SAVED = 'saved'
+SKIPPED = 'skipped'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+
+def _jsonable(value):
+    if isinstance(value, QColor):
+        return value.name()
+    return value
+
+
+class ExportItem:
+    """One output file of an export job"""
+
+    def __init__(self, image_path, output_base, kind, rois, settings):
+        self.image_path = image_path
+        self.kind = kind  # 'full' or 'region'
+        self.rois = rois
+        self.settings = dict(settings)
+        self.profile_key = self.settings.get('export_profile', export.DEFAULT_PROFILE)
+        self.output_path = output_base + export.get_profile(self.profile_key).suffix
+        self.status = PENDING
+        self.message = ""
+
+    @property
+    def output_name(self):
+        return os.path.basename(self.output_path)
+
+    def fingerprint(self):
+        relevant = {'export_profile': self.profile_key,
+                    'channel_view': self.settings.get('channel_view', channels.RGB)}
+        if self.kind == 'full':
+            relevant.update((key, _jsonable(self.settings.get(key))) for key in FULL_EXPORT_SETTINGS)
+        data = {
+            'input': file_fingerprint(self.image_path),
+            'kind': self.kind,
+            'rois': [roi.to_json() for roi in self.rois if roi.is_active()],
+            'settings': relevant,
+        }
+        return hashlib.sha1(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+    def render(self, image):
+        image = channels.view_image(image, self.settings.get('channel_view', channels.RGB))
+        if self.kind == 'full':
+            return render.render_full(image, self.rois, self.settings,
+                                      deep=export.get_profile(self.profile_key).depth == 16)
+        roi = self.rois[0]
+        return render.magnify(image, roi.rect, roi.scale, roi.resampling)
+
+
+def file_label(name):
+    """*name* made safe for a file name"""
+    return re.sub(r'[^\w.-]+', '_', name).strip('.') or '_'
+
+
+def full_export_items(widgets, folder, rois, settings):
+    """Items for saving every image with its annotations"""
+    rois = [roi.copy() for roi in rois]
+    items = []
+    for widget in widgets:
+        if not widget.image_path:
+            continue
+        base_name = os.path.splitext(os.path.basename(widget.image_path))[0]
+        items.append(ExportItem(
+            widget.image_path, os.path.join(folder, f"{base_name}_processed"), 'full',
+            rois, settings))
+    return items
+
+
+def region_export_items(widgets, folder, rois, settings):
+    """Items for saving the magnified regions of every image, named after the regions"""
+    rois = [roi.copy() for roi in rois if roi.is_active()]
+    items = []
+    for widget in widgets:
+        if not widget.image_path:
+            continue
+        base_name = os.path.splitext(os.path.basename(widget.image_path))[0]
+        for roi in rois:
+            items.append(ExportItem(
+                widget.image_path, os.path.join(folder, f"{base_name}_{file_label(roi.name)}"),
+                'region', [roi], settings))
+    return items
+
+
+class _Signals(QObject):
+    item_status = pyqtSignal(int, str, str)
+
+
+class _SourceRunnable(QRunnable):
+    """Decode one source image and write all of its pending outputs"""
+
+    def __init__(self, job, indexes):
+        super().__init__()
+        self.job = job
+        self.indexes = indexes
+
+    def run(self):
+        image = None
+        for index in self.indexes:
+            item = self.job.items[index]
+            if self.job.cancelled:
+                self.job.signals.item_status.emit(index, CANCELLED, "")
+                continue
+
+            self.job.signals.item_status.emit(index, RUNNING, "")
+            try:
+                if image is None:
+                    with tracing.span('export.decode'):
+                        image = loader.decode_image(item.image_path)
+                    if image.isNull():
+                        raise IOError(f"cannot read {item.image_path}")
+                    memory.shared_manager().account(self, {memory.EXPORT: image.sizeInBytes()})
+                with tracing.span('export.render'):
+                    rendered = item.render(image)
+                if rendered is None:
+                    raise ValueError("empty region")
+                with tracing.span('export.write'):
+                    export.write_image(rendered, os.path.splitext(item.output_path)[0],
+                                       item.profile_key)
+            except Exception as e:
+                self.job.signals.item_status.emit(index, FAILED, str(e))
+            else:
+                self.job.signals.item_status.emit(index, SAVED, "")
+        if image is not None:
+            memory.shared_manager().account(self, {memory.EXPORT: 0})
+
+
+class ExportJob(QObject):
+    """A batch of output files written into one folder"""
+
+    item_changed = pyqtSignal(int)
+    progress = pyqtSignal(int, int, float)  # done, total, images per second
+    finished = pyqtSignal()
+
+    def __init__(self, folder, items, parent=None):
+        super().__init__(parent)
+        self.folder = folder
+        self.items = items
+        self.cancelled = False
+        self.done = 0
+        self.start_time = None
+        self.fingerprints = {}
+        self.manifest = {}
+        self.signals = _Signals()
+        self.signals.item_status.connect(self.on_item_status)
+
+    def counts(self):
+        counts = {}
+        for item in self.items:
+            counts[item.status] = counts.get(item.status, 0) + 1
+        return counts
+
+    def images_per_second(self):
+        written = self.counts().get(SAVED, 0)
+        elapsed = time.perf_counter() - self.start_time if self.start_time else 0
+        return written / elapsed if elapsed > 0 else 0.0
+
+    def manifest_path(self):
+        return os.path.join(self.folder, MANIFEST_NAME)
+
+    def load_manifest(self):
+        try:
+            with open(self.manifest_path(), encoding='utf-8') as f:
+                self.manifest = json.load(f)
+        except (OSError, ValueError):
+            self.manifest = {}
+
+    def save_manifest(self):
+        tmp_path = self.manifest_path() + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.manifest, f, indent=1, sort_keys=True)
+            os.replace(tmp_path, self.manifest_path())
+        except OSError:
+            pass
+
+    def start(self, pool):
+        self.start_time = time.perf_counter()
+        self.load_manifest()
+
+        by_source = {}
+        for index, item in enumerate(self.items):
+            fingerprint = item.fingerprint()
+            self.fingerprints[index] = fingerprint
+            if (self.manifest.get(item.output_name) == fingerprint and
+                    os.path.exists(item.output_path)):
+                tracing.count('export manifest', True)
+                self.set_status(index, SKIPPED)
+            else:
+                tracing.count('export manifest', False)
+                by_source.setdefault(item.image_path, []).append(index)
+
+        if not by_source:
+            self.finished.emit()
+            return
+
+        for indexes in by_source.values():
+            pool.start(_SourceRunnable(self, indexes))
+
+    def cancel(self):
+        self.cancelled = True
+
+    def set_status(self, index, status, message=""):
+        item = self.items[index]
+        item.status = status
+        item.message = message
+        if status not in (PENDING, RUNNING):
+            self.done += 1
+        self.item_changed.emit(index)
+        self.progress.emit(self.done, len(self.items), self.images_per_second())
+
+    def on_item_status(self, index, status, message):
+        self.set_status(index, status, message)
+        if status == SAVED:
+            self.manifest[self.items[index].output_name] = self.fingerprints[index]
+            self.save_manifest()
+        if self.done == len(self.items):
+            self.finished.emit()
+
+
+class ExportQueue(QObject):
+    """Runs export jobs one at a time on a background thread pool"""
+
+    job_started = pyqtSignal(object)
+    job_finished = pyqtSignal(object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.jobs = []
+        self.current = None
+
+    def submit(self, job):
+        job.setParent(self)
+        self.jobs.append(job)
+        if self.current is None:
+            self.start_next()
+        return job
+
+    def start_next(self):
+        if not self.jobs:
+            self.current = None
+            return
+        self.current = self.jobs.pop(0)
+        self.current.finished.connect(self.on_job_finished)
+        self.job_started.emit(self.current)
+        self.current.start(self.pool)
+
+    def on_job_finished(self):
+        job = self.current
+        self.job_finished.emit(job)
+        job.deleteLater()
+        self.start_next()
+
+    def cancel_all(self):
+        for job in self.jobs:
+            job.cancel()
+        if self.current is not None:
+            self.current.cancel()
+
+    def is_busy(self):
+        return self.current is not None
@@ -0,0 +1,120 @@
+"""Background decoding of full resolution images"""
+from PyQt5.QtCore import QCoreApplication, QObject, QRunnable, QSize, QThreadPool, pyqtSignal
+from PyQt5.QtGui import QImage
+
+from . import decoders, raw
+
+
+def decode_image(path):
+    """Decode *path* into a QImage (null if it cannot be read), turned by
+    its EXIF orientation, with the backend chosen for its format (see decoders.py)"""
+    return decoders.decode(path)
+
+
+class _LoadRunnable(QRunnable):
+
+    def __init__(self, loader, path):
+        super().__init__()
+        self.loader = loader
+        self.path = path
+
+    def run(self):
+        self.loader.decoded.emit(self.path, decode_image(self.path))
+
+
+class _PreviewRunnable(QRunnable):
+
+    def __init__(self, loader, path):
+        super().__init__()
+        self.loader = loader
+        self.path = path
+
+    def run(self):
+        quick = raw.quick_preview(self.path)
+        image, size = quick if quick is not None else (QImage(), QSize())
+        self.loader._previewed.emit(self.path, image, size)
+
+
+class ImageLoader(QObject):
+    """Decodes images on a background thread pool, each path once at a time
+
+    Python runnables must not use QThreadPool.globalInstance(): Qt scales and
+    converts images on that pool while the calling thread holds the GIL.
+
+    With set_processes(True) the files are decoded in worker processes
+    instead (see workers.py); requests are then served in submission order.
+    Previews of RAW files (see raw.quick_preview) are always decoded on the
+    thread pool.
+    """
+
+    decoded = pyqtSignal(str, QImage)
+    loaded = pyqtSignal(str, QImage)
+    # path, preview (null if the file cannot be read), full image size
+    previewed = pyqtSignal(str, QImage, QSize)
+    _previewed = pyqtSignal(str, QImage, QSize)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pending = {}  # path -> decode again once the running one is done
+        self.previewing = set()
+        self.processes = None
+        self.use_processes = False
+        self.decoded.connect(self.on_decoded)
+        self._previewed.connect(self.on_previewed)
+
+    def set_processes(self, enabled):
+        """Decode in worker processes; False if they are not available"""
+        if enabled and self.processes is None:
+            from . import workers
+            if not workers.available():
+                return False
+            self.processes = workers.ProcessDecoder(parent=self)
+            self.processes.decoded.connect(self.on_decoded)
+            self.processes.start()
+            if QCoreApplication.instance() is not None:
+                QCoreApplication.instance().aboutToQuit.connect(self.processes.shutdown)
+        self.use_processes = enabled
+        return True
+
+    def request(self, path, refresh=False, priority=0):
+        """Decode *path*; with *refresh* a decode that is already running is
+        considered stale and repeated"""
+        if not path:
+            return
+        if path in self.pending:
+            self.pending[path] = self.pending[path] or refresh
+            return
+        self.pending[path] = False
+        if self.use_processes:
+            self.processes.submit(path)
+        else:
+            self.pool.start(_LoadRunnable(self, path), priority)
+
+    def request_preview(self, path):
+        """Decode the half size preview of the RAW file *path*"""
+        if path and path not in self.previewing:
+            self.previewing.add(path)
+            # Ahead of full decodes, the preview is what the user waits for
+            self.pool.start(_PreviewRunnable(self, path), 1)
+
+    def on_previewed(self, path, image, size):
+        self.previewing.discard(path)
+        self.previewed.emit(path, image, size)
+
+    def on_decoded(self, path, image):
+        if self.pending.pop(path, False):
+            self.request(path)
+            return
+        self.loaded.emit(path, image)
+
+
+_shared_loader = None
+
+
+def shared_loader():
+    """The loader shared by all image widgets (create it in the GUI thread)"""
+    global _shared_loader
+    if _shared_loader is None:
+        _shared_loader = ImageLoader()
+    return _shared_loader
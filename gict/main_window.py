@@ -0,0 +1,575 @@
+"""Main window: the image grid, the settings panel and the comparison modes
+
+Subsystems that are not needed to show the first frame (export queue,
+preview cache, set prefetcher, watch folder, sequences, sessions, the timing
+overlay, the disagreement map, the similarity and scene indexes) are
+imported and built on first use.
+"""
+import os
+import re
+
+from PyQt5.QtCore import QEvent, QSize, Qt, QTimer
+from PyQt5.QtGui import QGuiApplication, QKeySequence
+from PyQt5.QtWidgets import (QFileDialog, QGridLayout, QHBoxLayout, QLabel, QMainWindow,
+                             QMessageBox, QScrollArea, QShortcut, QVBoxLayout, QWidget)
+
+from . import loader, memory, roi, tracing
+from .image_widget import ImageWidget
+from .settings_panel import SettingsPanel
+from .strings import tr
+
+
+class MainWindow(QMainWindow):
+    def __init__(self):
+        super().__init__()
+        self.image_widgets = []
+        self.current_settings = {}
+        self.rois = roi.default_rois()
+        self.hover_point = None
+        self._export_queue = None
+        self._preview_cache = None
+        self._set_prefetcher = None
+        self._disagreement_map = None
+        self._similar_indexer = None
+        self._scene_indexer = None
+        self.analysis_widget = None
+        self.folder_watcher = None
+        self.set_navigator = None
+        self.sequence_player = None
+        self.trace_overlay = None
+        self.memory_manager = memory.shared_manager()
+        self.memory_manager.set_budget(4096 * 1024 * 1024)
+        self.init_ui()
+
+    @property
+    def export_queue(self):
+        if self._export_queue is None:
+            from . import jobs
+            self._export_queue = jobs.ExportQueue(self)
+            self._export_queue.job_started.connect(self.settings_panel.show_export_job)
+            self._export_queue.job_finished.connect(self.settings_panel.export_job_finished)
+        return self._export_queue
+
+    @property
+    def preview_cache(self):
+        if self._preview_cache is None:
+            from .cache import PreviewCache
+            self._preview_cache = PreviewCache()
+        return self._preview_cache
+
+    @property
+    def set_prefetcher(self):
+        if self._set_prefetcher is None:
+            from . import sets
+            budget = self.settings_panel.prefetch_budget_spin.value() * 1024 * 1024
+            self._set_prefetcher = sets.SetPrefetcher(loader.shared_loader(), budget, self)
+        return self._set_prefetcher
+
+    @property
+    def disagreement_map(self):
+        if self._disagreement_map is None:
+            from . import analysis
+            self._disagreement_map = analysis.DisagreementMap(self)
+            self._disagreement_map.progress.connect(self.settings_panel.show_analysis_progress)
+            self._disagreement_map.ready.connect(self.show_disagreement_map)
+            self._disagreement_map.failed.connect(self.settings_panel.show_analysis_failed)
+        return self._disagreement_map
+
+    @property
+    def similar_indexer(self):
+        if self._similar_indexer is None:
+            from . import hashindex
+            self._similar_indexer = hashindex.Indexer(self)
+            self._similar_indexer.progress.connect(self.settings_panel.show_indexing_progress)
+            self._similar_indexer.finished.connect(self.show_similar_sets)
+            self._similar_indexer.failed.connect(self.settings_panel.show_indexing_failed)
+        return self._similar_indexer
+
+    @property
+    def scene_indexer(self):
+        if self._scene_indexer is None:
+            from . import sets
+            self._scene_indexer = sets.SceneIndexer(self)
+            self._scene_indexer.finished.connect(self.show_scene_table)
+            self._scene_indexer.failed.connect(self.settings_panel.show_indexing_failed)
+        return self._scene_indexer
+
+    def init_ui(self):
+        self.setWindowTitle(tr("General Image Comparison Tool"))
+        self.setGeometry(500, 500, 2500, 800)
+
+        central_widget = QWidget()
+        self.setCentralWidget(central_widget)
+
+        main_layout = QHBoxLayout(central_widget)
+
+        self.image_area = QScrollArea()
+        self.image_container = QWidget()
+        self.image_layout = QGridLayout(self.image_container)
+        self.image_layout.setSpacing(5)
+
+        self.image_area.setWidget(self.image_container)
+        self.image_area.setWidgetResizable(True)
+        main_layout.addWidget(self.image_area, 3)
+
+        self.settings_panel = SettingsPanel(self)
+        self.settings_panel.settings_changed.connect(self.update_all_settings)
+        self.settings_panel.rois_changed.connect(self.refresh_rois)
+        settings_area = QScrollArea()
+        settings_area.setWidget(self.settings_panel)
+        settings_area.setWidgetResizable(True)
+        main_layout.addWidget(settings_area, 1)
+
+        # Hover updates are coalesced to one per display frame
+        screen = QGuiApplication.primaryScreen()
+        refresh_rate = screen.refreshRate() if screen else 0
+        self.hover_timer = QTimer(self)
+        self.hover_timer.setSingleShot(True)
+        self.hover_timer.setInterval(int(1000 / refresh_rate) if refresh_rate > 0 else 16)
+        self.hover_timer.timeout.connect(self.show_hover)
+
+        # The disagreement map follows the images once they stop changing
+        self.analysis_timer = QTimer(self)
+        self.analysis_timer.setSingleShot(True)
+        self.analysis_timer.setInterval(300)
+        self.analysis_timer.timeout.connect(self.run_analysis)
+        loader.shared_loader().loaded.connect(self.schedule_analysis)
+
+        QShortcut(QKeySequence(Qt.Key_PageDown), self, lambda: self.step_set(1))
+        QShortcut(QKeySequence(Qt.Key_PageUp), self, lambda: self.step_set(-1))
+
+        self.memory_manager.changed.connect(self.settings_panel.schedule_memory_usage)
+        self.memory_manager.over_budget.connect(self.settings_panel.show_over_budget)
+
+        # init
+        self.settings_panel.show_rois(self.rois)
+        self.settings_panel.emit_settings()
+
+    def event(self, event):
+        # one UpdateRequest repaints every dirty widget, i.e. one frame
+        if event.type() == QEvent.UpdateRequest:
+            with tracing.span('MainWindow.frame'):
+                return super().event(event)
+        return super().event(event)
+
+    def show_trace_overlay(self, visible):
+        if self.trace_overlay is None:
+            from .overlay import TraceOverlay
+            self.trace_overlay = TraceOverlay(lambda: self.image_widgets, self.image_area)
+            self.trace_overlay.move(8, 8)
+        if visible and not tracing.is_enabled():
+            self.settings_panel.trace_check.setChecked(True)
+        self.trace_overlay.setVisible(visible)
+
+    def load_images(self, file_paths, restored=None):
+        self.clear_image_widgets()
+
+        # Worker processes decode the whole set in parallel
+        decode_async = loader.shared_loader().use_processes
+        for i, file_path in enumerate(file_paths):
+            image_widget, label = self.add_image_widget(file_path)
+            if restored is None and decode_async:
+                image_widget.set_image_async(file_path)
+            elif restored is None:
+                image_widget.set_image(file_path)
+            else:
+                self.restore_session_entry(image_widget, label, restored.entries[i])
+            image_widget.update_settings(self.current_settings)
+
+        self.layout_image_widgets()
+        self.schedule_analysis()
+
+    def tiles(self):
+        """The image widgets followed by the disagreement map, if it is shown"""
+        if self.analysis_widget is None:
+            return list(self.image_widgets)
+        return self.image_widgets + [self.analysis_widget]
+
+    def clear_image_widgets(self):
+        for widget in self.image_widgets:
+            memory.shared_manager().forget(widget)
+            widget.parentWidget().setParent(None)
+        self.image_widgets.clear()
+
+    def add_image_widget(self, file_path):
+        image_widget, label = self.create_tile(os.path.basename(file_path))
+        self.image_widgets.append(image_widget)
+        return image_widget, label
+
+    def create_tile(self, title):
+        container = QWidget(self.image_container)
+        container_layout = QVBoxLayout(container)
+        container_layout.setContentsMargins(2, 2, 2, 2)
+        container_layout.setSpacing(2)
+
+        label = QLabel(title)
+        label.setAlignment(Qt.AlignCenter)
+        label.setStyleSheet("font-weight: bold; padding: 2px;")
+        container_layout.addWidget(label)
+
+
+        image_widget = ImageWidget()
+        image_widget.rois = self.rois
+        image_widget.rois_moved.connect(lambda: self.sync_rois(image_widget))
+        image_widget.rois_changed.connect(self.rois_picked)
+        image_widget.hovered.connect(self.hover_moved)
+
+        container_layout.addWidget(image_widget, 1)
+        return image_widget, label
+
+    def rebuild_image_widgets(self, file_paths, cols=None):
+        """Replace the widgets without decoding anything, keeping the regions"""
+        self.clear_image_widgets()
+        for file_path in file_paths:
+            image_widget, _ = self.add_image_widget(file_path)
+            image_widget.update_settings(self.current_settings)
+        self.layout_image_widgets(cols)
+
+    def layout_image_widgets(self, cols=None):
+        count = len(self.image_widgets)
+        if count == 0:
+            return
+
+        cols = cols or min(3, count)
+        for i, widget in enumerate(self.tiles()):
+            container = widget.parentWidget()
+            self.image_layout.removeWidget(container)
+            self.image_layout.addWidget(container, i // cols, i % cols)
+
+    def reset_modes(self):
+        """Leave the watch folder, comparison set and sequence modes"""
+        self.stop_watching()
+        self.close_sets()
+        self.close_sequences()
+
+    def watch_folder(self, folder, pattern):
+        from . import watch
+        self.reset_modes()
+        self.folder_watcher = watch.FolderWatcher(folder, pattern, parent=self)
+        self.folder_watcher.file_changed.connect(self.reload_watched_image)
+        self.folder_watcher.file_added.connect(self.add_watched_image)
+        self.settings_panel.show_watch_status(self.folder_watcher)
+        self.load_images(self.folder_watcher.matching_files())
+
+    def stop_watching(self):
+        if self.folder_watcher is None:
+            return
+        self.folder_watcher.stop()
+        self.folder_watcher.deleteLater()
+        self.folder_watcher = None
+        self.settings_panel.show_watch_status(None)
+
+    def open_sets(self, root, key_pattern=None):
+        """Match the scenes of the method folders of *root*, in the background"""
+        try:
+            re.compile(key_pattern or '')
+        except re.error as e:
+            QMessageBox.warning(self, tr("Warning!"), tr("Invalid scene key: {error}", error=e))
+            return
+        self.settings_panel.show_indexing_started()
+        self.scene_indexer.start(root, key_pattern)
+
+    def open_report(self, path):
+        """Browse the pairs of a regression report (see regression.py), most changed first"""
+        from . import regression
+        try:
+            found = regression.load_report(path)
+        except (OSError, ValueError, KeyError) as e:
+            QMessageBox.warning(self, tr("Warning!"), tr("Cannot open the report: {error}", error=e))
+            return
+        self.show_sets(found)
+
+    def show_scene_table(self, table):
+        self.settings_panel.show_set_status(self.set_navigator)
+        self.show_sets(table.sets())
+
+    def open_similar_sets(self, folders, method, threshold):
+        """Group the images below *folders* by content, in the background"""
+        self.similar_indexer.start(folders, method, threshold)
+
+    def show_similar_sets(self, found):
+        self.settings_panel.show_set_status(self.set_navigator)
+        self.show_sets(found)
+
+    def show_sets(self, found):
+        """Browse *found*, [(key, [paths])], one set at a time"""
+        from . import sets
+        if not found:
+            QMessageBox.warning(self, tr("Warning!"), tr("No comparison sets found"))
+            return
+
+        self.reset_modes()
+        self.set_navigator = sets.SetNavigator(found, self.set_prefetcher, parent=self)
+        self.set_navigator.current_changed.connect(self.show_comparison_set)
+        self.settings_panel.show_set_keys([key for key, _ in found])
+        self.set_navigator.go_to(0)
+
+    def close_sets(self):
+        if self.set_navigator is None:
+            return
+        self.set_navigator.deleteLater()
+        self.set_navigator = None
+        self.set_prefetcher.clear()
+        self.settings_panel.show_set_status(None)
+
+    def step_set(self, step):
+        if self.set_navigator is not None:
+            self.set_navigator.go_to(self.set_navigator.index + step)
+
+    def go_to_set(self, index):
+        if self.set_navigator is not None and index != self.set_navigator.index:
+            self.set_navigator.go_to(index)
+
+    def set_process_decoding(self, enabled):
+        if not loader.shared_loader().set_processes(enabled):
+            QMessageBox.warning(self, tr("Warning!"),
+                                tr("Worker processes need Python's multiprocessing.shared_memory"))
+            self.settings_panel.process_decode_check.setChecked(False)
+
+    def set_prefetch_budget(self, megabytes):
+        if self._set_prefetcher is not None:
+            self._set_prefetcher.set_budget(megabytes * 1024 * 1024)
+
+    def set_memory_budget(self, megabytes):
+        self.memory_manager.set_budget(megabytes * 1024 * 1024)
+
+    def show_comparison_set(self, index):
+        key, paths = self.set_navigator.current()
+        self.set_prefetcher.prefetch(paths, priority=1)
+
+        if len(paths) != len(self.image_widgets):
+            self.rebuild_image_widgets(paths)
+
+        for widget, path in zip(self.image_widgets, paths):
+            label = widget.parentWidget().findChild(QLabel)
+            label.setText(os.path.join(os.path.basename(os.path.dirname(path)), os.path.basename(path)))
+            image = self.set_prefetcher.get(path)
+            if image is not None:
+                widget.set_image(path, image)
+            else:
+                widget.set_image_async(path)
+
+        self.settings_panel.show_set_status(self.set_navigator)
+        self.schedule_analysis()
+
+    def open_sequences(self, sources):
+        from . import sequence
+        frames = [sequence.resolve_frames(source) for source in sources]
+        empty = [source for source, paths in zip(sources, frames) if not paths]
+        if not sources or empty:
+            QMessageBox.warning(self, tr("Warning!"), tr("No frames found in: {sources}", sources=", ".join(empty)))
+            return
+
+        self.reset_modes()
+        self.rebuild_image_widgets([paths[0] for paths in frames], cols=len(frames))
+        for widget, source in zip(self.image_widgets, sources):
+            label = widget.parentWidget().findChild(QLabel)
+            label.setText(sequence.sequence_name(source))
+
+        self.sequence_player = sequence.SequencePlayer(
+            frames, fps=self.settings_panel.fps_spin.value(), parent=self)
+        self.sequence_player.frame_shown.connect(self.show_sequence_frame)
+        self.settings_panel.show_sequence_player(self.sequence_player)
+        self.sequence_player.seek(0)
+
+    def close_sequences(self):
+        if self.sequence_player is None:
+            return
+        self.sequence_player.stop()
+        self.sequence_player.deleteLater()
+        self.sequence_player = None
+        self.settings_panel.show_sequence_player(None)
+
+    def show_sequence_frame(self, position, index, path, image):
+        if index < len(self.image_widgets):
+            self.image_widgets[index].set_image(path, image)
+
+    def reload_watched_image(self, path):
+        for widget in self.image_widgets:
+            if os.path.abspath(widget.image_path) == path:
+                widget.reload_image()
+
+    def add_watched_image(self, path):
+        image_widget, _ = self.add_image_widget(path)
+        image_widget.update_settings(self.current_settings)
+        image_widget.set_image_async(path)
+        self.layout_image_widgets()
+
+    def restore_session_entry(self, image_widget, label, entry):
+        filename = os.path.basename(entry.path)
+        preview = None
+        if not entry.exists():
+            label.setText(tr("{filename} (missing)", filename=filename))
+        elif entry.is_changed():
+            label.setText(tr("{filename} (changed since the session was saved)", filename=filename))
+        else:
+            preview = self.preview_cache.get(entry.preview)
+
+        if preview is None:
+            image_widget.set_image(entry.path)
+        else:
+            image_widget.set_preview(entry.path, preview,
+                                     QSize(entry.width, entry.height), entry.preview)
+
+    def open_session(self, path):
+        from . import session
+        try:
+            restored = session.load_session(path)
+        except ValueError as e:
+            QMessageBox.warning(self, tr("Warning!"), str(e))
+            return
+
+        self.reset_modes()
+        self.set_rois(restored.rois)
+        self.settings_panel.apply_settings(restored.settings)
+        self.load_images(restored.file_paths, restored)
+
+    def save_session(self, path):
+        if not self.image_widgets:
+            QMessageBox.warning(self, tr("Warning!"), tr("Image not loaded"))
+            return
+
+        from . import session
+        try:
+            session.save_session(path, self.image_widgets, self.rois, self.current_settings,
+                                 self.preview_cache)
+        except OSError as e:
+            QMessageBox.warning(self, tr("Warning!"), tr("Cannot save the session: {error}", error=e))
+
+    def set_rois(self, rois):
+        """Replace the regions of every image"""
+        self.rois = rois
+        for widget in self.tiles():
+            widget.set_rois(rois)
+        self.settings_panel.show_rois(rois)
+
+    @tracing.traced(name='MainWindow.sync_rois')
+    def sync_rois(self, source_widget):
+        # The regions are shared, the other images only need a repaint
+        for widget in self.tiles():
+            if widget is not source_widget:
+                widget.update()
+
+    def rois_picked(self):
+        self.settings_panel.show_rois(self.rois)
+        self.refresh_rois()
+
+    def refresh_rois(self):
+        for widget in self.tiles():
+            widget.update()
+
+    def hover_moved(self, point):
+        self.hover_point = point
+        if not self.hover_timer.isActive():
+            self.hover_timer.start()
+
+    @tracing.traced
+    def show_hover(self):
+        for widget in self.tiles():
+            widget.set_loupe_point(self.hover_point)
+        if self.current_settings.get('pixel_readout', False):
+            self.settings_panel.show_pixel_values(self.hover_point, self.read_pixels(self.hover_point))
+
+    def read_pixels(self, point):
+        """(file name, channel values or None, bit depth) of every image at *point*"""
+        rows = []
+        for widget in self.image_widgets:
+            view = widget.pixel_view() if point is not None else None
+            values = view.value(point.x(), point.y()) if view is not None else None
+            rows.append((os.path.basename(widget.image_path), values, view.depth if view else 8))
+        return rows
+
+    def update_all_settings(self, settings):
+
+        self.current_settings = settings
+        for widget in self.tiles():
+            widget.update_settings(settings)
+
+    def schedule_analysis(self):
+        if self.settings_panel.analysis_check.isChecked():
+            self.analysis_timer.start()
+
+    def show_analysis(self, visible):
+        if not visible:
+            self.analysis_timer.stop()
+            if self._disagreement_map is not None:
+                self._disagreement_map.cancel()
+            self.remove_analysis_tile()
+            self.settings_panel.show_analysis_status("")
+            return
+
+        from . import analysis
+        if not analysis.available():
+            QMessageBox.warning(self, tr("Warning!"), tr("The disagreement map needs numpy"))
+            self.settings_panel.analysis_check.setChecked(False)
+            return
+        self.run_analysis()
+
+    @tracing.traced
+    def run_analysis(self):
+        if not self.settings_panel.analysis_check.isChecked():
+            return
+        widgets = [widget for widget in self.image_widgets if widget.image_path]
+        if len(widgets) < 2:
+            self.remove_analysis_tile()
+            self.settings_panel.show_analysis_status(tr("Load at least two images"))
+            return
+
+        # Decoded images are shared with the widgets, the others are decoded by the workers
+        sources = []
+        for widget in widgets:
+            view = widget.pixel_view()
+            sources.append(view.image if view is not None else widget.image_path)
+        self.disagreement_map.compute([widget.image_path for widget in widgets], sources,
+                                      self.settings_panel.analysis_mode_combo.currentData())
+
+    def show_disagreement_map(self, image, maximum, scale):
+        if not self.settings_panel.analysis_check.isChecked():
+            return
+        if self.analysis_widget is None:
+            self.analysis_widget, _ = self.create_tile(tr("Disagreement map"))
+            self.layout_image_widgets()
+        self.analysis_widget.set_image("", image)
+        self.analysis_widget.update_settings(self.current_settings)
+        self.settings_panel.show_analysis_status(
+            tr("Largest difference {maximum:.1f}, colours scaled to {scale:.1f}",
+               maximum=maximum, scale=scale))
+
+    def remove_analysis_tile(self):
+        if self.analysis_widget is None:
+            return
+        memory.shared_manager().forget(self.analysis_widget)
+        self.analysis_widget.parentWidget().setParent(None)
+        self.analysis_widget = None
+
+    @tracing.traced
+    def save_images(self):
+
+        if not self.image_widgets:
+            QMessageBox.warning(self, tr("Warning!"), tr("Image not loaded"))
+            return
+
+        folder = QFileDialog.getExistingDirectory(self, tr("Choose the save folder"))
+        if not folder:
+            return
+
+        from . import jobs
+        items = jobs.full_export_items(self.image_widgets, folder, self.rois, self.current_settings)
+        self.export_queue.submit(jobs.ExportJob(folder, items))
+
+    @tracing.traced
+    def save_local_images(self):
+        if not self.image_widgets:
+            QMessageBox.warning(self, tr("Warning!"), tr("Image not loaded"))
+            return
+
+        folder = QFileDialog.getExistingDirectory(self, tr("Choose the save folder"))
+        if not folder:
+            return
+
+        from . import jobs
+        items = jobs.region_export_items(self.image_widgets, folder, self.rois, self.current_settings)
+        if not items:
+            QMessageBox.warning(self, tr("Warning!"), tr("No region selected"))
+            return
+        self.export_queue.submit(jobs.ExportJob(folder, items))
@@ -0,0 +1,177 @@
+"""Accounting of decoded pixel memory with budget driven eviction
+
+Owners (image widgets, the set prefetcher, export jobs) report how many bytes
+each of their representations holds. Once the total exceeds the budget the
+manager asks owners to drop representations, cheapest to rebuild first and
+least recently used within the same cost. Owners rebuild a dropped
+representation when it is needed again.
+"""
+import threading
+import time
+import weakref
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+ORIGINAL = 'original'
+PREVIEW = 'preview'
+DISPLAY = 'display'
+MAGNIFIER = 'magnifier'
+ANALYSIS = 'analysis'
+PREFETCH = 'prefetch'
+EXPORT = 'export'
+CHANNELS = 'channels'
+
+KINDS = (ORIGINAL, PREVIEW, DISPLAY, MAGNIFIER, CHANNELS, ANALYSIS, PREFETCH, EXPORT)
+
+# Lower is dropped first; kinds missing here are never dropped
+REBUILD_COST = {PREFETCH: 0, MAGNIFIER: 1, DISPLAY: 2, CHANNELS: 2, ANALYSIS: 3, ORIGINAL: 4}
+
+# Representations used this recently are kept even over budget, dropping
+# them would only make the next paint decode them again
+RECENT_SECONDS = 2.0
+
+
+def pixmap_bytes(pixmap):
+    """Bytes held by a QPixmap or QImage, 0 for None"""
+    if pixmap is None or pixmap.isNull():
+        return 0
+    return pixmap.width() * pixmap.height() * pixmap.depth() // 8
+
+
+def format_bytes(size):
+    for unit in ('B', 'KB', 'MB'):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.2f} GB"
+
+
+class _Entry:
+    __slots__ = ('owner', 'kind', 'size', 'last_used')
+
+    def __init__(self, owner, kind, size):
+        self.owner = owner
+        self.kind = kind
+        self.size = size
+        self.last_used = time.monotonic()
+
+
+class MemoryManager(QObject):
+    """Bytes per owner and representation, enforcing *budget_bytes* (0: no limit)
+
+    Owners call ``account(owner, {kind: bytes})`` whenever a representation
+    changes and ``touch(owner, kind)`` when they use one. To be evicted they
+    implement ``evict_representation(kind)``, returning whether it was dropped.
+    ``account`` may be called from worker threads; eviction only runs in the
+    GUI thread.
+    """
+
+    changed = pyqtSignal()
+    over_budget = pyqtSignal(int)
+
+    def __init__(self, budget_bytes=0, parent=None):
+        super().__init__(parent)
+        self.budget_bytes = budget_bytes
+        self.entries = {}
+        self.lock = threading.Lock()
+        self.enforcing = False
+
+    def account(self, owner, sizes):
+        owner_id = id(owner)
+        grew = False
+        with self.lock:
+            for kind, size in sizes.items():
+                key = (owner_id, kind)
+                entry = self.entries.get(key)
+                if not size:
+                    self.entries.pop(key, None)
+                elif entry is None:
+                    ref = weakref.ref(owner, lambda _, owner_id=owner_id: self.forget_id(owner_id))
+                    self.entries[key] = _Entry(ref, kind, size)
+                    grew = True
+                elif size != entry.size:
+                    grew = grew or size > entry.size
+                    entry.size = size
+                    entry.last_used = time.monotonic()
+        self.changed.emit()
+        if grew and threading.current_thread() is threading.main_thread():
+            self.enforce()
+
+    def touch(self, owner, kind):
+        entry = self.entries.get((id(owner), kind))
+        if entry is not None:
+            entry.last_used = time.monotonic()
+
+    def forget(self, owner):
+        self.forget_id(id(owner))
+
+    def forget_id(self, owner_id):
+        with self.lock:
+            for key in [key for key in self.entries if key[0] == owner_id]:
+                del self.entries[key]
+        self.changed.emit()
+
+    def total(self):
+        with self.lock:
+            return sum(entry.size for entry in self.entries.values())
+
+    def totals(self):
+        """{kind: bytes}"""
+        totals = dict.fromkeys(KINDS, 0)
+        with self.lock:
+            for entry in self.entries.values():
+                totals[entry.kind] = totals.get(entry.kind, 0) + entry.size
+        return totals
+
+    def per_owner(self):
+        """[(owner, {kind: bytes})], largest first"""
+        owners = {}
+        with self.lock:
+            for (owner_id, kind), entry in self.entries.items():
+                owner = entry.owner()
+                if owner is not None:
+                    owners.setdefault(owner_id, (owner, {}))[1][kind] = entry.size
+        return sorted(owners.values(), key=lambda item: -sum(item[1].values()))
+
+    def set_budget(self, budget_bytes):
+        self.budget_bytes = budget_bytes
+        self.changed.emit()
+        self.enforce()
+
+    def enforce(self):
+        """Drop representations until the total fits the budget"""
+        if not self.budget_bytes or self.enforcing:
+            return
+        excess = self.total() - self.budget_bytes
+        if excess <= 0:
+            return
+
+        self.enforcing = True
+        try:
+            now = time.monotonic()
+            with self.lock:
+                candidates = sorted(
+                    (entry for entry in self.entries.values()
+                     if entry.kind in REBUILD_COST and now - entry.last_used >= RECENT_SECONDS),
+                    key=lambda entry: (REBUILD_COST[entry.kind], entry.last_used))
+            for entry in candidates:
+                owner = entry.owner()
+                if owner is None or not owner.evict_representation(entry.kind):
+                    continue
+                excess = self.total() - self.budget_bytes
+                if excess <= 0:
+                    return
+            self.over_budget.emit(excess)
+        finally:
+            self.enforcing = False
+
+
+_shared_manager = None
+
+
+def shared_manager():
+    """The manager shared by the whole application (create it in the GUI thread)"""
+    global _shared_manager
+    if _shared_manager is None:
+        _shared_manager = MemoryManager()
+    return _shared_manager
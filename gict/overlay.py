@@ -0,0 +1,56 @@
+"""On-screen frame timing overlay fed by gict.tracing"""
+from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtWidgets import QLabel
+
+from . import tracing
+
+FRAME_SPAN = 'MainWindow.frame'
+PAINT_SPAN = 'ImageWidget.paintEvent'
+
+
+class TraceOverlay(QLabel):
+    """Frame time, per-widget paint cost and cache hit rates, refreshed 4 times a second"""
+
+    def __init__(self, widgets_provider, parent=None):
+        super().__init__(parent)
+        self.widgets_provider = widgets_provider
+        self.setAttribute(Qt.WA_TransparentForMouseEvents)
+        self.setStyleSheet(
+            "background-color: rgba(0, 0, 0, 170); color: #9f9; "
+            "font-family: monospace; padding: 6px;")
+        self.timer = QTimer(self)
+        self.timer.setInterval(250)
+        self.timer.timeout.connect(self.refresh)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.timer.start()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.timer.stop()
+
+    def refresh(self):
+        frames = tracing.recent(FRAME_SPAN)
+        lines = []
+        if frames:
+            last = frames[-1][2] / 1e6
+            worst = max(event[2] for event in frames) / 1e6
+            lines.append(f"frame {last:6.2f} ms  (max {worst:.2f}, {len(frames)} frames/s)")
+        else:
+            lines.append("frame    -")
+
+        paint_costs = tracing.last_durations(PAINT_SPAN, 10.0)
+        for index, widget in enumerate(self.widgets_provider()):
+            cost = paint_costs.get(id(widget))
+            if cost is not None:
+                lines.append(f"  paint #{index + 1:<3}{cost:6.2f} ms")
+
+        for name, (rate, lookups) in sorted(tracing.hit_rates().items()):
+            lines.append(f"{name} {rate * 100:5.1f}% of {lookups}")
+        if not tracing.is_enabled():
+            lines.append("(tracing is off)")
+
+        self.setText("\n".join(lines))
+        self.adjustSize()
+        self.raise_()
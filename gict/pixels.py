@@ -0,0 +1,81 @@
+"""Pixel values read straight from decoded QImage buffers
+
+A PixelView wraps the image memory in a memoryview once, reading a pixel is
+then an index computation instead of a QImage.pixel() call, and 16-bit
+images keep their raw values.
+"""
+import sys
+
+from PyQt5.QtGui import QImage
+
+# format: (bytes per pixel, memoryview item code, colour channel offsets,
+#          alpha offset or None, premultiplied); offsets are in items
+_ARGB = (2, 1, 0) if sys.byteorder == 'little' else (1, 2, 3)
+_ALPHA = 3 if sys.byteorder == 'little' else 0
+LAYOUTS = {
+    QImage.Format_RGB32: (4, 'B', _ARGB, None, False),
+    QImage.Format_ARGB32: (4, 'B', _ARGB, _ALPHA, False),
+    QImage.Format_ARGB32_Premultiplied: (4, 'B', _ARGB, _ALPHA, True),
+    QImage.Format_RGB888: (3, 'B', (0, 1, 2), None, False),
+    QImage.Format_RGBX8888: (4, 'B', (0, 1, 2), None, False),
+    QImage.Format_RGBA8888: (4, 'B', (0, 1, 2), 3, False),
+    QImage.Format_Grayscale8: (1, 'B', (0,), None, False),
+    QImage.Format_Grayscale16: (2, 'H', (0,), None, False),
+    QImage.Format_RGBX64: (8, 'H', (0, 1, 2), None, False),
+    QImage.Format_RGBA64: (8, 'H', (0, 1, 2), 3, False),
+    QImage.Format_RGBA64_Premultiplied: (8, 'H', (0, 1, 2), 3, True),
+}
+
+CHANNEL_NAMES = {1: 'Y', 3: 'RGB', 4: 'RGBA'}
+
+DEEP_FORMATS = (QImage.Format_Grayscale16, QImage.Format_RGBX64, QImage.Format_RGBA64,
+                QImage.Format_RGBA64_Premultiplied)
+
+
+def is_deep(image):
+    """True if *image* has more than 8 bits per channel"""
+    return image is not None and image.format() in DEEP_FORMATS
+
+
+class PixelView:
+    """Read-only view of the pixels of a QImage"""
+
+    def __init__(self, image):
+        if image.format() not in LAYOUTS:
+            # Indexed and other packed formats are converted once
+            image = image.convertToFormat(QImage.Format_ARGB32)
+        pixel_size, code, self.channels, alpha, self.premultiplied = LAYOUTS[image.format()]
+        self.image = image  # keeps the buffer alive
+        self.width = image.width()
+        self.height = image.height()
+        self.depth = 16 if code == 'H' else 8
+        self.maximum = (1 << self.depth) - 1
+        self.alpha = alpha
+
+        bits = image.constBits()
+        bits.setsize(image.sizeInBytes())
+        self.data = memoryview(bits).cast(code)
+        item_size = self.data.itemsize
+        self.stride = image.bytesPerLine() // item_size
+        self.step = pixel_size // item_size
+
+    def value(self, x, y):
+        """Channel values at *x*, *y*: (gray,), (R, G, B) or (R, G, B, A); None outside"""
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return None
+        data = self.data
+        offset = y * self.stride + x * self.step
+        values = [data[offset + channel] for channel in self.channels]
+        if self.alpha is not None:
+            alpha = data[offset + self.alpha]
+            if self.premultiplied and alpha:
+                values = [min(self.maximum, round(value * self.maximum / alpha)) for value in values]
+            values.append(alpha)
+        return tuple(values)
+
+
+def deltas(values, reference):
+    """Per channel difference to *reference*, None if they cannot be compared"""
+    if values is None or reference is None or len(values) != len(reference):
+        return None
+    return tuple(value - base for value, base in zip(values, reference))
@@ -0,0 +1,188 @@
+"""Camera RAW files through rawpy (LibRaw), when it is installed
+
+The grid shows the JPEG embedded in the RAW file, or a half size decode that
+skips the demosaic when there is none; that decode still takes a second or
+more, so it runs on the loader's threads (see loader.request_preview). The
+full demosaic takes seconds per
+file, so it only runs once a magnifier, a zoom past the preview or an export
+needs the full image, on the loader's background threads or worker
+processes like any other decode (see decoders.py). Demosaiced images are
+kept in the cache folder as 16-bit PNGs, keyed by the file fingerprint, the
+processing parameters and the LibRaw version.
+"""
+import os
+
+from PyQt5.QtCore import QBuffer, QByteArray, QIODevice, QSize
+from PyQt5.QtGui import QImage, QImageReader, QTransform
+
+from . import export, tracing
+from .cache import cache_dir, file_fingerprint, fingerprint_key
+
+RAW_EXTENSIONS = ('.arw', '.cr2', '.cr3', '.dng', '.nef', '.nrw', '.orf', '.pef', '.raf',
+                  '.rw2', '.srw')
+
+# Passed to RawPy.postprocess for the full image
+PARAMS = {'use_camera_wb': True, 'output_bps': 16}
+# Rotation of LibRaw's flip values
+FLIP_ANGLES = {3: 180, 5: 270, 6: 90}
+# The demosaic cache is pruned back to this size, least recently used first
+CACHE_BYTES = 8 * 1024 ** 3
+
+
+def available():
+    try:
+        import numpy  # noqa: F401
+        import rawpy  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def is_raw(path):
+    return bool(path) and path.lower().endswith(RAW_EXTENSIONS)
+
+
+def _flipped(image, flip):
+    angle = FLIP_ANGLES.get(flip)
+    return image.transformed(QTransform().rotate(angle)) if angle else image
+
+
+def _full_size(sizes):
+    if sizes.flip in (5, 6):
+        return QSize(sizes.height, sizes.width)
+    return QSize(sizes.width, sizes.height)
+
+
+def _embedded_preview(raw, full_size):
+    """The embedded JPEG or bitmap, turned like the full image; None if it has another shape"""
+    import rawpy
+
+    from . import decoders, thumbnails
+
+    try:
+        thumb = raw.extract_thumb()
+    except (rawpy.LibRawNoThumbnailError, rawpy.LibRawUnsupportedThumbnailError):
+        return None
+    if thumb.format == rawpy.ThumbFormat.JPEG:
+        data = QByteArray(thumb.data)
+        buffer = QBuffer(data)
+        buffer.open(QIODevice.ReadOnly)
+        reader = QImageReader(buffer, b'jpg')
+        size = reader.size()
+        # Embedded JPEGs are often full size, libjpeg decodes them scaled down cheaply
+        denominator = thumbnails.scale_denominator(size) if size.isValid() else None
+        if denominator is not None:
+            reader.setScaledSize(QSize(-(-size.width() // denominator), -(-size.height() // denominator)))
+        image = reader.read()
+    else:
+        image = decoders.image_from_array(thumb.data)
+    if image is None or image.isNull():
+        return None
+    image = _flipped(image, raw.sizes.flip)
+    if abs(image.width() / image.height() - full_size.width() / full_size.height()) > 0.02 * full_size.width() / full_size.height():
+        return None
+    return image
+
+
+@tracing.traced(name='raw.quick_preview')
+def quick_preview(path, half_size=True):
+    """(preview QImage, full image size) of a RAW file, None if it cannot be read
+
+    Without *half_size*, files without a usable embedded preview give None too.
+    """
+    if not available():
+        return None
+    import rawpy
+
+    from . import decoders
+
+    try:
+        with rawpy.imread(path) as raw:
+            full_size = _full_size(raw.sizes)
+            preview = _embedded_preview(raw, full_size)
+            tracing.count('raw embedded previews', preview is not None)
+            if preview is None and half_size:
+                preview = decoders.image_from_array(raw.postprocess(half_size=True, use_camera_wb=True))
+    except (rawpy.LibRawError, OSError):
+        return None
+    if preview is None or preview.isNull():
+        return None
+    return preview, full_size
+
+
+class DemosaicCache:
+    """Full size demosaiced images as 16-bit PNGs"""
+
+    def __init__(self, folder=None):
+        self.folder = folder or cache_dir('raw')
+
+    def path_for(self, path):
+        import rawpy
+
+        fingerprint = file_fingerprint(path)
+        if fingerprint is None:
+            return None
+        key = fingerprint_key([fingerprint, PARAMS, list(rawpy.libraw_version)])
+        return os.path.join(self.folder, key + '.png')
+
+    def get(self, path):
+        cache_path = self.path_for(path)
+        image = QImage() if cache_path is None else QImageReader(cache_path).read()
+        tracing.count('demosaic cache', not image.isNull())
+        if image.isNull():
+            return None
+        try:
+            os.utime(cache_path)
+        except OSError:
+            pass
+        return image
+
+    def put(self, path, image):
+        cache_path = self.path_for(path)
+        if cache_path is None:
+            return
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        # zlib level 1: the files are written once and read often
+        if image.save(tmp_path, 'PNG', export.png_quality(1)):
+            os.replace(tmp_path, cache_path)
+            self.prune()
+
+    def prune(self):
+        """Delete the least recently used files beyond CACHE_BYTES"""
+        entries = []
+        with os.scandir(self.folder) as found:
+            for entry in found:
+                if entry.name.endswith('.png'):
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, cache_path in sorted(entries):
+            if total <= CACHE_BYTES:
+                break
+            try:
+                os.remove(cache_path)
+            except OSError:
+                continue
+            total -= size
+
+
+def decode(path):
+    """Full size demosaiced QImage of *path* (16 bits per channel), from the cache if it is there"""
+    import rawpy
+
+    from . import decoders
+
+    cache = DemosaicCache()
+    image = cache.get(path)
+    if image is not None:
+        return image
+    with tracing.span('raw.demosaic'):
+        with rawpy.imread(path) as raw:
+            array = raw.postprocess(**PARAMS)
+    image = decoders.image_from_array(array)
+    if image is not None:
+        cache.put(path, image)
+    return image
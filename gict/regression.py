@@ -0,0 +1,230 @@
+"""Regression diff: which images changed between two folders of outputs
+
+    python -m gict.regression BEFORE AFTER [--report FILE] [--workers N]
+                              [--tolerance N] [--max-abs N] [--min-psnr DB]
+
+Images are paired by their path below BEFORE and AFTER. Each pair is decoded
+and compared in a worker process (see analysis.metrics); only a few pairs
+are in flight at a time, so memory stays bounded however many images there
+are. A pair counts as changed when its largest difference exceeds --max-abs
+or its PSNR falls below --min-psnr. The report lists failed and missing
+images first, then the pairs from the lowest PSNR up, and is written both
+as FILE.csv and FILE.json. Either file opens in GICT as comparison sets.
+The exit status is 1 if any image changed, failed or is missing, like diff.
+"""
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from . import dirindex
+from .sets import is_image
+
+FAILED = 'failed'
+MISSING = 'missing'
+CHANGED = 'changed'
+SAME = 'same'
+STATUS_ORDER = {FAILED: 0, MISSING: 1, CHANGED: 2, SAME: 3}
+
+COLUMNS = ('rank', 'name', 'status', 'max_abs', 'psnr', 'changed', 'mse', 'mean_abs',
+           'before', 'after', 'error')
+PENDING_PER_WORKER = 2
+
+
+def image_paths(folder):
+    """{path relative to *folder*: absolute path} of the images below it"""
+    folder = os.path.abspath(folder)
+    listings = dirindex.shared_cache()
+    paths = {}
+    for root, listing in listings.walk(folder):
+        for name in listing.files:
+            if is_image(name):
+                path = os.path.join(root, name)
+                paths[os.path.relpath(path, folder)] = path
+    listings.save()
+    return paths
+
+
+def compare(before, after, tolerance):
+    """Metrics of *after* against *before* (runs in a worker)"""
+    from . import analysis, loader
+
+    reference = loader.decode_image(before)
+    image = loader.decode_image(after)
+    for path, decoded in ((before, reference), (after, image)):
+        if decoded.isNull():
+            return {'error': f"cannot read {path}"}
+    if reference.size() != image.size():
+        return {'error': f"size changed from {reference.width()}x{reference.height()} "
+                         f"to {image.width()}x{image.height()}"}
+    return analysis.metrics(reference, image, tolerance=tolerance)
+
+
+class Thresholds:
+    """When a pair counts as changed"""
+
+    def __init__(self, max_abs=0.0, min_psnr=None):
+        self.max_abs = max_abs
+        self.min_psnr = min_psnr
+
+    def status(self, result):
+        if result.get('error'):
+            return FAILED
+        if result['max_abs'] > self.max_abs:
+            return CHANGED
+        if self.min_psnr is not None and result['psnr'] is not None and result['psnr'] < self.min_psnr:
+            return CHANGED
+        return SAME
+
+
+def rank_key(entry):
+    psnr = entry.get('psnr')
+    return (STATUS_ORDER[entry['status']], float('inf') if psnr is None else psnr,
+            -(entry.get('changed') or 0.0), entry['name'])
+
+
+def run(before, after, workers=None, tolerance=0, thresholds=None, progress=None):
+    """Compare the images of folder *after* to those of *before*, return the report dict
+
+    *progress* is called with (done, total) as pairs finish.
+    """
+    thresholds = thresholds or Thresholds()
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+    before_paths = image_paths(before)
+    after_paths = image_paths(after)
+    names = sorted(set(before_paths) | set(after_paths))
+
+    entries = []
+    pairs = []
+    for name in names:
+        if name in before_paths and name in after_paths:
+            pairs.append(name)
+        else:
+            entries.append({'name': name, 'status': MISSING, 'before': before_paths.get(name, ''),
+                            'after': after_paths.get(name, ''),
+                            'error': "only in " + ("before" if name in before_paths else "after")})
+
+    done = 0
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(workers, mp_context=context) as executor:
+        pending = {}
+        queue = iter(pairs)
+        while True:
+            # A few pairs per worker in flight: the decoded images never pile up
+            for name in queue:
+                future = executor.submit(compare, before_paths[name], after_paths[name], tolerance)
+                pending[future] = name
+                if len(pending) >= workers * PENDING_PER_WORKER:
+                    break
+            if not pending:
+                break
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:  # a worker that died counts as a failed pair
+                    result = {'error': str(e) or type(e).__name__}
+                entry = dict(result, name=name, before=before_paths[name], after=after_paths[name])
+                entry.pop('pixels', None)
+                entry['status'] = thresholds.status(entry)
+                entries.append(entry)
+                done += 1
+                if progress is not None:
+                    progress(done, len(pairs))
+
+    entries.sort(key=rank_key)
+    for rank, entry in enumerate(entries, 1):
+        entry['rank'] = rank
+    elapsed = time.perf_counter() - start
+    counts = {status: 0 for status in STATUS_ORDER}
+    for entry in entries:
+        counts[entry['status']] += 1
+    return {
+        'before': os.path.abspath(before),
+        'after': os.path.abspath(after),
+        'tolerance': tolerance,
+        'max_abs': thresholds.max_abs,
+        'min_psnr': thresholds.min_psnr,
+        'summary': dict(counts, pairs=len(pairs), seconds=elapsed,
+                        images_per_s=len(pairs) / elapsed if elapsed > 0 else 0.0),
+        'entries': entries,
+    }
+
+
+def write_report(report, prefix):
+    """Write *report* to prefix.csv and prefix.json, return both paths"""
+    csv_path, json_path = prefix + '.csv', prefix + '.json'
+    with open(csv_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, COLUMNS, extrasaction='ignore')
+        writer.writeheader()
+        for entry in report['entries']:
+            writer.writerow({column: '' if entry.get(column) is None else entry[column] for column in COLUMNS})
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=1)
+    return csv_path, json_path
+
+
+def load_report(path):
+    """[(key, [before, after])] of a report written by write_report, in rank order
+
+    Missing images give sets of one.
+    """
+    if path.lower().endswith('.csv'):
+        with open(path, newline='', encoding='utf-8') as f:
+            entries = list(csv.DictReader(f))
+    else:
+        with open(path, encoding='utf-8') as f:
+            entries = json.load(f)['entries']
+    found = []
+    for entry in sorted(entries, key=lambda entry: int(entry['rank'])):
+        paths = [entry[side] for side in ('before', 'after') if entry.get(side)]
+        if paths:
+            found.append((f"{int(entry['rank']):04d} {entry['name']} ({entry['status']})", paths))
+    return found
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('before')
+    parser.add_argument('after')
+    parser.add_argument('--report', default='regression-report',
+                        help="report path without extension (default: regression-report)")
+    parser.add_argument('--workers', type=int, help="worker processes (default: one per core)")
+    parser.add_argument('--tolerance', type=float, default=0,
+                        help="channel difference up to which a pixel counts as unchanged")
+    parser.add_argument('--max-abs', type=float, default=0,
+                        help="largest difference a pair may have and still count as the same")
+    parser.add_argument('--min-psnr', type=float, help="pairs below this PSNR count as changed")
+    args = parser.parse_args(argv)
+
+    from . import analysis
+    if not analysis.available():
+        sys.exit("The regression diff needs numpy")
+    for folder in (args.before, args.after):
+        if not os.path.isdir(folder):
+            sys.exit(f"Not a folder: {folder}")
+
+    report = run(args.before, args.after, args.workers, args.tolerance,
+                 Thresholds(args.max_abs, args.min_psnr))
+    paths = write_report(report, args.report)
+    summary = report['summary']
+    print(f"{summary['pairs']} pairs in {summary['seconds']:.1f} s ({summary['images_per_s']:.1f} images/s): "
+          f"{summary[CHANGED]} changed, {summary[SAME]} same, {summary[FAILED]} failed, "
+          f"{summary[MISSING]} missing")
+    for entry in report['entries'][:10]:
+        if entry['status'] == SAME:
+            break
+        psnr = '-' if entry.get('psnr') is None else f"{entry['psnr']:.2f} dB"
+        print(f"  {entry['rank']:>4}  {entry['status']:<8} {psnr:>10}  {entry['name']}")
+    print("Report: " + ", ".join(paths))
+    return 1 if summary[CHANGED] or summary[FAILED] or summary[MISSING] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
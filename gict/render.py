@@ -0,0 +1,69 @@
+"""Rendering of the exported images
+
+Everything here works on QImage so it can run outside the GUI thread.
+"""
+from PyQt5.QtCore import QRect
+from PyQt5.QtGui import QImage, QPainter, QPen
+
+from .resample import DEFAULT_METHOD, resample, scaled_size
+from .roi import inset_origins
+
+
+def paintable(image, deep=False):
+    """Return *image* in a format QPainter can draw on, 16 bits per channel if *deep*"""
+    if deep:
+        if image.hasAlphaChannel():
+            return image.convertToFormat(QImage.Format_RGBA64_Premultiplied)
+        return image.convertToFormat(QImage.Format_RGBX64)
+    if image.format() in (QImage.Format_RGB32, QImage.Format_ARGB32_Premultiplied):
+        return image
+    if image.hasAlphaChannel():
+        return image.convertToFormat(QImage.Format_ARGB32_Premultiplied)
+    return image.convertToFormat(QImage.Format_RGB32)
+
+
+def magnify(image, rect, scale, method=DEFAULT_METHOD):
+    """Crop *rect* from *image* and scale it by *scale*, None if it is empty"""
+    source_rect = rect.intersected(QRect(0, 0, image.width(), image.height()))
+    if source_rect.isEmpty():
+        return None
+    return resample(image.copy(source_rect), scaled_size(source_rect.size(), scale), method)
+
+
+def draw_annotations(painter, image, rois, settings):
+    """Draw the regions and their magnified insets at the original image size"""
+    rois = [roi for roi in rois if roi.is_active()]
+
+    pen = QPen()
+    pen.setWidth(settings['line_width'])
+    for roi in rois:
+        pen.setColor(roi.color)
+        painter.setPen(pen)
+        painter.drawRect(roi.rect)
+
+    if not settings.get('show_magnified', True):
+        return
+    insets = [(roi, magnify(image, roi.rect, roi.scale, roi.resampling)) for roi in rois]
+    insets = [(roi, magnified) for roi, magnified in insets if magnified is not None]
+    origins = inset_origins([magnified.size() for _, magnified in insets],
+                            [roi.position for roi, _ in insets], image.size(), settings['margin'])
+    for (roi, magnified), origin in zip(insets, origins):
+        painter.drawImage(origin, magnified)
+        painter.setPen(QPen(roi.color, settings['line_width']))
+        painter.drawRect(origin.x(), origin.y(), magnified.width(), magnified.height())
+
+
+def render_full(image, rois, settings, deep=False):
+    """Return a copy of *image* with the annotations burnt in
+
+    With *deep* images with more than 8 bits per channel keep them, for the
+    16-bit export profiles.
+    """
+    save_image = paintable(image, deep and image.depth() > 32).copy()
+    painter = QPainter(save_image)
+    painter.setRenderHint(QPainter.Antialiasing)
+    try:
+        draw_annotations(painter, image, rois, settings)
+    finally:
+        painter.end()
+    return save_image
@@ -0,0 +1,143 @@
+"""Resampling of magnified regions, shared by the insets and the exports
+
+NEAREST keeps every source pixel a sharp block, which shows pixel level
+artefacts as they are; integer zoom ratios replicate pixels with numpy.
+BILINEAR is Qt's smooth transformation. LANCZOS is a separable Lanczos-3
+filter computed with numpy. Without numpy, nearest neighbour and Lanczos
+fall back to Qt's fast and smooth transformations.
+"""
+import math
+
+from PyQt5.QtCore import QSize, Qt
+from PyQt5.QtGui import QImage
+
+NEAREST = 'nearest'
+BILINEAR = 'bilinear'
+LANCZOS = 'lanczos'
+METHODS = (NEAREST, BILINEAR, LANCZOS)
+DEFAULT_METHOD = BILINEAR
+
+LANCZOS_LOBES = 3
+
+# Formats worked on in place: numpy item type of a channel
+_WORKING_FORMATS = {
+    QImage.Format_RGB32: 'uint8',
+    QImage.Format_ARGB32_Premultiplied: 'uint8',
+    QImage.Format_RGBX64: 'uint16',
+    QImage.Format_RGBA64_Premultiplied: 'uint16',
+}
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def scaled_size(size, scale):
+    """Size of a region of *size* magnified by *scale*"""
+    return QSize(max(1, int(size.width() * scale)), max(1, int(size.height() * scale)))
+
+
+def integer_factors(source, target):
+    """(x, y) zoom factors if *target* is a whole multiple of *source*, else None"""
+    if target.width() % source.width() or target.height() % source.height():
+        return None
+    return target.width() // source.width(), target.height() // source.height()
+
+
+def working(image):
+    """*image* in a 4 channel format with premultiplied alpha"""
+    if image.format() in _WORKING_FORMATS:
+        return image
+    deep = image.depth() > 32
+    if image.hasAlphaChannel():
+        return image.convertToFormat(QImage.Format_RGBA64_Premultiplied if deep else QImage.Format_ARGB32_Premultiplied)
+    return image.convertToFormat(QImage.Format_RGBX64 if deep else QImage.Format_RGB32)
+
+
+def as_array(image):
+    """(height, width, 4) numpy view of a working format QImage"""
+    np = _numpy()
+    bits = image.constBits()
+    bits.setsize(image.sizeInBytes())
+    rows = np.frombuffer(memoryview(bits), dtype=_WORKING_FORMATS[image.format()]).reshape(image.height(), -1)
+    return rows[:, :image.width() * 4].reshape(image.height(), image.width(), 4)
+
+
+def from_array(array, image_format):
+    """QImage of *image_format* holding a copy of *array*"""
+    np = _numpy()
+    height, width = array.shape[:2]
+    image = QImage(width, height, image_format)
+    bits = image.bits()
+    bits.setsize(image.sizeInBytes())
+    rows = np.frombuffer(memoryview(bits), dtype=array.dtype).reshape(height, -1)
+    rows[:, :width * 4] = array.reshape(height, width * 4)
+    return image
+
+
+def lanczos_taps(source_size, target_size, lobes=LANCZOS_LOBES):
+    """(source indices, weights), both (target_size, taps), for one axis"""
+    np = _numpy()
+    scale = target_size / source_size
+    # Downscaling widens the filter so every source pixel contributes
+    stretch = min(scale, 1.0)
+    support = lobes / stretch
+    centers = (np.arange(target_size) + 0.5) / scale - 0.5
+    first = np.floor(centers - support).astype(np.int64) + 1
+    indices = first[:, None] + np.arange(int(math.ceil(2 * support)) + 1)[None, :]
+    distance = (indices - centers[:, None]) * stretch
+    weights = np.sinc(distance) * np.sinc(distance / lobes)
+    weights[np.abs(distance) >= lobes] = 0.0
+    weights /= weights.sum(axis=1, keepdims=True)
+    return np.clip(indices, 0, source_size - 1), weights.astype(np.float32)
+
+
+def _filter_rows(array, indices, weights):
+    """Resample axis 0 of *array* (float32) with the given taps"""
+    out = weights[:, 0, None, None] * array[indices[:, 0]]
+    for tap in range(1, indices.shape[1]):
+        out += weights[:, tap, None, None] * array[indices[:, tap]]
+    return out
+
+
+def lanczos(image, size):
+    np = _numpy()
+    source = working(image)
+    pixels = as_array(source).astype(np.float32)
+    rows, row_weights = lanczos_taps(source.height(), size.height())
+    columns, column_weights = lanczos_taps(source.width(), size.width())
+    pixels = _filter_rows(pixels, rows, row_weights)
+    pixels = _filter_rows(pixels.transpose(1, 0, 2), columns, column_weights).transpose(1, 0, 2)
+    maximum = np.iinfo(_WORKING_FORMATS[source.format()]).max
+    if source.hasAlphaChannel():
+        # Premultiplied colour may not ring above its alpha
+        np.clip(pixels[:, :, 3], 0, maximum, out=pixels[:, :, 3])
+        np.minimum(pixels[:, :, :3], pixels[:, :, 3:], out=pixels[:, :, :3])
+    np.clip(pixels, 0, maximum, out=pixels)
+    return from_array(np.rint(pixels).astype(_WORKING_FORMATS[source.format()]), source.format())
+
+
+def replicate(image, factors):
+    """Nearest neighbour zoom by whole *factors* (x, y)"""
+    np = _numpy()
+    source = working(image)
+    pixels = np.repeat(np.repeat(as_array(source), factors[1], axis=0), factors[0], axis=1)
+    return from_array(pixels, source.format())
+
+
+def resample(image, size, method=DEFAULT_METHOD):
+    """*image* (QImage) scaled to exactly *size* with *method*"""
+    if image.size() == size:
+        return image
+    if method == NEAREST:
+        factors = integer_factors(image.size(), size)
+        if factors is not None and _numpy() is not None:
+            return replicate(image, factors)
+        return image.scaled(size, Qt.IgnoreAspectRatio, Qt.FastTransformation)
+    if method == LANCZOS and _numpy() is not None:
+        return lanczos(image, size)
+    return image.scaled(size, Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
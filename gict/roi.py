@@ -0,0 +1,274 @@
+"""Regions of interest: named rectangles with their own magnifier settings
+
+All images of a comparison share one RoiSet. The set keeps a uniform grid
+index of the rectangles, so picking under the mouse and culling while
+painting only look at the regions near a point instead of testing all of
+them.
+"""
+from PyQt5.QtCore import QPoint, QRect, QSize
+from PyQt5.QtGui import QColor
+
+from .resample import DEFAULT_METHOD, scaled_size
+
+TOP_LEFT, TOP_RIGHT, BOTTOM_LEFT, BOTTOM_RIGHT = range(4)
+
+# Handles returned by RoiSet.hit_test
+MOVE = 'move'
+CORNER_HANDLES = ('top_left', 'top_right', 'bottom_left', 'bottom_right')
+
+# The first two regions keep the names (and export file names) of the
+# former primary and secondary rectangles
+DEFAULT_NAMES = ('primary', 'secondary')
+PALETTE = ('#ff0000', '#00ff00', '#0080ff', '#ffc800', '#ff00ff', '#00ffff', '#ff8000', '#ffffff')
+
+CELL_SIZE = 256
+
+
+class Roi:
+    """A named rectangle in image coordinates and how its inset is shown"""
+
+    def __init__(self, name, rect=None, color=None, scale=1.0, position=TOP_LEFT, enabled=True,
+                 resampling=DEFAULT_METHOD):
+        self.name = name
+        self.rect = QRect(rect) if rect is not None else QRect()
+        self.color = QColor(color) if color is not None else QColor(PALETTE[0])
+        self.scale = scale
+        self.position = position
+        self.enabled = enabled
+        self.resampling = resampling
+
+    def is_active(self):
+        return self.enabled and not self.rect.isEmpty()
+
+    def copy(self):
+        return Roi(self.name, self.rect, self.color, self.scale, self.position, self.enabled,
+                   self.resampling)
+
+    def to_json(self):
+        return {
+            'name': self.name,
+            'rect': [self.rect.x(), self.rect.y(), self.rect.width(), self.rect.height()],
+            'color': self.color.name(),
+            'scale': self.scale,
+            'position': self.position,
+            'enabled': self.enabled,
+            'resampling': self.resampling,
+        }
+
+    @classmethod
+    def from_json(cls, data):
+        rect = data.get('rect')
+        return cls(data['name'], QRect(*rect) if rect else QRect(), QColor(data.get('color', PALETTE[0])),
+                   data.get('scale', 1.0), data.get('position', TOP_LEFT), data.get('enabled', True),
+                   data.get('resampling', DEFAULT_METHOD))
+
+
+def corner(rect, handle):
+    return {
+        'top_left': rect.topLeft(),
+        'top_right': rect.topRight(),
+        'bottom_left': rect.bottomLeft(),
+        'bottom_right': rect.bottomRight(),
+    }[handle]
+
+
+def opposite_corner(rect, handle):
+    """The corner that stays in place while *handle* is dragged"""
+    return corner(rect, CORNER_HANDLES[3 - CORNER_HANDLES.index(handle)])
+
+
+class GridIndex:
+    """Uniform grid mapping cells of *cell_size* pixels to the keys of the
+    rectangles overlapping them"""
+
+    def __init__(self, cell_size=CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.rects = {}
+
+    def _cells(self, rect):
+        size = self.cell_size
+        for cx in range(rect.left() // size, rect.right() // size + 1):
+            for cy in range(rect.top() // size, rect.bottom() // size + 1):
+                yield cx, cy
+
+    def _cell_count(self, rect):
+        size = self.cell_size
+        return ((rect.right() // size - rect.left() // size + 1) *
+                (rect.bottom() // size - rect.top() // size + 1))
+
+    def insert(self, key, rect):
+        self.remove(key)
+        if rect.isEmpty():
+            return
+        self.rects[key] = QRect(rect)
+        for cell in self._cells(rect):
+            self.cells.setdefault(cell, set()).add(key)
+
+    def remove(self, key):
+        rect = self.rects.pop(key, None)
+        if rect is None:
+            return
+        for cell in self._cells(rect):
+            keys = self.cells.get(cell)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.cells[cell]
+
+    def query(self, rect):
+        """Keys whose rectangle intersects *rect*"""
+        if rect.isEmpty():
+            return set()
+        if self._cell_count(rect) > len(self.rects):
+            # Visiting the cells would cost more than testing every rectangle
+            candidates = self.rects
+        else:
+            candidates = set()
+            for cell in self._cells(rect):
+                candidates.update(self.cells.get(cell, ()))
+        return {key for key in candidates if self.rects[key].intersects(rect)}
+
+
+class RoiSet:
+    """Ordered regions of a comparison, later regions are drawn on top"""
+
+    def __init__(self, rois=()):
+        self.rois = []
+        self.index = GridIndex()
+        self.current = None
+        # The region being dragged in any of the images
+        self.dragging = None
+        for roi in rois:
+            self.add(roi)
+
+    def __iter__(self):
+        return iter(self.rois)
+
+    def __len__(self):
+        return len(self.rois)
+
+    def get(self, name):
+        for roi in self.rois:
+            if roi.name == name:
+                return roi
+        return None
+
+    def unique_name(self):
+        for name in DEFAULT_NAMES:
+            if self.get(name) is None:
+                return name
+        number = len(self.rois) + 1
+        while self.get(f"roi{number}") is not None:
+            number += 1
+        return f"roi{number}"
+
+    def add(self, roi):
+        if self.get(roi.name) is not None:
+            raise ValueError(f"duplicate region name: {roi.name}")
+        self.rois.append(roi)
+        self.index.insert(roi, roi.rect)
+        if self.current is None:
+            self.current = roi
+        return roi
+
+    def new_roi(self, rect=None):
+        """Add a region with the next free name, colour and corner"""
+        count = len(self.rois)
+        return self.add(Roi(self.unique_name(), rect, QColor(PALETTE[count % len(PALETTE)]),
+                            position=count % 4))
+
+    def remove(self, roi):
+        self.rois.remove(roi)
+        self.index.remove(roi)
+        if self.current is roi:
+            self.current = self.rois[0] if self.rois else None
+
+    def rename(self, roi, name):
+        """Rename *roi*, False if the name is empty or taken"""
+        name = name.strip()
+        if not name or (name != roi.name and self.get(name) is not None):
+            return False
+        roi.name = name
+        return True
+
+    def set_rect(self, roi, rect):
+        roi.rect = QRect(rect)
+        self.index.insert(roi, roi.rect)
+
+    def active(self):
+        return [roi for roi in self.rois if roi.is_active()]
+
+    def intersecting(self, rect):
+        """Active regions intersecting *rect*, in drawing order"""
+        found = [roi for roi in self.index.query(rect) if roi.enabled]
+        return sorted(found, key=self.rois.index)
+
+    def hit_test(self, point, tolerance):
+        """Return (roi, handle) under *point*, handle is a corner or MOVE
+
+        *tolerance* is the handle size in image pixels. The topmost region
+        wins; (None, None) if there is none.
+        """
+        tolerance = max(1, int(tolerance))
+        area = QRect(point.x() - tolerance, point.y() - tolerance,
+                     2 * tolerance + 1, 2 * tolerance + 1)
+        for roi in reversed(self.intersecting(area)):
+            for handle in CORNER_HANDLES:
+                offset = corner(roi.rect, handle) - point
+                if abs(offset.x()) <= tolerance and abs(offset.y()) <= tolerance:
+                    return roi, handle
+            if roi.rect.contains(point):
+                return roi, MOVE
+        return None, None
+
+    def copy(self):
+        """A deep copy, e.g. to hand the regions to an export thread"""
+        rois = RoiSet(roi.copy() for roi in self.rois)
+        if self.current is not None:
+            rois.current = rois.get(self.current.name)
+        return rois
+
+    def to_json(self):
+        return [roi.to_json() for roi in self.rois]
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(Roi.from_json(item) for item in data)
+
+
+def default_rois():
+    return RoiSet([Roi(DEFAULT_NAMES[0], color=QColor(PALETTE[0]), position=TOP_LEFT)])
+
+
+def inset_size(roi, image_size):
+    """Size of the magnified inset of *roi*, empty if it lies outside the image"""
+    source = roi.rect.intersected(QRect(0, 0, image_size.width(), image_size.height()))
+    if source.isEmpty():
+        return QSize()
+    return scaled_size(source.size(), roi.scale)
+
+
+def inset_origins(sizes, positions, area, margin):
+    """Top left corners of insets of *sizes* placed in an *area* (QSize)
+
+    Insets sharing a corner are stacked away from it; each one is clamped
+    into the area so large insets stay visible.
+    """
+    stacked = [0, 0, 0, 0]
+    origins = []
+    for size, position in zip(sizes, positions):
+        if position in (TOP_RIGHT, BOTTOM_RIGHT):
+            x = area.width() - size.width() - margin
+        else:
+            x = margin
+        if position in (BOTTOM_LEFT, BOTTOM_RIGHT):
+            y = area.height() - size.height() - margin - stacked[position]
+        else:
+            y = margin + stacked[position]
+        stacked[position] += size.height() + margin
+
+        x = max(margin, min(x, area.width() - size.width() - margin))
+        y = max(margin, min(y, area.height() - size.height() - margin))
+        origins.append(QPoint(x, y))
+    return origins
@@ -0,0 +1,196 @@
+"""Synchronized playback of image sequences
+
+Every sequence keeps a bounded window of decoded frames ahead of the
+playback position, filled on a worker pool. Memory therefore depends on the
+window size and frame size only, never on the length of the sequence.
+"""
+import glob
+import os
+import time
+from collections import deque
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
+from PyQt5.QtGui import QImage
+
+from .loader import decode_image
+from .sets import is_image
+
+
+def resolve_frames(source):
+    """Sorted frame paths of a directory or a glob pattern"""
+    if os.path.isdir(source):
+        paths = [os.path.join(source, name) for name in os.listdir(source) if is_image(name)]
+    else:
+        paths = [path for path in glob.glob(source) if is_image(path)]
+    return sorted(paths)
+
+
+def sequence_name(source):
+    """Short label for a sequence source: the folder name, or folder/pattern"""
+    source = source.rstrip('/\\')
+    if os.path.isdir(source):
+        return os.path.basename(source) or source
+    return os.path.join(os.path.basename(os.path.dirname(source)), os.path.basename(source))
+
+
+class _FrameRunnable(QRunnable):
+
+    def __init__(self, buffer, index):
+        super().__init__()
+        self.buffer = buffer
+        self.index = index
+
+    def run(self):
+        # Frames a seek moved out of the window are skipped, not decoded
+        if self.buffer.pending.get(self.index) is not self:
+            return
+        self.buffer.decoded.emit(self.index, decode_image(self.buffer.paths[self.index]))
+
+
+class FrameBuffer(QObject):
+    """Ring buffer of the next *capacity* decoded frames of one sequence"""
+
+    decoded = pyqtSignal(int, QImage)
+    frame_ready = pyqtSignal(int)
+
+    def __init__(self, paths, capacity, pool, loop=True, parent=None):
+        super().__init__(parent)
+        self.paths = paths
+        self.capacity = max(1, capacity)
+        self.pool = pool
+        self.loop = loop
+        self.start = 0
+        self.frames = {}
+        self.pending = {}  # index -> runnable that decodes it
+        self.decoded.connect(self.on_decoded)
+
+    def __len__(self):
+        return len(self.paths)
+
+    def clamp(self, index):
+        return min(index, len(self.paths) - 1)
+
+    def window(self):
+        count = min(self.capacity, len(self.paths))
+        if self.loop:
+            return [(self.start + offset) % len(self.paths) for offset in range(count)]
+        return list(range(self.start, min(self.start + count, len(self.paths))))
+
+    def seek(self, index):
+        """Move the window to start at *index*, dropping frames before it"""
+        self.start = self.clamp(index)
+        window = set(self.window())
+        for stale in [i for i in self.frames if i not in window]:
+            del self.frames[stale]
+        for stale in [i for i in self.pending if i not in window]:
+            del self.pending[stale]
+        for index in self.window():
+            if index not in self.frames and index not in self.pending:
+                self.pending[index] = runnable = _FrameRunnable(self, index)
+                self.pool.start(runnable)
+
+    def get(self, index):
+        return self.frames.get(self.clamp(index))
+
+    def on_decoded(self, index, image):
+        self.pending.pop(index, None)
+        if index in self.window() and not image.isNull():
+            self.frames[index] = image
+            self.frame_ready.emit(index)
+
+
+class SequencePlayer(QObject):
+    """Shared timeline over several sequences, played at a target frame rate
+
+    A frame whose images are not all decoded when its time comes is dropped:
+    the timeline keeps going and the widgets keep the last shown frame.
+    """
+
+    frame_shown = pyqtSignal(int, int, str, QImage)  # position, sequence, path, image
+    position_changed = pyqtSignal(int)
+    stats_changed = pyqtSignal(float, int)  # achieved fps, dropped frames
+
+    def __init__(self, sequences, fps=24, buffer_frames=8, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.buffers = [FrameBuffer(paths, buffer_frames, self.pool, parent=self)
+                        for paths in sequences]
+        for buffer in self.buffers:
+            buffer.frame_ready.connect(self.on_frame_ready)
+
+        self.length = max((len(buffer) for buffer in self.buffers), default=0)
+        self.position = 0
+        self.shown_position = -1
+        self.dropped = 0
+        self.shown_times = deque(maxlen=120)
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.tick)
+        self.set_fps(fps)
+
+    def set_fps(self, fps):
+        self.fps = max(0.1, fps)
+        self.timer.setInterval(max(1, int(round(1000 / self.fps))))
+
+    def is_playing(self):
+        return self.timer.isActive()
+
+    def play(self):
+        if self.length:
+            self.timer.start()
+
+    def pause(self):
+        self.timer.stop()
+
+    def toggle(self):
+        if self.is_playing():
+            self.pause()
+        else:
+            self.play()
+
+    def seek(self, position):
+        """Jump to *position* and show it as soon as it is decoded"""
+        if not self.length:
+            return
+        self.position = max(0, min(position, self.length - 1))
+        for buffer in self.buffers:
+            buffer.seek(self.position)
+        self.position_changed.emit(self.position)
+        self.show_if_ready()
+
+    def tick(self):
+        if self.shown_position != self.position:
+            self.dropped += 1
+        self.seek((self.position + 1) % self.length)
+        self.emit_stats()
+
+    def frames_ready(self, position):
+        return all(buffer.get(position) is not None for buffer in self.buffers)
+
+    def on_frame_ready(self, _index):
+        if self.shown_position != self.position:
+            self.show_if_ready()
+
+    def show_if_ready(self):
+        position = self.position
+        if position == self.shown_position or not self.frames_ready(position):
+            return
+        for sequence, buffer in enumerate(self.buffers):
+            index = buffer.clamp(position)
+            self.frame_shown.emit(position, sequence, buffer.paths[index], buffer.get(index))
+        self.shown_position = position
+        self.shown_times.append(time.perf_counter())
+
+    def achieved_fps(self):
+        now = time.perf_counter()
+        recent = [t for t in self.shown_times if now - t <= 1.0]
+        if len(recent) < 2:
+            return 0.0
+        return (len(recent) - 1) / (recent[-1] - recent[0]) if recent[-1] > recent[0] else 0.0
+
+    def emit_stats(self):
+        self.stats_changed.emit(self.achieved_fps(), self.dropped)
+
+    def stop(self):
+        self.pause()
+        self.pool.clear()
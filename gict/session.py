@@ -0,0 +1,162 @@
+"""Session files: the file list, regions and settings of a comparison
+
+A session is a small JSON document (``*.gict``). Each file entry keeps the
+fingerprint the file had when the session was saved and the name of its
+cached preview, so a session can be shown from previews straight away and
+changed files can be detected without decoding them.
+"""
+import json
+import os
+
+from PyQt5.QtGui import QColor
+
+from .cache import PreviewCache, file_fingerprint
+from .roi import RoiSet
+
+# Version 1, with two fixed rectangles per file, was never released and is not read
+SESSION_VERSION = 2
+SESSION_SUFFIX = '.gict'
+
+
+def settings_to_json(settings):
+    return {key: value.name() if isinstance(value, QColor) else value
+            for key, value in settings.items()}
+
+
+def settings_from_json(data):
+    return {key: QColor(value) if key.endswith('_color') else value
+            for key, value in data.items()}
+
+
+class SessionEntry:
+    """One image of a session"""
+
+    def __init__(self, path, fingerprint=None, width=0, height=0, preview=None):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.width = width
+        self.height = height
+        self.preview = preview
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def is_changed(self):
+        """True if the file no longer matches the saved fingerprint
+
+        Only size and modification time are compared so that a session whose
+        files were moved together with it still counts as unchanged.
+        """
+        current = file_fingerprint(self.path)
+        if current is None or not self.fingerprint:
+            return True
+        return current[1:] != self.fingerprint[1:]
+
+
+class Session:
+
+    def __init__(self, entries=None, settings=None, rois=None):
+        self.entries = entries or []
+        self.settings = settings or {}
+        self.rois = rois if rois is not None else RoiSet()
+
+    @property
+    def file_paths(self):
+        return [entry.path for entry in self.entries]
+
+
+def _resolve(session_dir, data):
+    path = data['path']
+    if os.path.exists(path):
+        return path
+    relative = data.get('relative_path')
+    if relative:
+        candidate = os.path.normpath(os.path.join(session_dir, relative))
+        if os.path.exists(candidate):
+            return candidate
+    return path
+
+
+def save_session(path, widgets, rois, settings, preview_cache=None):
+    """Write the state of *widgets*, *rois* and *settings* to *path*
+
+    Widgets whose full resolution image is loaded contribute a preview to the
+    preview cache so the session opens without decoding the originals.
+    """
+    preview_cache = preview_cache or PreviewCache()
+    session_dir = os.path.dirname(os.path.abspath(path))
+    files = []
+    for widget in widgets:
+        image_path = os.path.abspath(widget.image_path)
+        fingerprint = file_fingerprint(image_path)
+        preview = getattr(widget, 'preview_name', None)
+        if widget.original_pixmap and fingerprint:
+            preview = preview_cache.put(fingerprint, widget.original_pixmap.toImage())
+
+        try:
+            relative_path = os.path.relpath(image_path, session_dir)
+        except ValueError:
+            relative_path = None
+
+        files.append({
+            'path': image_path,
+            'relative_path': relative_path,
+            'fingerprint': fingerprint,
+            'width': widget.image_size.width(),
+            'height': widget.image_size.height(),
+            'preview': preview,
+        })
+
+    data = {
+        'version': SESSION_VERSION,
+        'files': files,
+        'rois': rois.to_json(),
+        'settings': settings_to_json(settings),
+    }
+    tmp_path = path + '.tmp'
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def load_session(path):
+    """Read a session file, raise ValueError if it is not one"""
+    try:
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        raise ValueError(f"cannot read session {path}: {e}")
+    if not isinstance(data, dict):
+        raise ValueError(f"not a session: {path}")
+    try:
+        return _parse_session(path, data)
+    except (KeyError, TypeError, AttributeError) as e:
+        # Valid JSON of the wrong shape, e.g. a file entry without a path
+        raise ValueError(f"invalid session {path}: {type(e).__name__}: {e}")
+
+
+def _parse_session(path, data):
+    version = data.get('version')
+    if version != SESSION_VERSION:
+        raise ValueError(f"unsupported session version in {path}")
+
+    session_dir = os.path.dirname(os.path.abspath(path))
+    entries = []
+    for item in data.get('files', []):
+        entries.append(SessionEntry(
+            _resolve(session_dir, item),
+            fingerprint=item.get('fingerprint'),
+            width=item.get('width', 0),
+            height=item.get('height', 0),
+            preview=item.get('preview'),
+        ))
+    settings = settings_from_json(data.get('settings', {}))
+    rois = RoiSet.from_json(data.get('rois', []))
+    return Session(entries, settings, rois)
@@ -0,0 +1,295 @@
+"""Comparison sets: groups of images of the same scene from several methods
+
+Sets are built either from method folders (``root/methodA/scene_012.png``,
+``root/methodB/scene_012.png``, ...), matched by file name, or from a regular
+expression whose first group is the scene key (``(IMG_\\d+)`` groups
+``IMG_2980.png`` with ``IMG_2980_primary.png``). A group named ``method``
+names the method of files kept in one folder
+(``(?P<scene>IMG_\\d+)_?(?P<method>.*)\\.``). Folder listings come from the
+directory index, so opening the same folders again costs one stat each.
+"""
+import os
+import re
+from collections import OrderedDict
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+from . import dirindex, memory, raw, tracing
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff', '.webp') + raw.RAW_EXTENSIONS
+
+
+def is_image(name):
+    return name.lower().endswith(IMAGE_EXTENSIONS)
+
+
+def method_folders(root):
+    """The sub folders of *root*, or *root* itself if it has none"""
+    listing = dirindex.shared_cache().listing(root)
+    if listing is None:
+        return []
+    return [os.path.join(root, name) for name in listing.folders] or [root]
+
+
+class SceneRules:
+    """Which scene and which method a file name belongs to
+
+    *key_pattern* is a regular expression: its group named ``scene`` (else
+    its first group, else the whole match) is the scene key, and a group
+    named ``method`` names the method. Without a pattern the scene is the
+    file name without extension.
+    """
+
+    def __init__(self, key_pattern=None):
+        self.pattern = re.compile(key_pattern) if key_pattern else None
+
+    def match(self, name):
+        """(scene, method or None), None if *name* has no scene key"""
+        if self.pattern is None:
+            return os.path.splitext(name)[0], None
+        match = self.pattern.search(name)
+        if not match:
+            return None
+        groups = match.groupdict()
+        if groups.get('scene') is not None:
+            scene = groups['scene']
+        else:
+            scene = match.group(1) if match.groups() else match.group(0)
+        return scene, groups.get('method') or None
+
+
+class SceneTable:
+    """scene -> {method: path}, with the methods in the order they were found"""
+
+    def __init__(self):
+        self.scenes = {}
+        self.methods = []
+
+    def add(self, scene, method, path):
+        methods = self.scenes.setdefault(scene, {})
+        if method in methods:  # several files of one method match the scene
+            method = os.path.join(method, os.path.basename(path))
+        if method not in self.methods:
+            self.methods.append(method)
+        methods[method] = path
+
+    def paths(self, scene):
+        methods = self.scenes.get(scene, {})
+        return [methods[method] for method in self.methods if method in methods]
+
+    def sets(self):
+        """[(scene, [paths])] sorted by scene, paths in method order"""
+        return [(scene, self.paths(scene)) for scene in sorted(self.scenes)]
+
+
+def build_table(folders, key_pattern=None):
+    """SceneTable of the images in *folders*
+
+    Files without a method group belong to the method of their folder, or
+    in a single flat folder each file name is a method of its own.
+    """
+    rules = SceneRules(key_pattern)
+    listings = dirindex.shared_cache().listings(folders)
+    table = SceneTable()
+    for folder in folders:
+        listing = listings[folder]
+        if listing is None:
+            continue
+        for name in listing.files:
+            match = rules.match(name) if is_image(name) else None
+            if match is None:
+                continue
+            scene, method = match
+            if method is None:
+                method = os.path.splitext(name)[0] if len(folders) == 1 else os.path.basename(folder)
+            table.add(scene, method, os.path.join(folder, name))
+    return table
+
+
+def build_sets(folders, key_pattern=None):
+    """Return [(key, [paths])] sorted by key, paths ordered by method"""
+    return build_table(folders, key_pattern).sets()
+
+
+@tracing.traced(name='sets.index_root')
+def index_root(root, key_pattern=None):
+    """SceneTable of the method folders of *root* (or of *root* itself)"""
+    table = build_table(method_folders(root), key_pattern)
+    dirindex.shared_cache().save()
+    return table
+
+
+class _IndexTask(QRunnable):
+
+    def __init__(self, indexer, job_id, root, key_pattern):
+        super().__init__()
+        self.indexer = indexer
+        self.job_id = job_id
+        self.root = root
+        self.key_pattern = key_pattern
+
+    def run(self):
+        try:
+            table = index_root(self.root, self.key_pattern)
+        except Exception as e:  # reported instead of killing the worker thread
+            self.indexer.signals.failed.emit(self.job_id, str(e))
+            return
+        self.indexer.signals.finished.emit(self.job_id, table)
+
+
+class _IndexSignals(QObject):
+    finished = pyqtSignal(int, object)
+    failed = pyqtSignal(int, str)
+
+
+class SceneIndexer(QObject):
+    """Builds the scene table of a folder in the background"""
+
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self.signals = _IndexSignals()
+        self.signals.finished.connect(self.on_finished)
+        self.signals.failed.connect(self.on_failed)
+        self.job_id = 0
+        self.busy = False
+
+    def start(self, root, key_pattern=None):
+        self.job_id += 1
+        self.busy = True
+        self.pool.start(_IndexTask(self, self.job_id, root, key_pattern))
+
+    def is_busy(self):
+        return self.busy
+
+    def on_finished(self, job_id, table):
+        if job_id == self.job_id:
+            self.busy = False
+            self.finished.emit(table)
+
+    def on_failed(self, job_id, message):
+        if job_id == self.job_id:
+            self.busy = False
+            self.failed.emit(message)
+
+
+class SetPrefetcher(QObject):
+    """Decoded images of the current and neighbouring sets, within a memory budget
+
+    Decoding goes through the shared image loader, so an image that a widget
+    is waiting for and the same image being prefetched are decoded once.
+    Images are kept in least recently used order; the oldest ones are dropped
+    once the decoded size exceeds the budget. The memory manager may drop
+    the whole cache when it needs room for images that are on screen.
+    """
+
+    def __init__(self, image_loader, budget_bytes=512 * 1024 * 1024, parent=None):
+        super().__init__(parent)
+        self.loader = image_loader
+        self.budget_bytes = budget_bytes
+        self.cache = OrderedDict()
+        self.cached_bytes = 0
+        self.wanted = set()
+        self.loader.loaded.connect(self.on_loaded)
+
+    def get(self, path):
+        image = self.cache.get(path)
+        tracing.count('prefetch cache', image is not None)
+        if image is not None:
+            self.cache.move_to_end(path)
+        return image
+
+    def prefetch(self, paths, priority=0):
+        for path in paths:
+            if path in self.cache:
+                self.cache.move_to_end(path)
+            else:
+                self.wanted.add(path)
+                self.loader.request(path, priority=priority)
+
+    def on_loaded(self, path, image):
+        if path not in self.wanted:
+            return
+        self.wanted.discard(path)
+        size = image.sizeInBytes()
+        if image.isNull() or size > self.budget_bytes:
+            return
+        if path in self.cache:
+            self.cached_bytes -= self.cache.pop(path).sizeInBytes()
+        self.cache[path] = image
+        self.cached_bytes += size
+        self.evict()
+
+    def evict(self):
+        while self.cached_bytes > self.budget_bytes and self.cache:
+            _, image = self.cache.popitem(last=False)
+            self.cached_bytes -= image.sizeInBytes()
+        memory.shared_manager().account(self, {memory.PREFETCH: self.cached_bytes})
+
+    def evict_representation(self, kind):
+        if not self.cache:
+            return False
+        self.cache.clear()
+        self.cached_bytes = 0
+        memory.shared_manager().account(self, {memory.PREFETCH: 0})
+        return True
+
+    def set_budget(self, budget_bytes):
+        self.budget_bytes = budget_bytes
+        self.evict()
+
+    def discard(self, path):
+        """Forget *path*, e.g. because the file changed on disk"""
+        image = self.cache.pop(path, None)
+        if image is not None:
+            self.cached_bytes -= image.sizeInBytes()
+            memory.shared_manager().account(self, {memory.PREFETCH: self.cached_bytes})
+
+    def clear(self):
+        self.cache.clear()
+        self.cached_bytes = 0
+        self.wanted.clear()
+        memory.shared_manager().account(self, {memory.PREFETCH: 0})
+
+
+class SetNavigator(QObject):
+    """Steps through comparison sets and prefetches the neighbouring ones"""
+
+    current_changed = pyqtSignal(int)
+
+    def __init__(self, sets, prefetcher, prefetch_radius=1, parent=None):
+        super().__init__(parent)
+        self.sets = sets
+        self.prefetcher = prefetcher
+        self.prefetch_radius = prefetch_radius
+        self.index = 0
+
+    def __len__(self):
+        return len(self.sets)
+
+    def current(self):
+        return self.sets[self.index] if self.sets else (None, [])
+
+    def go_to(self, index):
+        if not self.sets:
+            return
+        self.index = max(0, min(index, len(self.sets) - 1))
+        self.current_changed.emit(self.index)
+        self.prefetch_neighbours()
+
+    def next(self):
+        self.go_to(self.index + 1)
+
+    def previous(self):
+        self.go_to(self.index - 1)
+
+    def prefetch_neighbours(self):
+        """Queue the sets next to the current one, nearest first"""
+        for offset in range(1, self.prefetch_radius + 1):
+            for index in (self.index + offset, self.index - offset):
+                if 0 <= index < len(self.sets):
+                    self.prefetcher.prefetch(self.sets[index][1])
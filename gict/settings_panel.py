@@ -0,0 +1,853 @@
+"""Settings panel: region, magnifier and export settings plus the mode controls"""
+import os
+
+from PyQt5.QtCore import QTimer, Qt, pyqtSignal
+from PyQt5.QtGui import QIcon, QPixmap
+from PyQt5.QtWidgets import (QCheckBox, QColorDialog, QComboBox, QCompleter, QDoubleSpinBox,
+                             QFileDialog, QFormLayout, QGroupBox, QHBoxLayout, QInputDialog, QLabel,
+                             QLineEdit, QListWidget, QListWidgetItem, QMessageBox, QProgressBar,
+                             QPushButton, QSlider, QSpinBox, QVBoxLayout, QWidget)
+
+from . import channels, export, memory, pixels, raw, resample, thumbnails, tracing
+from .strings import tr
+
+RESAMPLING_METHODS = (
+    (resample.NEAREST, "Nearest (sharp pixels)"),
+    (resample.BILINEAR, "Bilinear"),
+    (resample.LANCZOS, "Lanczos"),
+)
+
+CHANNEL_VIEWS = (
+    (channels.RGB, "Colour"),
+    (channels.RED, "Red"),
+    (channels.GREEN, "Green"),
+    (channels.BLUE, "Blue"),
+    (channels.ALPHA, "Alpha"),
+    (channels.LUMA, "Luminance"),
+    (channels.CHROMA, "Chroma"),
+)
+
+ANALYSIS_MODES = (
+    ('std', "Standard deviation"),
+    ('range', "Max - min"),
+)
+
+SIMILARITY_HASHES = (
+    ('dhash', "Gradients (dHash)"),
+    ('phash', "Frequencies (pHash)"),
+)
+
+MEMORY_KIND_LABELS = {
+    memory.ORIGINAL: "Original",
+    memory.PREVIEW: "Preview",
+    memory.DISPLAY: "Display",
+    memory.MAGNIFIER: "Magnifier",
+    memory.CHANNELS: "Channels",
+    memory.ANALYSIS: "Analysis",
+    memory.PREFETCH: "Prefetch",
+    memory.EXPORT: "Export",
+}
+
+
+def export_status_text(status):
+    from . import jobs
+    return tr({
+        jobs.PENDING: "pending",
+        jobs.RUNNING: "saving...",
+        jobs.SAVED: "saved",
+        jobs.SKIPPED: "unchanged, skipped",
+        jobs.FAILED: "failed",
+        jobs.CANCELLED: "cancelled",
+    }[status])
+
+
+def color_icon(color):
+    pixmap = QPixmap(12, 12)
+    pixmap.fill(color)
+    return QIcon(pixmap)
+
+
+class SettingsPanel(QWidget):
+
+    settings_changed = pyqtSignal(dict)
+    # A region was added, removed or edited
+    rois_changed = pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.player = None
+        self.rois = None
+        self.over_budget = 0
+        # Memory totals change on every paint, refresh the label at most 4 times a second
+        self.memory_timer = QTimer(self)
+        self.memory_timer.setSingleShot(True)
+        self.memory_timer.setInterval(250)
+        self.memory_timer.timeout.connect(self.show_memory_usage)
+        self.init_ui()
+
+    def init_ui(self):
+        layout = QVBoxLayout(self)
+
+        # General Settings
+        general_group = QGroupBox(tr("General Settings"))
+        general_layout = QFormLayout(general_group)
+
+        self.line_width_spin = QSpinBox()
+        self.line_width_spin.setRange(1, 20)
+        self.line_width_spin.setValue(4)
+        self.line_width_spin.valueChanged.connect(self.emit_settings)
+        general_layout.addRow(tr("Line width (px):"), self.line_width_spin)
+
+        self.margin_spin = QSpinBox()
+        self.margin_spin.setRange(0, 100)
+        self.margin_spin.setValue(10)
+        self.margin_spin.valueChanged.connect(self.emit_settings)
+        general_layout.addRow(tr("Margin (px):"), self.margin_spin)
+
+        layout.addWidget(general_group)
+
+        self.magnified_check = QCheckBox("")
+        self.magnified_check.setChecked(True)
+        self.magnified_check.stateChanged.connect(self.emit_settings)
+        general_layout.addRow(tr("Display the enlarged image: "), self.magnified_check)
+
+        self.channel_view_combo = QComboBox()
+        for view, label in CHANNEL_VIEWS:
+            self.channel_view_combo.addItem(tr(label), view)
+        self.channel_view_combo.currentIndexChanged.connect(self.change_channel_view)
+        general_layout.addRow(tr("View:"), self.channel_view_combo)
+
+        # Regions
+        roi_group = QGroupBox(tr("Regions"))
+        roi_layout = QFormLayout(roi_group)
+
+        self.roi_list = QListWidget()
+        self.roi_list.setMaximumHeight(120)
+        self.roi_list.currentRowChanged.connect(self.select_roi)
+        self.roi_list.itemChanged.connect(self.roi_item_changed)
+        roi_layout.addRow(self.roi_list)
+
+        roi_buttons = QHBoxLayout()
+        self.add_roi_btn = QPushButton(tr("Add"))
+        self.add_roi_btn.clicked.connect(self.add_roi)
+        roi_buttons.addWidget(self.add_roi_btn)
+        self.remove_roi_btn = QPushButton(tr("Remove"))
+        self.remove_roi_btn.clicked.connect(self.remove_roi)
+        roi_buttons.addWidget(self.remove_roi_btn)
+        roi_layout.addRow(roi_buttons)
+
+        self.roi_name_edit = QLineEdit()
+        self.roi_name_edit.editingFinished.connect(self.rename_roi)
+        roi_layout.addRow(tr("Name:"), self.roi_name_edit)
+
+        self.roi_color_btn = QPushButton()
+        self.roi_color_btn.clicked.connect(self.choose_color)
+        roi_layout.addRow(tr("Color:"), self.roi_color_btn)
+
+        self.roi_scale_spin = QDoubleSpinBox()
+        self.roi_scale_spin.setRange(0.1, 10.0)
+        self.roi_scale_spin.setValue(1.0)
+        self.roi_scale_spin.setSingleStep(0.1)
+        self.roi_scale_spin.valueChanged.connect(self.edit_roi)
+        roi_layout.addRow(tr("Zoom ratio:"), self.roi_scale_spin)
+
+        self.roi_position_combo = QComboBox()
+        self.roi_position_combo.addItems([tr("Top Left"), tr("Top Right"), tr("Bottom Left"), tr("Bottom Right")])
+        self.roi_position_combo.currentIndexChanged.connect(self.edit_roi)
+        roi_layout.addRow(tr("Position:"), self.roi_position_combo)
+
+        self.roi_resampling_combo = QComboBox()
+        for key, label in RESAMPLING_METHODS:
+            self.roi_resampling_combo.addItem(tr(label), key)
+        self.roi_resampling_combo.currentIndexChanged.connect(self.edit_roi)
+        roi_layout.addRow(tr("Resampling:"), self.roi_resampling_combo)
+
+        roi_hint = QLabel(tr("Drag to draw the selected region, Shift+drag to add one. "
+                             "Drag inside a region to move it, drag a corner to resize it."))
+        roi_hint.setWordWrap(True)
+        roi_layout.addRow(roi_hint)
+
+        layout.addWidget(roi_group)
+
+        # Loupe
+        loupe_group = QGroupBox(tr("Loupe"))
+        loupe_layout = QFormLayout(loupe_group)
+
+        self.loupe_check = QCheckBox(tr("Show a loupe under the cursor"))
+        self.loupe_check.stateChanged.connect(self.emit_settings)
+        loupe_layout.addRow(self.loupe_check)
+
+        self.loupe_zoom_spin = QDoubleSpinBox()
+        self.loupe_zoom_spin.setRange(1.0, 32.0)
+        self.loupe_zoom_spin.setValue(4.0)
+        self.loupe_zoom_spin.setSingleStep(1.0)
+        self.loupe_zoom_spin.valueChanged.connect(self.emit_settings)
+        loupe_layout.addRow(tr("Zoom ratio:"), self.loupe_zoom_spin)
+
+        self.loupe_size_spin = QSpinBox()
+        self.loupe_size_spin.setRange(64, 512)
+        self.loupe_size_spin.setSingleStep(16)
+        self.loupe_size_spin.setValue(160)
+        self.loupe_size_spin.valueChanged.connect(self.emit_settings)
+        loupe_layout.addRow(tr("Size (px):"), self.loupe_size_spin)
+
+        self.loupe_shape_combo = QComboBox()
+        self.loupe_shape_combo.addItems([tr("Square"), tr("Circle")])
+        self.loupe_shape_combo.currentIndexChanged.connect(self.emit_settings)
+        loupe_layout.addRow(tr("Shape:"), self.loupe_shape_combo)
+
+        layout.addWidget(loupe_group)
+
+        # Pixel Values
+        pixel_group = QGroupBox(tr("Pixel Values"))
+        pixel_layout = QVBoxLayout(pixel_group)
+
+        self.pixel_check = QCheckBox(tr("Show the values under the cursor"))
+        self.pixel_check.stateChanged.connect(self.emit_settings)
+        pixel_layout.addWidget(self.pixel_check)
+
+        self.pixel_label = QLabel("")
+        self.pixel_label.setStyleSheet("font-family: monospace;")
+        self.pixel_label.setTextInteractionFlags(Qt.TextSelectableByMouse)
+        pixel_layout.addWidget(self.pixel_label)
+
+        layout.addWidget(pixel_group)
+
+        # File Operations
+        file_group = QGroupBox(tr("File Operations"))
+        file_layout = QVBoxLayout(file_group)
+
+        self.load_btn = QPushButton(tr("Load images"))
+        self.load_btn.clicked.connect(self.load_images)
+        file_layout.addWidget(self.load_btn)
+
+        self.save_btn = QPushButton(tr("Save the entire image"))
+        self.save_btn.clicked.connect(self.save_images)
+        file_layout.addWidget(self.save_btn)
+
+        self.save_local_btn = QPushButton(tr("Save the image of the region"))
+        self.save_local_btn.clicked.connect(self.save_local_images)
+        file_layout.addWidget(self.save_local_btn)
+
+        self.open_session_btn = QPushButton(tr("Open session"))
+        self.open_session_btn.clicked.connect(self.open_session)
+        file_layout.addWidget(self.open_session_btn)
+
+        self.save_session_btn = QPushButton(tr("Save session"))
+        self.save_session_btn.clicked.connect(self.save_session)
+        file_layout.addWidget(self.save_session_btn)
+
+        self.watch_btn = QPushButton(tr("Watch folder"))
+        self.watch_btn.clicked.connect(self.watch_folder)
+        file_layout.addWidget(self.watch_btn)
+
+        self.stop_watch_btn = QPushButton(tr("Stop watching"))
+        self.stop_watch_btn.setEnabled(False)
+        self.stop_watch_btn.clicked.connect(self.stop_watching)
+        file_layout.addWidget(self.stop_watch_btn)
+
+        self.watch_status_label = QLabel("")
+        self.watch_status_label.setWordWrap(True)
+        file_layout.addWidget(self.watch_status_label)
+
+        file_layout.addWidget(QLabel(tr("Export format:")))
+        self.export_profile_combo = QComboBox()
+        for profile in export.PROFILES:
+            self.export_profile_combo.addItem(tr(profile.label), profile.key)
+        self.export_profile_combo.currentIndexChanged.connect(self.emit_settings)
+        file_layout.addWidget(self.export_profile_combo)
+
+        self.export_progress = QProgressBar()
+        self.export_progress.setValue(0)
+        file_layout.addWidget(self.export_progress)
+
+        self.export_status_label = QLabel("")
+        self.export_status_label.setWordWrap(True)
+        file_layout.addWidget(self.export_status_label)
+
+        self.export_list = QListWidget()
+        self.export_list.setMaximumHeight(120)
+        file_layout.addWidget(self.export_list)
+
+        self.cancel_export_btn = QPushButton(tr("Cancel export"))
+        self.cancel_export_btn.setEnabled(False)
+        self.cancel_export_btn.clicked.connect(self.cancel_export)
+        file_layout.addWidget(self.cancel_export_btn)
+
+
+
+        layout.addWidget(file_group)
+
+        # Comparison Sets
+        sets_group = QGroupBox(tr("Comparison Sets"))
+        sets_layout = QFormLayout(sets_group)
+
+        self.open_sets_btn = QPushButton(tr("Open sets"))
+        self.open_sets_btn.clicked.connect(self.open_sets)
+        sets_layout.addRow(self.open_sets_btn)
+
+        self.open_report_btn = QPushButton(tr("Open regression report"))
+        self.open_report_btn.clicked.connect(self.open_report)
+        sets_layout.addRow(self.open_report_btn)
+
+        self.group_similar_btn = QPushButton(tr("Group similar images"))
+        self.group_similar_btn.clicked.connect(self.group_similar)
+        sets_layout.addRow(self.group_similar_btn)
+
+        self.similar_hash_combo = QComboBox()
+        for key, label in SIMILARITY_HASHES:
+            self.similar_hash_combo.addItem(tr(label), key)
+        sets_layout.addRow(tr("Hash:"), self.similar_hash_combo)
+
+        self.similar_threshold_spin = QSpinBox()
+        self.similar_threshold_spin.setRange(0, 12)
+        self.similar_threshold_spin.setValue(10)
+        self.similar_threshold_spin.setToolTip(tr("Hashes differing in at most this many of 64 bits are grouped"))
+        sets_layout.addRow(tr("Threshold (bits):"), self.similar_threshold_spin)
+
+        navigation_layout = QHBoxLayout()
+        self.previous_set_btn = QPushButton(tr("Previous"))
+        self.previous_set_btn.clicked.connect(lambda: self.window().step_set(-1))
+        navigation_layout.addWidget(self.previous_set_btn)
+        self.next_set_btn = QPushButton(tr("Next"))
+        self.next_set_btn.clicked.connect(lambda: self.window().step_set(1))
+        navigation_layout.addWidget(self.next_set_btn)
+        sets_layout.addRow(navigation_layout)
+
+        self.scene_combo = QComboBox()
+        self.scene_combo.setEditable(True)
+        self.scene_combo.setInsertPolicy(QComboBox.NoInsert)
+        self.scene_combo.completer().setFilterMode(Qt.MatchContains)
+        self.scene_combo.completer().setCompletionMode(QCompleter.PopupCompletion)
+        self.scene_combo.activated.connect(lambda index: self.window().go_to_set(index))
+        sets_layout.addRow(tr("Scene:"), self.scene_combo)
+
+        self.set_status_label = QLabel("")
+        self.set_status_label.setWordWrap(True)
+        sets_layout.addRow(self.set_status_label)
+
+        self.prefetch_budget_spin = QSpinBox()
+        self.prefetch_budget_spin.setRange(0, 65536)
+        self.prefetch_budget_spin.setSingleStep(256)
+        self.prefetch_budget_spin.setValue(1024)
+        self.prefetch_budget_spin.valueChanged.connect(
+            lambda value: self.window().set_prefetch_budget(value))
+        sets_layout.addRow(tr("Prefetch memory (MB):"), self.prefetch_budget_spin)
+
+        layout.addWidget(sets_group)
+
+        # Disagreement Map
+        analysis_group = QGroupBox(tr("Disagreement Map"))
+        analysis_layout = QFormLayout(analysis_group)
+
+        self.analysis_check = QCheckBox(tr("Show where the images disagree"))
+        self.analysis_check.toggled.connect(lambda checked: self.window().show_analysis(checked))
+        analysis_layout.addRow(self.analysis_check)
+
+        self.analysis_mode_combo = QComboBox()
+        for key, label in ANALYSIS_MODES:
+            self.analysis_mode_combo.addItem(tr(label), key)
+        self.analysis_mode_combo.currentIndexChanged.connect(lambda: self.window().schedule_analysis())
+        analysis_layout.addRow(tr("Measure:"), self.analysis_mode_combo)
+
+        self.analysis_status_label = QLabel("")
+        self.analysis_status_label.setWordWrap(True)
+        analysis_layout.addRow(self.analysis_status_label)
+
+        layout.addWidget(analysis_group)
+
+        # Sequences
+        sequence_group = QGroupBox(tr("Sequences"))
+        sequence_layout = QFormLayout(sequence_group)
+
+        self.open_sequences_btn = QPushButton(tr("Open sequences"))
+        self.open_sequences_btn.clicked.connect(self.open_sequences)
+        sequence_layout.addRow(self.open_sequences_btn)
+
+        self.play_btn = QPushButton(tr("Play"))
+        self.play_btn.setEnabled(False)
+        self.play_btn.clicked.connect(self.toggle_playback)
+        sequence_layout.addRow(self.play_btn)
+
+        self.timeline_slider = QSlider(Qt.Horizontal)
+        self.timeline_slider.setEnabled(False)
+        self.timeline_slider.valueChanged.connect(self.scrub)
+        sequence_layout.addRow(self.timeline_slider)
+
+        self.fps_spin = QDoubleSpinBox()
+        self.fps_spin.setRange(1.0, 240.0)
+        self.fps_spin.setValue(24.0)
+        self.fps_spin.valueChanged.connect(self.set_fps)
+        sequence_layout.addRow(tr("Frame rate (fps):"), self.fps_spin)
+
+        self.sequence_status_label = QLabel("")
+        sequence_layout.addRow(self.sequence_status_label)
+
+        layout.addWidget(sequence_group)
+
+        # Diagnostics
+        diagnostics_group = QGroupBox(tr("Diagnostics"))
+        diagnostics_layout = QFormLayout(diagnostics_group)
+
+        self.trace_check = QCheckBox(tr("Record timings"))
+        self.trace_check.setChecked(tracing.is_enabled())
+        self.trace_check.toggled.connect(tracing.set_enabled)
+        diagnostics_layout.addRow(self.trace_check)
+
+        self.overlay_check = QCheckBox(tr("Show frame timing overlay"))
+        self.overlay_check.toggled.connect(lambda checked: self.window().show_trace_overlay(checked))
+        diagnostics_layout.addRow(self.overlay_check)
+
+        self.export_trace_btn = QPushButton(tr("Export trace"))
+        self.export_trace_btn.clicked.connect(self.export_trace)
+        diagnostics_layout.addRow(self.export_trace_btn)
+
+        self.trace_status_label = QLabel("")
+        self.trace_status_label.setWordWrap(True)
+        diagnostics_layout.addRow(self.trace_status_label)
+
+        layout.addWidget(diagnostics_group)
+
+        # Decoding
+        decoding_group = QGroupBox(tr("Decoding"))
+        decoding_layout = QFormLayout(decoding_group)
+
+        self.process_decode_check = QCheckBox(tr("Decode in worker processes"))
+        self.process_decode_check.setToolTip(
+            tr("Decodes large or heavily compressed files on all cores, each image in its own process"))
+        self.process_decode_check.toggled.connect(
+            lambda checked: self.window().set_process_decoding(checked))
+        decoding_layout.addRow(self.process_decode_check)
+
+        self.quick_preview_check = QCheckBox(tr("Show camera previews while decoding"))
+        self.quick_preview_check.setToolTip(
+            tr("Shows the thumbnail embedded in large JPEGs, or a quick downscaled decode, until the full image is ready"))
+        self.quick_preview_check.setChecked(thumbnails.is_enabled())
+        self.quick_preview_check.toggled.connect(thumbnails.set_enabled)
+        decoding_layout.addRow(self.quick_preview_check)
+
+        layout.addWidget(decoding_group)
+
+        # Memory
+        memory_group = QGroupBox(tr("Memory"))
+        memory_layout = QFormLayout(memory_group)
+
+        self.memory_budget_spin = QSpinBox()
+        self.memory_budget_spin.setRange(0, 1024 * 1024)
+        self.memory_budget_spin.setSingleStep(512)
+        self.memory_budget_spin.setSpecialValueText(tr("No limit"))
+        self.memory_budget_spin.setValue(4096)
+        self.memory_budget_spin.valueChanged.connect(
+            lambda value: self.window().set_memory_budget(value))
+        memory_layout.addRow(tr("Image memory (MB):"), self.memory_budget_spin)
+
+        self.memory_label = QLabel("")
+        self.memory_label.setWordWrap(True)
+        memory_layout.addRow(self.memory_label)
+
+        layout.addWidget(memory_group)
+        layout.addStretch()
+
+    def show_rois(self, rois):
+        """Fill the region list and select the current region"""
+        self.rois = rois
+        self.roi_list.blockSignals(True)
+        self.roi_list.clear()
+        for region in rois:
+            item = QListWidgetItem(color_icon(region.color), region.name)
+            item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
+            item.setCheckState(Qt.Checked if region.enabled else Qt.Unchecked)
+            self.roi_list.addItem(item)
+        if rois.current is not None:
+            self.roi_list.setCurrentRow(rois.rois.index(rois.current))
+        self.roi_list.blockSignals(False)
+        self.show_current_roi()
+
+    def show_current_roi(self):
+        region = self.rois.current
+        controls = [self.roi_name_edit, self.roi_scale_spin, self.roi_position_combo,
+                    self.roi_resampling_combo]
+        for control in controls + [self.roi_color_btn, self.remove_roi_btn]:
+            control.setEnabled(region is not None)
+        if region is None:
+            return
+        for control in controls:
+            control.blockSignals(True)
+        self.roi_name_edit.setText(region.name)
+        self.roi_scale_spin.setValue(region.scale)
+        self.roi_position_combo.setCurrentIndex(region.position)
+        self.roi_resampling_combo.setCurrentIndex(max(0, self.roi_resampling_combo.findData(region.resampling)))
+        self.roi_color_btn.setStyleSheet(f"background-color: {region.color.name()}")
+        for control in controls:
+            control.blockSignals(False)
+
+    def select_roi(self, row):
+        if 0 <= row < len(self.rois):
+            self.rois.current = self.rois.rois[row]
+            self.show_current_roi()
+
+    def roi_item_changed(self, item):
+        region = self.rois.rois[self.roi_list.row(item)]
+        region.enabled = item.checkState() == Qt.Checked
+        self.rois_changed.emit()
+
+    def add_roi(self):
+        self.rois.current = self.rois.new_roi()
+        self.show_rois(self.rois)
+        self.rois_changed.emit()
+
+    def remove_roi(self):
+        if self.rois.current is not None:
+            self.rois.remove(self.rois.current)
+            self.show_rois(self.rois)
+            self.rois_changed.emit()
+
+    def rename_roi(self):
+        region = self.rois.current
+        if region is None:
+            return
+        if self.rois.rename(region, self.roi_name_edit.text()):
+            self.show_rois(self.rois)
+        else:
+            self.roi_name_edit.setText(region.name)
+
+    def edit_roi(self):
+        region = self.rois.current
+        if region is None:
+            return
+        region.scale = self.roi_scale_spin.value()
+        region.position = self.roi_position_combo.currentIndex()
+        region.resampling = self.roi_resampling_combo.currentData()
+        self.rois_changed.emit()
+
+    def choose_color(self):
+        """Select the color of the current region"""
+        region = self.rois.current
+        if region is None:
+            return
+        color = QColorDialog.getColor(region.color, self)
+        if color.isValid():
+            region.color = color
+            self.show_rois(self.rois)
+            self.rois_changed.emit()
+
+    def change_channel_view(self):
+        if self.channel_view_combo.currentData() != channels.RGB and not channels.available():
+            QMessageBox.warning(self, tr("Warning!"), tr("The channel views need numpy"))
+            self.channel_view_combo.setCurrentIndex(0)
+            return
+        self.emit_settings()
+
+    def emit_settings(self):
+        """Send signal"""
+        settings = {
+            'line_width': self.line_width_spin.value(),
+            'margin': self.margin_spin.value(),
+            'show_magnified': self.magnified_check.isChecked(),
+            'channel_view': self.channel_view_combo.currentData(),
+            'loupe_enabled': self.loupe_check.isChecked(),
+            'loupe_zoom': self.loupe_zoom_spin.value(),
+            'loupe_size': self.loupe_size_spin.value(),
+            'loupe_circle': self.loupe_shape_combo.currentIndex() == 1,
+            'pixel_readout': self.pixel_check.isChecked(),
+            'export_profile': self.export_profile_combo.currentData()
+        }
+        self.settings_changed.emit(settings)
+
+    def apply_settings(self, settings):
+        """Restore the controls from a settings dict, then emit it once"""
+        controls = [self.line_width_spin, self.margin_spin, self.magnified_check,
+                    self.channel_view_combo, self.loupe_check, self.loupe_zoom_spin, self.loupe_size_spin,
+                    self.loupe_shape_combo, self.pixel_check, self.export_profile_combo]
+        for control in controls:
+            control.blockSignals(True)
+
+        self.line_width_spin.setValue(settings.get('line_width', self.line_width_spin.value()))
+        self.margin_spin.setValue(settings.get('margin', self.margin_spin.value()))
+        self.magnified_check.setChecked(settings.get('show_magnified', True))
+        index = self.channel_view_combo.findData(settings.get('channel_view', channels.RGB))
+        if index < 0 or not channels.available():
+            index = 0
+        self.channel_view_combo.setCurrentIndex(index)
+        self.loupe_check.setChecked(settings.get('loupe_enabled', False))
+        self.loupe_zoom_spin.setValue(settings.get('loupe_zoom', self.loupe_zoom_spin.value()))
+        self.loupe_size_spin.setValue(settings.get('loupe_size', self.loupe_size_spin.value()))
+        self.loupe_shape_combo.setCurrentIndex(1 if settings.get('loupe_circle', False) else 0)
+        self.pixel_check.setChecked(settings.get('pixel_readout', False))
+        index = self.export_profile_combo.findData(settings.get('export_profile'))
+        if index >= 0:
+            self.export_profile_combo.setCurrentIndex(index)
+
+        for control in controls:
+            control.blockSignals(False)
+        self.emit_settings()
+
+    def load_images(self):
+        files, _ = QFileDialog.getOpenFileNames(
+            self, tr("Select images"), "",
+            "Image Files (*.png *.jpg *.jpeg *.bmp *.tif *.tiff *.webp "
+            + " ".join('*' + suffix for suffix in raw.RAW_EXTENSIONS) + ")")
+        if any(raw.is_raw(path) for path in files) and not raw.available():
+            QMessageBox.warning(self, tr("Warning!"), tr("Camera RAW files need rawpy"))
+        if files:
+            self.window().reset_modes()
+            self.window().load_images(files)
+
+    def open_session(self):
+        from .session import SESSION_SUFFIX
+        path, _ = QFileDialog.getOpenFileName(
+            self, tr("Open session"), "", f"{tr('GICT session')} (*{SESSION_SUFFIX})")
+        if path:
+            self.window().open_session(path)
+
+    def save_session(self):
+        from .session import SESSION_SUFFIX
+        path, _ = QFileDialog.getSaveFileName(
+            self, tr("Save session"), "", f"{tr('GICT session')} (*{SESSION_SUFFIX})")
+        if path:
+            if not path.endswith(SESSION_SUFFIX):
+                path += SESSION_SUFFIX
+            self.window().save_session(path)
+
+    def watch_folder(self):
+        folder = QFileDialog.getExistingDirectory(self, tr("Choose the folder to watch"))
+        if not folder:
+            return
+        pattern, ok = QInputDialog.getText(self, tr("Watch folder"), tr("File pattern:"), text="*.png")
+        if ok:
+            self.window().watch_folder(folder, pattern)
+
+    def stop_watching(self):
+        self.window().stop_watching()
+
+    def show_watch_status(self, watcher):
+        self.stop_watch_btn.setEnabled(watcher is not None)
+        if watcher is None:
+            self.watch_status_label.setText("")
+            return
+        mode = tr("polling") if watcher.polling else tr("file system events")
+        self.watch_status_label.setText(
+            tr("Watching {folder}/{pattern} ({mode})", folder=watcher.folder, pattern=watcher.pattern, mode=mode))
+
+    def open_sets(self):
+        root = QFileDialog.getExistingDirectory(
+            self, tr("Choose a folder of method folders (or of all images)"))
+        if not root:
+            return
+        pattern, ok = QInputDialog.getText(
+            self, tr("Open sets"),
+            tr("Scene key (regular expression, empty = same file name in every method folder):"),
+            text="")
+        if ok:
+            self.window().open_sets(root, pattern.strip() or None)
+
+    def open_report(self):
+        path, _ = QFileDialog.getOpenFileName(
+            self, tr("Open regression report"), "", f"{tr('Regression report')} (*.json *.csv)")
+        if path:
+            self.window().open_report(path)
+
+    def group_similar(self):
+        folder = QFileDialog.getExistingDirectory(
+            self, tr("Choose a folder, images in all its sub folders are grouped"))
+        if folder:
+            self.window().open_similar_sets(
+                [folder], self.similar_hash_combo.currentData(), self.similar_threshold_spin.value())
+
+    def show_indexing_progress(self, done, total):
+        self.set_status_label.setText(tr("Hashing images... {done}/{total}", done=done, total=total))
+
+    def show_indexing_failed(self, message):
+        self.set_status_label.setText(tr("Cannot group the images: {error}", error=message))
+
+    def show_indexing_started(self):
+        self.set_status_label.setText(tr("Listing folders..."))
+
+    def show_set_keys(self, keys):
+        self.scene_combo.blockSignals(True)
+        self.scene_combo.clear()
+        self.scene_combo.addItems(keys)
+        self.scene_combo.blockSignals(False)
+
+    def show_set_status(self, navigator):
+        if navigator is None or not len(navigator):
+            self.set_status_label.setText("")
+            self.show_set_keys([])
+            return
+        key, paths = navigator.current()
+        self.scene_combo.blockSignals(True)
+        self.scene_combo.setCurrentIndex(navigator.index)
+        self.scene_combo.blockSignals(False)
+        self.set_status_label.setText(
+            tr("Set {index}/{count}: {key} ({images} images)",
+               index=navigator.index + 1, count=len(navigator), key=key, images=len(paths)))
+
+    def open_sequences(self):
+        text, ok = QInputDialog.getMultiLineText(
+            self, tr("Open sequences"), tr("One folder or glob (e.g. out/*.png) per line, one column each:"))
+        sources = [line.strip() for line in text.splitlines() if line.strip()]
+        if ok and sources:
+            self.window().open_sequences(sources)
+
+    def show_sequence_player(self, player):
+        self.player = player
+        self.play_btn.setEnabled(player is not None)
+        self.play_btn.setText(tr("Play"))
+        self.timeline_slider.setEnabled(player is not None)
+        if player is None:
+            self.sequence_status_label.setText("")
+            return
+        self.timeline_slider.blockSignals(True)
+        self.timeline_slider.setRange(0, max(0, player.length - 1))
+        self.timeline_slider.setValue(0)
+        self.timeline_slider.blockSignals(False)
+        player.position_changed.connect(self.update_timeline)
+        player.stats_changed.connect(self.update_sequence_stats)
+
+    def toggle_playback(self):
+        if self.player is not None:
+            self.player.toggle()
+            self.play_btn.setText(tr("Pause") if self.player.is_playing() else tr("Play"))
+
+    def scrub(self, position):
+        if self.player is not None and position != self.player.position:
+            self.player.seek(position)
+
+    def set_fps(self, fps):
+        if self.player is not None:
+            self.player.set_fps(fps)
+
+    def update_timeline(self, position):
+        self.timeline_slider.blockSignals(True)
+        self.timeline_slider.setValue(position)
+        self.timeline_slider.blockSignals(False)
+        self.update_sequence_stats(self.player.achieved_fps(), self.player.dropped)
+
+    def update_sequence_stats(self, fps, dropped):
+        self.sequence_status_label.setText(
+            tr("Frame {position}/{length}, {fps:.1f} fps, {dropped} dropped",
+               position=self.player.position + 1, length=self.player.length, fps=fps, dropped=dropped))
+
+    def show_pixel_values(self, point, rows):
+        """Show the values of every image at *point*, the first image is the reference"""
+        if point is None:
+            text = ""
+        else:
+            lines = [f"x {point.x()}, y {point.y()}"]
+            _, reference, reference_depth = rows[0] if rows else (None, None, 8)
+            for index, (name, values, depth) in enumerate(rows):
+                if values is None:
+                    lines.append(f"{name}: -")
+                    continue
+                line = f"{name}: {pixels.CHANNEL_NAMES[len(values)]} {' '.join(str(value) for value in values)}"
+                if depth != 8:
+                    line += f" ({depth}-bit)"
+                if index == 0:
+                    line += f" ({tr('reference')})"
+                elif depth == reference_depth:
+                    delta = pixels.deltas(values, reference)
+                    if delta is not None:
+                        line += "  Δ " + " ".join(f"{value:+d}" for value in delta)
+                lines.append(line)
+            text = "\n".join(lines)
+        if text != self.pixel_label.text():
+            self.pixel_label.setText(text)
+
+    def show_analysis_progress(self, done, total):
+        self.analysis_status_label.setText(
+            tr("Computing the disagreement map... {done}/{total}", done=done, total=total))
+
+    def show_analysis_status(self, text):
+        self.analysis_status_label.setText(text)
+
+    def show_analysis_failed(self, message):
+        self.analysis_status_label.setText(
+            tr("Cannot compute the disagreement map: {error}", error=message))
+
+    def schedule_memory_usage(self):
+        if not self.memory_timer.isActive():
+            self.memory_timer.start()
+
+    def show_over_budget(self, excess):
+        self.over_budget = excess
+        self.schedule_memory_usage()
+
+    def show_memory_usage(self):
+        manager = memory.shared_manager()
+        totals = manager.totals()
+        lines = [f"{tr(MEMORY_KIND_LABELS.get(kind, kind))}: {memory.format_bytes(size)}"
+                 for kind, size in totals.items() if size]
+        total = sum(totals.values())
+        budget = manager.budget_bytes
+        if budget:
+            lines.append(tr("Total: {total} of {budget}", total=memory.format_bytes(total),
+                            budget=memory.format_bytes(budget)))
+            if self.over_budget and total > budget:
+                lines.append(tr("Over the limit, the images on screen cannot be dropped"))
+        else:
+            lines.append(tr("Total: {total}", total=memory.format_bytes(total)))
+        if total <= budget:
+            self.over_budget = 0
+        self.memory_label.setText("\n".join(lines))
+
+        per_image = []
+        for owner, sizes in manager.per_owner()[:20]:
+            name = os.path.basename(getattr(owner, 'image_path', ''))
+            name = name or ", ".join(tr(MEMORY_KIND_LABELS.get(kind, kind)) for kind in sizes)
+            per_image.append(f"{name}: {memory.format_bytes(sum(sizes.values()))}")
+        self.memory_label.setToolTip("\n".join(per_image))
+
+    def export_trace(self):
+        path, _ = QFileDialog.getSaveFileName(
+            self, tr("Export trace"), "gict-trace.json", "Chrome trace (*.json)")
+        if path:
+            try:
+                count = tracing.export_chrome_trace(path)
+            except OSError as e:
+                QMessageBox.warning(self, tr("Warning!"), tr("Cannot export the trace: {error}", error=e))
+                return
+            self.trace_status_label.setText(
+                tr("Exported {count} spans, open in chrome://tracing or Perfetto", count=count))
+
+    def save_images(self):
+        self.window().save_images()
+
+    def save_local_images(self):
+        self.window().save_local_images()
+
+    def cancel_export(self):
+        self.window().export_queue.cancel_all()
+
+    def show_export_job(self, job):
+        self.export_list.clear()
+        for item in job.items:
+            self.export_list.addItem(f"{item.output_name}: {export_status_text(item.status)}")
+        self.export_progress.setRange(0, len(job.items))
+        self.export_progress.setValue(0)
+        self.export_status_label.setText(tr("Saving to {folder}", folder=job.folder))
+        self.cancel_export_btn.setEnabled(True)
+
+        job.item_changed.connect(lambda index: self.update_export_item(job, index))
+        job.progress.connect(self.update_export_progress)
+
+    def update_export_item(self, job, index):
+        item = job.items[index]
+        text = f"{item.output_name}: {export_status_text(item.status)}"
+        if item.message:
+            text += f" ({item.message})"
+        self.export_list.item(index).setText(text)
+
+    def update_export_progress(self, done, total, rate):
+        self.export_progress.setValue(done)
+        self.export_status_label.setText(
+            tr("{done}/{total} images, {rate:.1f} images/s", done=done, total=total, rate=rate))
+
+    def export_job_finished(self, job):
+        from . import jobs
+        counts = job.counts()
+        self.cancel_export_btn.setEnabled(False)
+        self.export_status_label.setText(tr(
+            "Saved {saved}, skipped {skipped} unchanged, failed {failed}, cancelled {cancelled} to {folder}",
+            saved=counts.get(jobs.SAVED, 0), skipped=counts.get(jobs.SKIPPED, 0),
+            failed=counts.get(jobs.FAILED, 0), cancelled=counts.get(jobs.CANCELLED, 0),
+            folder=job.folder))
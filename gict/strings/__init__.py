@@ -0,0 +1,35 @@
+"""User interface strings
+
+English is the source language: the interface passes English text through
+``tr`` and every other language is a table mapping that text to its
+translation (``gict/strings/cn.py``). Text with values uses ``str.format``
+fields, which translations keep:
+
+    tr("Set {index}/{count}: {key}", index=2, count=10, key=key)
+
+Call ``set_language`` before building the interface.
+"""
+import importlib
+
+LANGUAGES = ('en', 'cn')
+
+_language = 'en'
+_table = {}
+
+
+def set_language(language):
+    global _language, _table
+    language = language.lower()
+    if language not in LANGUAGES:
+        raise ValueError(f"unknown language {language!r}, expected one of {', '.join(LANGUAGES)}")
+    _language = language
+    _table = {} if language == 'en' else importlib.import_module(f'.{language}', __name__).STRINGS
+
+
+def language():
+    return _language
+
+
+def tr(text, **values):
+    text = _table.get(text, text)
+    return text.format(**values) if values else text
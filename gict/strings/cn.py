@@ -0,0 +1,188 @@
+"""简体中文界面文字，键为英文原文"""
+
+STRINGS = {
+    # 主窗口
+    "Warning!": "警告",
+
+    # 通用设置
+    "General Settings": "通用设置",
+    "Line width (px):": "线宽:",
+    "Margin (px):": "边距:",
+    "Display the enlarged image: ": "显示放大图: ",
+
+    # 区域设置
+    "Regions": "区域",
+    "Add": "添加",
+    "Remove": "删除",
+    "Name:": "名称:",
+    "Drag to draw the selected region, Shift+drag to add one. "
+    "Drag inside a region to move it, drag a corner to resize it.":
+        "拖动绘制选中的区域，按住 Shift 拖动添加区域。拖动区域内部可移动，拖动角点可调整大小。",
+    "Color:": "颜色:",
+    "Zoom ratio:": "放大比例:",
+    "Position:": "位置:",
+    "Top Left": "左上",
+    "Top Right": "右上",
+    "Bottom Left": "左下",
+    "Bottom Right": "右下",
+    "Resampling:": "重采样:",
+    "Nearest (sharp pixels)": "最近邻 (锐利像素)",
+    "Bilinear": "双线性",
+    "Lanczos": "Lanczos",
+
+    # 放大镜
+    "Loupe": "放大镜",
+    "Show a loupe under the cursor": "在光标处显示放大镜",
+    "Size (px):": "大小 (像素):",
+    "Shape:": "形状:",
+    "Square": "方形",
+    "Circle": "圆形",
+
+    # 像素值
+    "Pixel Values": "像素值",
+    "Show the values under the cursor": "显示光标处的像素值",
+    "reference": "参考",
+
+    # 差异图
+    "Disagreement Map": "差异图",
+    "Disagreement map": "差异图",
+    "Show where the images disagree": "显示图片之间的差异",
+    "Measure:": "度量:",
+    "Standard deviation": "标准差",
+    "Max - min": "最大值 - 最小值",
+    "Computing the disagreement map... {done}/{total}": "正在计算差异图... {done}/{total}",
+    "Largest difference {maximum:.1f}, colours scaled to {scale:.1f}": "最大差异 {maximum:.1f}，颜色范围 {scale:.1f}",
+    "Cannot compute the disagreement map: {error}": "无法计算差异图: {error}",
+    "The disagreement map needs numpy": "差异图需要安装 numpy",
+    "Load at least two images": "请至少载入两张图片",
+
+    # 解码
+    "Decoding": "解码",
+    "Decode in worker processes": "在工作进程中解码",
+    "Decodes large or heavily compressed files on all cores, each image in its own process": "使用所有核心解码大文件或高压缩率文件，每张图片在单独的进程中解码",
+    "Worker processes need Python's multiprocessing.shared_memory": "工作进程需要 Python 的 multiprocessing.shared_memory",
+    "Show camera previews while decoding": "解码时先显示相机预览图",
+    "Shows the thumbnail embedded in large JPEGs, or a quick downscaled decode, until the full image is ready": "在完整图片解码完成前，先显示大尺寸 JPEG 内嵌的缩略图或快速缩小解码的结果",
+
+    # 文件操作
+    "File Operations": "文件操作",
+    "Load images": "载入图片",
+    "Select images": "选择图片",
+    "Save the entire image": "保存整张图片",
+    "Save the image of the region": "保存局部放大图",
+    "Choose the save folder": "选择保存文件夹",
+    "Image not loaded": "没有加载的图片",
+    "No region selected": "没有选择区域",
+
+    # 导出
+    "Export format:": "导出格式:",
+    "Cancel export": "取消导出",
+    "PNG (fast, level 1)": "PNG（快速，压缩级别 1）",
+    "PNG (small, level 9)": "PNG（最小，压缩级别 9）",
+    "PNG (fast, Pillow)": "PNG（快速，Pillow）",
+    "WebP lossless": "WebP 无损",
+    "WebP lossless (fast, Pillow)": "WebP 无损（快速，Pillow）",
+    "WebP (quality 90)": "WebP（质量 90）",
+    "JPEG (quality 95)": "JPEG（质量 95）",
+    "JPEG (quality 80, preview)": "JPEG（质量 80，预览）",
+    "TIFF 16-bit": "TIFF 16 位",
+    "pending": "等待中",
+    "saving...": "保存中...",
+    "saved": "已保存",
+    "unchanged, skipped": "未变化，已跳过",
+    "failed": "失败",
+    "cancelled": "已取消",
+    "Saving to {folder}": "正在保存到 {folder}",
+    "{done}/{total} images, {rate:.1f} images/s": "{done}/{total} 张，{rate:.1f} 张/秒",
+    "Saved {saved}, skipped {skipped} unchanged, failed {failed}, cancelled {cancelled} to {folder}":
+        "已保存 {saved} 张，跳过未变化 {skipped} 张，失败 {failed} 张，取消 {cancelled} 张，保存到 {folder}",
+
+    # 会话
+    "Open session": "打开会话",
+    "Save session": "保存会话",
+    "GICT session": "GICT 会话",
+    "{filename} (missing)": "{filename}（文件不存在）",
+    "{filename} (changed since the session was saved)": "{filename}（保存会话后已修改）",
+    "Cannot save the session: {error}": "无法保存会话：{error}",
+
+    # 监视文件夹
+    "Watch folder": "监视文件夹",
+    "Stop watching": "停止监视",
+    "Choose the folder to watch": "选择要监视的文件夹",
+    "File pattern:": "文件名模式:",
+    "polling": "轮询",
+    "file system events": "文件系统事件",
+    "Watching {folder}/{pattern} ({mode})": "正在监视 {folder}/{pattern}（{mode}）",
+
+    # 对比组
+    "Comparison Sets": "对比组",
+    "Open sets": "打开对比组",
+    "Previous": "上一组",
+    "Next": "下一组",
+    "Prefetch memory (MB):": "预读取内存 (MB):",
+    "Choose a folder of method folders (or of all images)": "选择包含各方法文件夹（或全部图片）的文件夹",
+    "Scene key (regular expression, empty = same file name in every method folder):":
+        "场景关键字（正则表达式，留空表示各方法文件夹中的同名文件）:",
+    "Set {index}/{count}: {key} ({images} images)": "第 {index}/{count} 组: {key}（{images} 张）",
+    "Invalid scene key: {error}": "场景关键字无效：{error}",
+    "No comparison sets found": "没有找到对比组",
+    "Scene:": "场景:",
+    "Open regression report": "打开回归报告",
+    "Regression report": "回归报告",
+    "Cannot open the report: {error}": "无法打开报告：{error}",
+    "Listing folders...": "正在读取文件夹...",
+    "Group similar images": "按内容分组",
+    "Hash:": "哈希:",
+    "Gradients (dHash)": "梯度 (dHash)",
+    "Frequencies (pHash)": "频率 (pHash)",
+    "Threshold (bits):": "阈值 (位):",
+    "Hashes differing in at most this many of 64 bits are grouped": "64 位哈希中最多相差这么多位的图片归为一组",
+    "Choose a folder, images in all its sub folders are grouped": "选择文件夹，其所有子文件夹中的图片都会参与分组",
+    "Hashing images... {done}/{total}": "正在计算哈希... {done}/{total}",
+    "Cannot group the images: {error}": "无法分组：{error}",
+
+    # 图像序列
+    "Sequences": "图像序列",
+    "Open sequences": "打开序列",
+    "One folder or glob (e.g. out/*.png) per line, one column each:":
+        "每行一个文件夹或通配符（如 out/*.png），每个序列占一列:",
+    "Play": "播放",
+    "Pause": "暂停",
+    "Frame rate (fps):": "帧率 (fps):",
+    "Frame {position}/{length}, {fps:.1f} fps, {dropped} dropped": "第 {position}/{length} 帧，{fps:.1f} fps，丢帧 {dropped}",
+    "No frames found in: {sources}": "没有找到帧: {sources}",
+
+    # 性能诊断
+    "Diagnostics": "性能诊断",
+    "Record timings": "记录耗时",
+    "Show frame timing overlay": "显示帧耗时叠加层",
+    "Export trace": "导出耗时记录",
+    "Cannot export the trace: {error}": "无法导出耗时记录: {error}",
+    "Exported {count} spans, open in chrome://tracing or Perfetto": "已导出 {count} 条记录，可在 chrome://tracing 或 Perfetto 中打开",
+
+    # 内存
+    "Memory": "内存",
+    "No limit": "不限制",
+    "Image memory (MB):": "图像内存 (MB):",
+    "Original": "原图",
+    "Preview": "预览图",
+    "Display": "显示",
+    "Magnifier": "放大区域",
+    "Channels": "通道视图",
+    "View:": "视图：",
+    "Colour": "彩色",
+    "Red": "红",
+    "Green": "绿",
+    "Blue": "蓝",
+    "Alpha": "透明度",
+    "Luminance": "亮度",
+    "Chroma": "色度",
+    "The channel views need numpy": "通道视图需要 numpy",
+    "Camera RAW files need rawpy": "相机 RAW 文件需要 rawpy",
+    "Analysis": "分析",
+    "Prefetch": "预读取",
+    "Export": "导出",
+    "Total: {total} of {budget}": "合计: {total} / {budget}",
+    "Total: {total}": "合计: {total}",
+    "Over the limit, the images on screen cannot be dropped": "超出上限，正在显示的图像无法释放",
+}
@@ -0,0 +1,191 @@
+"""Quick previews of camera JPEGs and RAW files, shown while the full image decodes
+
+Most camera JPEGs carry a small JPEG thumbnail in their EXIF block, which is
+read from the first few kilobytes of the file. Files without a usable one
+are decoded at 1/2, 1/4 or 1/8 scale, which libjpeg does in the DCT domain
+at a fraction of the cost of a full decode. Previews are turned by the EXIF
+orientation, like the full decode in loader.decode_image. RAW files show
+their embedded preview (see raw.py); the half size decode of those without
+one is left to the loader's threads.
+"""
+import struct
+
+from PyQt5.QtCore import QSize
+from PyQt5.QtGui import QImage, QImageReader, QTransform
+
+from . import raw, tracing
+
+# Longest side a scaled decode has to reach, smaller files decode fully at once
+MIN_PREVIEW_SIZE = 384
+SCALE_DENOMINATORS = (8, 4, 2)
+# EXIF thumbnails whose aspect ratio differs more than this are letterboxed
+ASPECT_TOLERANCE = 0.02
+# APP1 segments are at most 64 KB, but may follow other application segments
+HEADER_LIMIT = 256 * 1024
+
+ORIENTATION_TAG = 0x0112
+THUMBNAIL_OFFSET_TAG = 0x0201
+THUMBNAIL_LENGTH_TAG = 0x0202
+
+# EXIF orientation: (mirror horizontally, mirror vertically, then turn 90 degrees clockwise)
+_ORIENTATIONS = {
+    1: (False, False, False),
+    2: (True, False, False),
+    3: (True, True, False),
+    4: (False, True, False),
+    5: (False, True, True),
+    6: (False, False, True),
+    7: (True, False, True),
+    8: (True, True, True),
+}
+
+_enabled = True
+
+
+def set_enabled(enabled):
+    global _enabled
+    _enabled = bool(enabled)
+
+
+def is_enabled():
+    return _enabled
+
+
+class ExifInfo:
+    """Orientation and embedded thumbnail (JPEG bytes or None) of a file"""
+
+    def __init__(self, orientation=1, thumbnail=None):
+        self.orientation = orientation
+        self.thumbnail = thumbnail
+
+
+def _exif_segment(f):
+    """TIFF data of the EXIF APP1 segment of the JPEG file *f*, None if there is none"""
+    if f.read(2) != b'\xff\xd8':
+        return None
+    while f.tell() < HEADER_LIMIT:
+        marker = f.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None
+        if marker[1] in (0xD9, 0xDA):  # end of image, start of scan
+            return None
+        length = struct.unpack('>H', f.read(2))[0]
+        if marker[1] == 0xE1:
+            data = f.read(length - 2)
+            if data.startswith(b'Exif\x00\x00'):
+                return data[6:]
+        else:
+            f.seek(length - 2, 1)
+    return None
+
+
+def _ifd(tiff, order, offset):
+    """({tag: (type, count, raw value)}, offset of the next IFD)"""
+    count = struct.unpack_from(order + 'H', tiff, offset)[0]
+    entries = {}
+    for index in range(count):
+        tag, kind, number, value = struct.unpack_from(order + 'HHI4s', tiff, offset + 2 + index * 12)
+        entries[tag] = (kind, number, value)
+    next_offset = struct.unpack_from(order + 'I', tiff, offset + 2 + count * 12)[0]
+    return entries, next_offset
+
+
+def _number(order, entry):
+    kind, _, value = entry
+    # SHORT values sit in the first two bytes of the field, LONG values fill it
+    return struct.unpack_from(order + ('H' if kind == 3 else 'I'), value)[0]
+
+
+def read_exif(path):
+    """ExifInfo of the JPEG at *path*, None if it has no readable EXIF block"""
+    try:
+        with open(path, 'rb') as f:
+            tiff = _exif_segment(f)
+        if tiff is None:
+            return None
+        order = {b'II': '<', b'MM': '>'}[tiff[:2]]
+        entries, next_offset = _ifd(tiff, order, struct.unpack_from(order + 'I', tiff, 4)[0])
+        info = ExifInfo()
+        if ORIENTATION_TAG in entries:
+            info.orientation = _number(order, entries[ORIENTATION_TAG])
+        if next_offset:
+            entries, _ = _ifd(tiff, order, next_offset)
+            if THUMBNAIL_OFFSET_TAG in entries and THUMBNAIL_LENGTH_TAG in entries:
+                start = _number(order, entries[THUMBNAIL_OFFSET_TAG])
+                end = start + _number(order, entries[THUMBNAIL_LENGTH_TAG])
+                if 0 < start < end <= len(tiff):
+                    info.thumbnail = tiff[start:end]
+        return info
+    except (OSError, KeyError, struct.error):
+        return None
+
+
+def oriented(image, orientation):
+    """*image* turned and mirrored as EXIF *orientation* asks"""
+    mirror_h, mirror_v, turn = _ORIENTATIONS.get(orientation, _ORIENTATIONS[1])
+    if mirror_h or mirror_v:
+        image = image.mirrored(mirror_h, mirror_v)
+    if turn:
+        image = image.transformed(QTransform().rotate(90))
+    return image
+
+
+def oriented_size(size, orientation):
+    if _ORIENTATIONS.get(orientation, _ORIENTATIONS[1])[2]:
+        return size.transposed()
+    return size
+
+
+def _same_aspect(a, b):
+    if a.isEmpty() or b.isEmpty():
+        return False
+    return abs(a.width() / a.height() - b.width() / b.height()) <= ASPECT_TOLERANCE * b.width() / b.height()
+
+
+def scale_denominator(size):
+    """The largest libjpeg scale denominator keeping MIN_PREVIEW_SIZE, None if there is none"""
+    longest = max(size.width(), size.height())
+    for denominator in SCALE_DENOMINATORS:
+        if longest / denominator >= MIN_PREVIEW_SIZE:
+            return denominator
+    return None
+
+
+def scaled_decode(path, size, denominator):
+    """Decode the JPEG at *path* (of *size*) at 1/*denominator* scale"""
+    reader = QImageReader(path)
+    reader.setAutoTransform(True)
+    reader.setScaledSize(QSize(-(-size.width() // denominator), -(-size.height() // denominator)))
+    return reader.read()
+
+
+@tracing.traced(name='thumbnails.quick_preview')
+def quick_preview(path):
+    """(preview QImage, full image size) of a large JPEG or a RAW file, None for other files
+
+    The size is the one of the oriented image. RAW files without an embedded
+    preview give None.
+    """
+    if not _enabled:
+        return None
+    if raw.is_raw(path):
+        return raw.quick_preview(path, half_size=False)
+    reader = QImageReader(path)
+    if bytes(reader.format()).lower() not in (b'jpeg', b'jpg'):
+        return None
+    size = reader.size()
+    denominator = scale_denominator(size)
+    if denominator is None:
+        return None
+
+    info = read_exif(path) or ExifInfo()
+    if info.thumbnail is not None:
+        thumbnail = QImage.fromData(info.thumbnail, 'JPG')
+        if _same_aspect(thumbnail.size(), size):
+            tracing.count('exif thumbnails', True)
+            return oriented(thumbnail, info.orientation), oriented_size(size, info.orientation)
+    tracing.count('exif thumbnails', False)
+    preview = scaled_decode(path, size, denominator)
+    if preview.isNull():
+        return None
+    return preview, oriented_size(size, info.orientation)
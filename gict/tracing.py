@@ -0,0 +1,143 @@
+"""Lightweight tracing of the hot paths
+
+Spans are recorded into a ring buffer only while tracing is enabled; when it
+is off a traced function costs one extra call and a flag check. The buffer
+can be written as Chrome trace JSON (chrome://tracing, Perfetto).
+
+    @tracing.traced
+    def paintEvent(self, event): ...
+
+    with tracing.span('export.encode'):
+        ...
+"""
+import contextlib
+import functools
+import os
+import threading
+import time
+from collections import deque
+
+DEFAULT_CAPACITY = 100000
+
+_enabled = os.environ.get('GICT_TRACE', '') not in ('', '0')
+_events = deque(maxlen=DEFAULT_CAPACITY)
+_counters = {}
+_thread_names = {}
+
+
+def is_enabled():
+    return _enabled
+
+
+def set_enabled(enabled):
+    global _enabled
+    _enabled = bool(enabled)
+
+
+def clear():
+    _events.clear()
+    _counters.clear()
+
+
+def _record(name, start_ns, duration_ns, instance):
+    thread_id = threading.get_ident()
+    if thread_id not in _thread_names:
+        _thread_names[thread_id] = threading.current_thread().name
+    _events.append((name, start_ns, duration_ns, thread_id, instance))
+
+
+def traced(func=None, name=None):
+    """Decorator recording a span per call; the first argument's id is kept
+    so costs can be split per widget"""
+    if func is None:
+        return functools.partial(traced, name=name)
+    label = name or func.__qualname__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not _enabled:
+            return func(*args, **kwargs)
+        start = time.perf_counter_ns()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _record(label, start, time.perf_counter_ns() - start, id(args[0]) if args else 0)
+    return wrapper
+
+
+@contextlib.contextmanager
+def _span(name, instance):
+    start = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        _record(name, start, time.perf_counter_ns() - start, instance)
+
+
+_NULL_SPAN = contextlib.nullcontext()
+
+
+def span(name, instance=None):
+    """Context manager recording a span around a block"""
+    if not _enabled:
+        return _NULL_SPAN
+    return _span(name, id(instance) if instance is not None else 0)
+
+
+def count(name, hit):
+    """Count a cache hit or miss"""
+    if not _enabled:
+        return
+    hits, misses = _counters.get(name, (0, 0))
+    _counters[name] = (hits + 1, misses) if hit else (hits, misses + 1)
+
+
+def hit_rates():
+    """{cache name: (hit rate, lookups)}"""
+    return {name: (hits / (hits + misses), hits + misses)
+            for name, (hits, misses) in _counters.items() if hits + misses}
+
+
+def recent(name, seconds=1.0):
+    """Spans called *name* that started within the last *seconds*"""
+    since = time.perf_counter_ns() - int(seconds * 1e9)
+    return [event for event in list(_events) if event[0] == name and event[1] >= since]
+
+
+def last_durations(name, seconds=1.0):
+    """{instance id: duration in ms of its most recent *name* span}"""
+    durations = {}
+    for event in recent(name, seconds):
+        durations[event[4]] = event[2] / 1e6
+    return durations
+
+
+def export_chrome_trace(path):
+    """Write the recorded spans as Chrome trace event JSON, return their number"""
+    events = list(_events)
+    origin = min((event[1] for event in events), default=0)
+    pid = os.getpid()
+    thread_ids = {}
+    trace_events = []
+    for name, start_ns, duration_ns, thread_id, instance in events:
+        tid = thread_ids.setdefault(thread_id, len(thread_ids) + 1)
+        trace_events.append({
+            'name': name,
+            'cat': name.split('.')[0],
+            'ph': 'X',
+            'ts': (start_ns - origin) / 1000,
+            'dur': duration_ns / 1000,
+            'pid': pid,
+            'tid': tid,
+            'args': {'instance': hex(instance)} if instance else {},
+        })
+    for thread_id, tid in thread_ids.items():
+        trace_events.append({
+            'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid,
+            'args': {'name': _thread_names.get(thread_id, str(thread_id))},
+        })
+
+    import json
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'traceEvents': trace_events, 'displayTimeUnit': 'ms'}, f)
+    return len(events)
@@ -0,0 +1,133 @@
+"""Watch a folder for new or rewritten images
+
+QFileSystemWatcher reports changes as soon as a writer touches a file, so
+every change is held back until the file's size and modification time have
+stayed the same for a debounce interval. Folders the watcher cannot handle
+(some network shares) are polled instead.
+"""
+import fnmatch
+import os
+
+from PyQt5.QtCore import QFileSystemWatcher, QObject, QTimer, pyqtSignal
+
+
+def stat_key(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_size, stat.st_mtime_ns)
+
+
+class FolderWatcher(QObject):
+    """Emits the paths of files matching *pattern* once they are fully written"""
+
+    file_added = pyqtSignal(str)
+    file_changed = pyqtSignal(str)
+    file_removed = pyqtSignal(str)
+
+    def __init__(self, folder, pattern='*', debounce_ms=500, poll_ms=2000,
+                 force_polling=False, parent=None):
+        super().__init__(parent)
+        self.folder = os.path.abspath(folder)
+        self.pattern = pattern or '*'
+        self.known = self.scan()
+        self.pending = {}
+
+        self.debounce_timer = QTimer(self)
+        self.debounce_timer.setSingleShot(True)
+        self.debounce_timer.setInterval(debounce_ms)
+        self.debounce_timer.timeout.connect(self.settle)
+
+        self.poll_timer = QTimer(self)
+        self.poll_timer.setInterval(poll_ms)
+        self.poll_timer.timeout.connect(self.rescan)
+
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.directoryChanged.connect(self.rescan)
+        self.watcher.fileChanged.connect(self.on_file_changed)
+
+        self.polling = force_polling or not self.watcher.addPath(self.folder)
+        if self.polling:
+            self.poll_timer.start()
+        elif self.known:
+            self.watcher.addPaths(list(self.known))
+
+    def matches(self, name):
+        return fnmatch.fnmatch(name, self.pattern)
+
+    def scan(self):
+        found = {}
+        try:
+            with os.scandir(self.folder) as entries:
+                for entry in entries:
+                    if not entry.is_file() or not self.matches(entry.name):
+                        continue
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    found[entry.path] = (stat.st_size, stat.st_mtime_ns)
+        except OSError:
+            pass
+        return found
+
+    def matching_files(self):
+        return sorted(self.known)
+
+    def rescan(self, _path=None):
+        current = self.scan()
+        for path, stat in current.items():
+            if self.known.get(path) != stat and self.pending.get(path) != stat:
+                self.mark(path, stat)
+        for path in set(self.known) - set(current):
+            del self.known[path]
+            self.pending.pop(path, None)
+            self.file_removed.emit(path)
+
+    def on_file_changed(self, path):
+        stat = stat_key(path)
+        if stat is None:
+            # Replaced through a rename, the folder scan will pick it up
+            self.rescan()
+            return
+        if path not in self.watcher.files():
+            self.watcher.addPath(path)
+        self.mark(path, stat)
+
+    def mark(self, path, stat):
+        self.pending[path] = stat
+        self.debounce_timer.start()
+
+    def settle(self):
+        """Report the files that did not change during the debounce interval"""
+        still_writing = {}
+        for path, stat in self.pending.items():
+            current = stat_key(path)
+            if current is None:
+                continue
+            if current != stat:
+                still_writing[path] = current
+                continue
+            if self.known.get(path) == current:
+                continue
+
+            is_new = path not in self.known
+            self.known[path] = current
+            if is_new:
+                if not self.polling:
+                    self.watcher.addPath(path)
+                self.file_added.emit(path)
+            else:
+                self.file_changed.emit(path)
+
+        self.pending = still_writing
+        if still_writing:
+            self.debounce_timer.start()
+
+    def stop(self):
+        self.poll_timer.stop()
+        self.debounce_timer.stop()
+        paths = self.watcher.files() + self.watcher.directories()
+        if paths:
+            self.watcher.removePaths(paths)
@@ -0,0 +1,163 @@
+"""Decoding in worker processes, pixels handed back through shared memory
+
+Decoding itself releases the GIL, but converting and analysing the pixels
+next to it in the GUI process does not; separate processes scale with the
+cores. A worker decodes into a shared memory block and the GUI process wraps
+the block in a QImage without copying it, QPixmaps made from that image keep
+using the same memory on the raster backend.
+
+The block's name is unlinked as soon as the GUI process has mapped it, so a
+crash on either side leaks nothing. The mapping is closed once no QImage or
+QPixmap refers to the pixels any more, which Qt reports as the wrapping
+image being detached again.
+"""
+import os
+import threading
+
+from PyQt5 import sip
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+from PyQt5.QtGui import QImage
+
+from . import loader, pixels
+
+SWEEP_INTERVAL_MS = 2000
+
+
+def available():
+    try:
+        from multiprocessing import shared_memory  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def worker_count():
+    return os.cpu_count() or 1
+
+
+def warm_up():
+    """Runs in each worker when the pool starts, so the first decodes do not
+    pay for starting Python and importing Qt"""
+    return os.getpid()
+
+
+def decode_to_shared(path):
+    """Decode *path* into a new shared memory block (runs in a worker)
+
+    Returns (block name, width, height, bytes per line, format), None if the
+    file cannot be read.
+    """
+    from multiprocessing import shared_memory
+
+    image = loader.decode_image(path)
+    if image.isNull():
+        return None
+    if image.format() not in pixels.LAYOUTS:
+        # Indexed images need their colour table, send plain pixels instead
+        image = image.convertToFormat(QImage.Format_RGBA64 if image.depth() > 32 else QImage.Format_ARGB32)
+    size = image.sizeInBytes()
+    bits = image.constBits()
+    bits.setsize(size)
+    block = shared_memory.SharedMemory(create=True, size=size)
+    try:
+        block.buf[:size] = memoryview(bits)
+    except BaseException:
+        block.close()
+        block.unlink()
+        raise
+    block.close()
+    return block.name, image.width(), image.height(), image.bytesPerLine(), image.format()
+
+
+class ProcessDecoder(QObject):
+    """Decodes images on a pool of worker processes
+
+    Create it in the GUI thread; decoded images arrive through *decoded*.
+    """
+
+    decoded = pyqtSignal(str, QImage)
+    _mapped = pyqtSignal(str, QImage, object)
+
+    def __init__(self, workers=None, parent=None):
+        super().__init__(parent)
+        self.workers = workers or worker_count()
+        self.executor = None
+        self.lock = threading.Lock()
+        self.segments = []  # [(QImage, SharedMemory)] still mapped
+
+        self.sweep_timer = QTimer(self)
+        self.sweep_timer.setInterval(SWEEP_INTERVAL_MS)
+        self.sweep_timer.timeout.connect(self.sweep)
+        self._mapped.connect(self.on_mapped)
+
+    def start(self):
+        """Start the worker processes, they are started on first use otherwise"""
+        if self.executor is not None:
+            return
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        # Forking a process that runs Qt threads is not safe
+        self.executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+        for _ in range(self.workers):
+            self.executor.submit(warm_up)
+
+    def submit(self, path):
+        self.start()
+        future = self.executor.submit(decode_to_shared, path)
+        future.add_done_callback(lambda done: self._collect(path, done))
+
+    def _collect(self, path, future):
+        # Runs on the executor's thread
+        try:
+            result = None if future.cancelled() else future.result()
+        except Exception:  # a worker died or the file broke the decoder
+            result = None
+        image, block = self.attach(result) if result is not None else (QImage(), None)
+        self._mapped.emit(path, image, block)
+
+    def attach(self, result):
+        """Map the block described by *result*, return (QImage wrapping it, block)
+
+        The block is only swept once on_mapped has handed the image out: until
+        then the wrapper is the only image referring to it, and looks unused.
+        """
+        from multiprocessing import shared_memory
+
+        name, width, height, bytes_per_line, image_format = result
+        block = shared_memory.SharedMemory(name=name)
+        block.unlink()
+        image = QImage(sip.voidptr(block.buf), width, height, bytes_per_line, image_format)
+        return image, block
+
+    def on_mapped(self, path, image, block):
+        self.decoded.emit(path, image)
+        if block is None:
+            return
+        with self.lock:
+            self.segments.append((image, block))
+        if not self.sweep_timer.isActive():
+            self.sweep_timer.start()
+
+    def sweep(self):
+        """Close the mappings no image refers to any more"""
+        with self.lock:
+            segments, self.segments = self.segments, []
+            released = []
+            for image, block in segments:
+                if image.isDetached():
+                    released.append(block)
+                else:
+                    self.segments.append((image, block))
+            segments = image = None
+        # The wrapping images are gone, nothing points into the blocks
+        for block in released:
+            block.close()
+        if not self.segments:
+            self.sweep_timer.stop()
+
+    def shutdown(self):
+        """Stop the workers; mappings still in use stay open until they are released"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None